@@ -0,0 +1,119 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from terml.token_budget import estimate_tokens
+
+# Local stand-ins for anthropic.Anthropic and anthropic.AsyncAnthropic, covering
+# the parts of the API terml uses: messages.create and messages.stream. Every
+# request waits `latency` seconds before the first token. Tokens then arrive at
+# `tokens_per_second`, and a reply is at most `reply_tokens` long (also capped
+# by max_tokens). `responder(system, messages)` can supply the reply text, e.g.
+# a JSON plan for `terml auto`; when it returns None the reply is filler words.
+
+FILLER = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor".split()
+
+def _system_text(system, messages):
+    # terml sends the system prompt either as `system=` or as a leading system message
+    if system is not None:
+        return system if isinstance(system, str) else "".join(block.get("text", "") for block in system)
+    return "".join(str(message["content"]) for message in messages if message["role"] == "system")
+
+def _message_text(messages):
+    parts = []
+    for message in messages:
+        content = message["content"]
+        if isinstance(content, str):
+            parts.append(content)
+        else:
+            parts.extend(block.get("text", "") for block in content)
+    return "\n".join(parts)
+
+class _Reply:
+    def __init__(self, client, max_tokens, messages, system):
+        system_text = _system_text(system, messages)
+        text = client.responder(system_text, messages) if client.responder is not None else None
+        if text is not None:
+            tokens = text.split(" ")
+            self.chunks = [token + " " for token in tokens[:-1]] + tokens[-1:]
+        else:
+            count = min(max_tokens, client.reply_tokens)
+            self.chunks = [FILLER[i % len(FILLER)] + " " for i in range(count)]
+        self.text = "".join(self.chunks)
+        self.input_tokens = estimate_tokens(system_text + _message_text(messages))
+        self.tokens_per_second = client.tokens_per_second
+
+    def message(self):
+        return SimpleNamespace(
+            content=[SimpleNamespace(type="text", text=self.text)],
+            usage=SimpleNamespace(input_tokens=self.input_tokens, output_tokens=len(self.chunks)),
+        )
+
+    def generation_time(self):
+        return len(self.chunks) / self.tokens_per_second if self.tokens_per_second else 0.0
+
+class _Stream:
+    def __init__(self, client, reply):
+        self._client = client
+        self._reply = reply
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    @property
+    def text_stream(self):
+        time.sleep(self._client.latency)
+        interval = 1 / self._reply.tokens_per_second if self._reply.tokens_per_second else 0.0
+        # Paced against the clock so sleep overshoot does not add up over a reply
+        started = time.perf_counter()
+        for index, chunk in enumerate(self._reply.chunks, 1):
+            delay = started + index * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            yield chunk
+
+    def get_final_message(self):
+        return self._reply.message()
+
+class _Messages:
+    def __init__(self, client):
+        self._client = client
+
+    def create(self, model, max_tokens, messages, system=None, **kwargs):
+        reply = _Reply(self._client, max_tokens, messages, system)
+        self._client.requests += 1
+        time.sleep(self._client.latency + reply.generation_time())
+        return reply.message()
+
+    def stream(self, model, max_tokens, messages, system=None, **kwargs):
+        self._client.requests += 1
+        return _Stream(self._client, _Reply(self._client, max_tokens, messages, system))
+
+class FakeAnthropic:
+    def __init__(self, latency=0.0, tokens_per_second=0, reply_tokens=200, responder=None):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.reply_tokens = reply_tokens
+        self.responder = responder
+        self.requests = 0
+        self.messages = _Messages(self)
+
+class _AsyncMessages:
+    def __init__(self, client):
+        self._client = client
+
+    async def create(self, model, max_tokens, messages, system=None, **kwargs):
+        reply = _Reply(self._client, max_tokens, messages, system)
+        self._client.requests += 1
+        await asyncio.sleep(self._client.latency + reply.generation_time())
+        return reply.message()
+
+class FakeAsyncAnthropic(FakeAnthropic):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.messages = _AsyncMessages(self)
+
+    async def close(self):
+        pass
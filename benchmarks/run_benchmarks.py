@@ -0,0 +1,223 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from click.testing import CliRunner
+from terml import config
+
+# Offline benchmarks for terml, run with `python -m benchmarks.run_benchmarks`
+# from the repository root. The AI client is replaced by FakeAnthropic, so runs
+# need no network or API key. Results are compared with the stored baselines,
+# and the run exits with status 1 when a benchmark regressed.
+
+DEFAULT_SIZES = "1000,10000,100000"
+# Timings depend on the machine, so the baseline lives with the user's cache, not in the tree
+BASELINE_PATH = os.path.join(config.CACHE_DIR, "benchmarks", "baselines.json")
+ABSOLUTE_SLACK = 0.005  # seconds of timer noise tolerated on top of the relative tolerance
+E2E_REPO_FILES = 200
+
+FAILED_OUTPUT = "\n".join(
+    [f"tests/test_module{i}.py::test_function PASSED" for i in range(200)]
+    + ["E   AssertionError: assert 2 == 3", "FAILED tests/test_module7.py::test_function - AssertionError"]
+)
+
+def _size_label(files):
+    return f"{files // 1000}k" if files % 1000 == 0 else str(files)
+
+def _isolate(state_dir):
+    # Caches, journal, traces and templates stay inside the benchmark's state directory
+    config.CACHE_DIR = os.path.join(state_dir, "cache")
+    config.DATA_DIR = os.path.join(state_dir, "data")
+    config.JOURNAL_PATH = os.path.join(config.DATA_DIR, "journal")
+    config.DAEMON_SOCKET = os.path.join(config.DATA_DIR, "terml.sock")
+    config.TRACE_ENABLED = False
+    config.TEMPLATE_DIRS = [os.path.join(state_dir, "templates")]
+    os.environ.setdefault("ANTHROPIC_API_KEY", "offline-benchmark")
+
+def _plan_responder(system, messages):
+    if system.startswith(config.AUTO_PLAN_PROMPT):
+        return json.dumps({"steps": [{"command": "echo setup", "explanation": "Prints a message."}]})
+    return None
+
+def _ai_integration(args):
+    from benchmarks.fake_anthropic import FakeAnthropic, FakeAsyncAnthropic
+    from terml.ai_integration import AIIntegration
+    ai = AIIntegration(use_cache=False)
+    settings = dict(latency=args.latency, tokens_per_second=args.tokens_per_second,
+                    reply_tokens=args.reply_tokens, responder=_plan_responder)
+    ai.client = FakeAnthropic(**settings)
+    ai.async_client = FakeAsyncAnthropic(**settings)
+    return ai
+
+def _best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def run_subcommands(args, workdir):
+    # End-to-end latency of every CommandExecutor subcommand on a small project
+    from benchmarks.synthetic_repo import make_repo
+    from terml.commands import CommandExecutor
+    from terml.journal import Journal
+    from terml.terminal_handler import TerminalHandler
+
+    project = make_repo(os.path.join(workdir, "e2e-project"), E2E_REPO_FILES)
+    scratch = os.path.join(workdir, "e2e-scratch")
+    os.makedirs(scratch, exist_ok=True)
+    handler = TerminalHandler(journal=Journal(config.JOURNAL_PATH))
+    handler.journal.append("pytest -q", 1, 0.8, FAILED_OUTPUT)
+    executor = CommandExecutor(handler, _ai_integration(args), use_cache=False)
+
+    subcommands = [
+        ("explain", "terml explain", None, project),
+        ("suggest", "terml suggest", None, project),
+        ("debug", "terml debug", None, project),
+        ("chat", "terml chat -q", "How do I find large files?\nexit\n", project),
+        ("auto", "terml auto --with-user", "Set up a web service\npython\nn\ny\n", project),
+        ("summarize", f"terml summarize {project}", None, project),
+        ("generate", "terml generate python demo", None, scratch),
+        ("analyze", f"terml analyze {project}", None, project),
+        ("test", f"terml test {project}", None, project),
+        ("deps", "terml deps list --offline", None, project),
+    ]
+    results = {}
+    runner = CliRunner()
+    cwd = os.getcwd()
+    try:
+        for name, command, stdin, directory in subcommands:
+            os.chdir(directory)
+
+            def run():
+                with runner.isolation(input=stdin):
+                    executor.execute(command)
+
+            results[f"e2e.{name}"] = _best_of(args.repeat, run)
+    finally:
+        os.chdir(cwd)
+    return results
+
+def run_throughput(args, workdir, files):
+    # Analyzer, test scaffold parsing and directory summaries on a repo of `files` files
+    from benchmarks.synthetic_repo import make_repo
+    from terml.code_analyzer import analyze_project
+    from terml.test_generator import generate_tests_for_project
+
+    label = _size_label(files)
+    started = time.perf_counter()
+    repo = make_repo(os.path.join(workdir, f"repo-{label}"), files)
+    print(f"  repo-{label} ready in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    ai = _ai_integration(args)
+    results = {
+        f"analyze.cold.{label}": _best_of(args.repeat, lambda: analyze_project(repo, use_cache=False)),
+        f"test_generator.{label}": _best_of(args.repeat, lambda: generate_tests_for_project(repo)),
+        f"summarize.{label}": _best_of(args.repeat, lambda: ai.summarize_contents(repo)),
+    }
+    analyze_project(repo)
+    results[f"analyze.warm.{label}"] = _best_of(args.repeat, lambda: analyze_project(repo))
+    return results
+
+def _settings(args):
+    # Results are only comparable with baselines taken under the same settings
+    return {
+        "latency": args.latency,
+        "tokens_per_second": args.tokens_per_second,
+        "reply_tokens": args.reply_tokens,
+        "python": platform.python_version(),
+    }
+
+def load_baseline(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_baseline(path, settings, results, previous=None):
+    merged = dict(previous["results"]) if previous and previous.get("settings") == settings else {}
+    merged.update(results)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"settings": settings, "results": merged}, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+def compare(results, baseline, tolerance):
+    # (name, baseline seconds, seconds) for every benchmark slower than allowed
+    regressions = []
+    for name, seconds in results.items():
+        expected = baseline.get(name)
+        if expected is not None and seconds > expected * (1 + tolerance) + ABSOLUTE_SLACK:
+            regressions.append((name, expected, seconds))
+    return regressions
+
+def format_results(results, baseline):
+    if not results:
+        return "No benchmarks selected."
+    width = max(len(name) for name in results)
+    lines = [f"{'Benchmark':<{width}}  {'seconds':>9}  {'baseline':>9}  {'change':>8}"]
+    for name, seconds in results.items():
+        expected = baseline.get(name)
+        if expected:
+            lines.append(f"{name:<{width}}  {seconds:>9.4f}  {expected:>9.4f}  {(seconds / expected - 1) * 100:>7.1f}%")
+        else:
+            lines.append(f"{name:<{width}}  {seconds:>9.4f}  {'-':>9}  {'-':>8}")
+    return "\n".join(lines)
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run_benchmarks", description="Offline TerML benchmarks")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma-separated synthetic repo sizes in files (empty to skip)")
+    parser.add_argument("--skip-subcommands", action="store_true", help="Skip the end-to-end subcommand latencies")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark; the fastest is kept")
+    parser.add_argument("--latency", type=float, default=0.02, help="Fake API latency before the first token, in seconds")
+    parser.add_argument("--tokens-per-second", type=float, default=1000, help="Fake API output rate (0 for instant replies)")
+    parser.add_argument("--reply-tokens", type=int, default=100, help="Fake API reply length in tokens")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown over the baseline, as a fraction")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help=f"Baseline file to compare with (default: {BASELINE_PATH})")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "terml-bench"),
+                        help="Where synthetic repos are generated and kept between runs")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    os.makedirs(args.workdir, exist_ok=True)
+    state_dir = tempfile.mkdtemp(prefix="state-", dir=args.workdir)
+    _isolate(state_dir)
+    results = {}
+    try:
+        if not args.skip_subcommands:
+            print("Running subcommand latencies...", file=sys.stderr)
+            results.update(run_subcommands(args, state_dir))
+        for files in sizes:
+            print(f"Running throughput on {files} files...", file=sys.stderr)
+            results.update(run_throughput(args, args.workdir, files))
+    finally:
+        shutil.rmtree(state_dir, ignore_errors=True)
+
+    settings = _settings(args)
+    baseline = load_baseline(args.baseline)
+    comparable = baseline is not None and baseline.get("settings") == settings
+    print(format_results(results, baseline["results"] if comparable else {}))
+
+    if args.save_baseline or baseline is None:
+        save_baseline(args.baseline, settings, results, baseline)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+    if not comparable:
+        print(f"\nError: {args.baseline} was recorded with different settings {baseline.get('settings')}; "
+              "rerun with the same settings or pass --save-baseline.")
+        return 2
+    regressions = compare(results, baseline["results"], args.tolerance)
+    for name, expected, seconds in regressions:
+        print(f"REGRESSION {name}: {seconds:.4f}s vs baseline {expected:.4f}s")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
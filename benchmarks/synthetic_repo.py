@@ -0,0 +1,81 @@
+import json
+import os
+import random
+
+REPO_VERSION = 1
+MARKER = ".terml-bench.json"
+MODULES_PER_PACKAGE = 50
+
+# A deterministic fake project: packages of Python modules (some tripping the
+# analyzer rules), a matching share of test files, plus docs and data files so
+# walks see a realistic mix. Generated once per (files, seed) and reused.
+
+def _module(rng, index):
+    lines = ["import os", "import json as js" if index % 7 == 0 else "import sys", ""]
+    for f in range(rng.randint(2, 6)):
+        body_lines = 60 if index % 97 == 0 and f == 0 else rng.randint(2, 8)
+        lines.append(f"def function_{index}_{f}(value, other=None):")
+        lines.extend(f"    value = value + {n}" for n in range(body_lines))
+        lines.append("    return value")
+        lines.append("")
+    if index % 5 == 0:
+        methods = 12 if index % 45 == 0 else 3
+        lines.append(f"class Model{index}:")
+        for m in range(methods):
+            lines.append(f"    def method_{m}(self):")
+            lines.append(f"        return {m}")
+        lines.append("")
+    return "\n".join(lines) + "\n"
+
+def _test_module(package, module, index):
+    return (
+        f"from {package}.{module} import function_{index}_0\n\n"
+        f"def test_function_{index}_0():\n"
+        f"    assert function_{index}_0(1) is not None\n"
+    )
+
+def _marker(files, seed):
+    return {"version": REPO_VERSION, "files": files, "seed": seed}
+
+def make_repo(root, files, seed=0):
+    marker_path = os.path.join(root, MARKER)
+    try:
+        with open(marker_path, "r") as f:
+            if json.load(f) == _marker(files, seed):
+                return root
+    except (OSError, ValueError):
+        pass
+    rng = random.Random(seed)
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, "requirements.txt"), "w") as f:
+        f.write("click==8.1.3\npytest==7.3.1\nrequests>=2.0\n")
+    with open(os.path.join(root, "README.md"), "w") as f:
+        f.write("# Synthetic benchmark project\n")
+    # 80% sources, 10% tests, 10% other files
+    sources = files * 8 // 10
+    tests = files // 10
+    others = files - sources - tests - 2
+    for index in range(sources):
+        package = f"pkg{index // MODULES_PER_PACKAGE}"
+        directory = os.path.join(root, "src", package)
+        if index % MODULES_PER_PACKAGE == 0:
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, "__init__.py"), "w") as f:
+                f.write("")
+        with open(os.path.join(directory, f"module{index}.py"), "w") as f:
+            f.write(_module(rng, index))
+    for index in range(tests):
+        source = rng.randrange(max(sources, 1))
+        directory = os.path.join(root, "tests", f"pkg{index // MODULES_PER_PACKAGE}")
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"test_module{index}.py"), "w") as f:
+            f.write(_test_module(f"pkg{source // MODULES_PER_PACKAGE}", f"module{source}", source))
+    for index in range(max(others, 0)):
+        directory = os.path.join(root, "data", f"set{index // 100}")
+        os.makedirs(directory, exist_ok=True)
+        suffix = (".json", ".md", ".txt")[index % 3]
+        with open(os.path.join(directory, f"item{index}{suffix}"), "w") as f:
+            f.write(json.dumps({"id": index, "tags": ["a", "b"]}) if suffix == ".json" else f"item {index}\n" * 5)
+    with open(marker_path, "w") as f:
+        json.dump(_marker(files, seed), f)
+    return root
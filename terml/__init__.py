@@ -1,7 +1,22 @@
-from .main import cli
-from .ai_integration import AIIntegration
-from .terminal_handler import TerminalHandler
-from .commands import CommandExecutor
+import importlib
 
 __version__ = "0.2.0"
-__all__ = ['cli', 'AIIntegration', 'TerminalHandler', 'CommandExecutor']
\ No newline at end of file
+__all__ = ['cli', 'AIIntegration', 'TerminalHandler', 'CommandExecutor']
+
+# Resolved on first access so that `import terml` does not pull in the Anthropic SDK
+_LAZY_EXPORTS = {
+    'cli': '.main',
+    'AIIntegration': '.ai_integration',
+    'TerminalHandler': '.terminal_handler',
+    'CommandExecutor': '.commands',
+}
+
+def __getattr__(name):
+    if name not in _LAZY_EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -1,69 +1,297 @@
 import anthropic
+import asyncio
 import os
-from . import config
+import queue
+import threading
+import time
+from . import cassette, config, tracing
+from .coverage_index import select_test_context
+from .output_compactor import compact_output
+from .response_cache import ResponseCache
+from .summarizer import summarize_large_file
+from .token_budget import tokens_to_chars
+from .tree_profiler import format_profile, profile_tree
+
+# The result of AIIntegration.create_message: the reply text, or "Error: ..."
+# with the exception in `error`, plus the usage reported by the API. Iterating
+# yields the text; a streamed reply is filled in as it is iterated.
+class Reply:
+    def __init__(self, text="", usage=None, error=None):
+        self.text = text
+        self.usage = usage
+        self.error = error
+        self._chunks = None
+
+    def __iter__(self):
+        return iter([self.text]) if self._chunks is None else self._chunks
+
+    def failed(self, error):
+        self.error = error
+        self.text = f"Error: {str(error)}"
+        return self
 
 class AIIntegration:
-    def __init__(self):
-        self.client = anthropic.Anthropic(api_key=config.ANTHROPIC_API_KEY)
+    def __init__(self, use_cache=True):
+        self.mode = cassette.ai_mode()
+        # Left unset, a fresh AsyncAnthropic client is opened for each event loop run
+        self.async_client = None
+        if self.mode == "replay":
+            self.client = cassette.ReplayClient(cassette.open_cassette())
+            self.async_client = cassette.AsyncReplayClient(cassette.open_cassette())
+        elif self.mode == "record":
+            self.client = cassette.RecordingClient(anthropic.Anthropic(api_key=config.ANTHROPIC_API_KEY), cassette.open_cassette())
+        else:
+            self.client = anthropic.Anthropic(api_key=config.ANTHROPIC_API_KEY)
         self.model = config.AI_MODEL
+        # Cached replies would bypass the cassette, so record and replay never use the cache
+        use_cache = use_cache and self.mode == "live"
+        self.cache = ResponseCache() if use_cache and config.RESPONSE_CACHE_ENABLED else None
+        self.last_time_to_first_token = None
+        self.time_to_first_token_history = []
+
+    def _build_messages(self, prompt, system_prompt):
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+
+    def _response_text(self, content):
+        if isinstance(content, str):
+            return content
+        return "".join(getattr(block, "text", "") for block in content)
+
+    def _open_async_client(self):
+        client = anthropic.AsyncAnthropic(api_key=config.ANTHROPIC_API_KEY)
+        if self.mode == "record":
+            return cassette.AsyncRecordingClient(client, cassette.open_cassette())
+        return client
+
+    def _usage_fields(self, usage):
+        # Token counts for the trace; anything that is not a count is left out
+        fields = {}
+        for name in ('input_tokens', 'output_tokens', 'cache_read_input_tokens'):
+            value = getattr(usage, name, None)
+            if isinstance(value, int):
+                fields[name] = value
+        return fields
+
+    def _cache_key(self, prompt, system_prompt, max_tokens, cache_ttl):
+        if self.cache is None or cache_ttl <= 0:
+            return None
+        return self.cache.make_key(self.model, system_prompt, prompt, max_tokens)
+
+    def get_ai_response(self, prompt, system_prompt, max_tokens, cache_ttl=0):
+        cache_key = self._cache_key(prompt, system_prompt, max_tokens, cache_ttl)
+        if cache_key is not None:
+            start = time.perf_counter()
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                tracing.record("api.request", time.perf_counter() - start, started=start, max_tokens=max_tokens, cached=True)
+                return cached
+        reply = self.create_message(None, self._build_messages(prompt, system_prompt), max_tokens)
+        if cache_key is not None and reply.error is None:
+            self.cache.put(cache_key, reply.text, cache_ttl)
+        return reply.text
+
+    async def get_ai_response_async(self, prompt, system_prompt, max_tokens, cache_ttl=0, client=None):
+        with tracing.span("api.request", max_tokens=max_tokens) as span:
+            cache_key = self._cache_key(prompt, system_prompt, max_tokens, cache_ttl)
+            if cache_key is not None:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    span["cached"] = True
+                    return cached
+            try:
+                message = await (client or self.async_client).messages.create(
+                    model=self.model,
+                    max_tokens=max_tokens,
+                    messages=self._build_messages(prompt, system_prompt)
+                )
+                response = self._response_text(message.content)
+            except Exception as e:
+                span["error"] = type(e).__name__
+                return f"Error: {str(e)}"
+            span.update(self._usage_fields(getattr(message, "usage", None)))
+        if cache_key is not None:
+            self.cache.put(cache_key, response, cache_ttl)
+        return response
 
-    def get_ai_response(self, prompt, system_prompt, max_tokens):
-        try:
-            message = self.client.messages.create(
-                model=self.model,
-                max_tokens=max_tokens,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            return message.content
-        except Exception as e:
-            return f"Error: {str(e)}"
-
-    def explain_output(self, output):
+    def stream_ai_response(self, prompt, system_prompt, max_tokens, cache_ttl=0):
+        cache_key = self._cache_key(prompt, system_prompt, max_tokens, cache_ttl)
+        if cache_key is not None:
+            start = time.perf_counter()
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                # A cache hit is not an API latency, so it adds no time-to-first-token sample
+                self.last_time_to_first_token = None
+                tracing.record("api.stream", time.perf_counter() - start, started=start, max_tokens=max_tokens, cached=True)
+                yield cached
+                return
+        reply = self.create_message(None, self._build_messages(prompt, system_prompt), max_tokens, stream=True)
+        yield from reply
+        if cache_key is not None and reply.error is None:
+            self.cache.put(cache_key, reply.text, cache_ttl)
+
+    # Every synchronous request goes through here, which owns streaming, time
+    # to first token, the trace span and token usage. `system` is the system
+    # prompt (text or blocks), or None when it is the first of `messages`.
+    # With stream=True the request starts when the Reply is iterated.
+    def create_message(self, system, messages, max_tokens, stream=False):
+        request = {"model": self.model, "max_tokens": max_tokens, "messages": messages}
+        if system is not None:
+            request["system"] = system
+        reply = Reply()
+        if stream:
+            reply._chunks = self._stream_message(reply, request)
+            return reply
+        with tracing.span("api.request", max_tokens=max_tokens) as span:
+            try:
+                message = self.client.messages.create(**request)
+                reply.text = self._response_text(message.content)
+            except Exception as e:
+                span["error"] = type(e).__name__
+                return reply.failed(e)
+            reply.usage = getattr(message, "usage", None)
+            span.update(self._usage_fields(reply.usage))
+        return reply
+
+    def _stream_message(self, reply, request):
+        self.last_time_to_first_token = None
+        start = time.perf_counter()
+        chunks = []
+        with tracing.span("api.stream", max_tokens=request["max_tokens"]) as span:
+            try:
+                with self.client.messages.stream(**request) as stream:
+                    for text in stream.text_stream:
+                        if self.last_time_to_first_token is None:
+                            self._record_time_to_first_token(time.perf_counter() - start)
+                            span["ttft_ms"] = round(self.last_time_to_first_token * 1000, 3)
+                        chunks.append(text)
+                        yield text
+                    try:
+                        reply.usage = stream.get_final_message().usage
+                    except Exception:
+                        pass
+                    span.update(self._usage_fields(reply.usage))
+            except Exception as e:
+                span["error"] = type(e).__name__
+                yield reply.failed(e).text
+                return
+        reply.text = "".join(chunks)
+
+    def _record_time_to_first_token(self, seconds):
+        self.last_time_to_first_token = seconds
+        self.time_to_first_token_history.append(seconds)
+
+    def _respond(self, prompt, system_prompt, max_tokens, cache_ttl, stream):
+        if stream:
+            return self.stream_ai_response(prompt, system_prompt, max_tokens, cache_ttl)
+        return self.get_ai_response(prompt, system_prompt, max_tokens, cache_ttl)
+
+    def explain_output(self, output, stream=False):
+        with tracing.span("prompt.build"):
+            output = compact_output(output, config.EXPLAIN_OUTPUT_TOKEN_BUDGET)
         prompt = f"Explain this terminal output in simple terms: {output}"
-        return self.get_ai_response(prompt, config.EXPLAIN_PROMPT, config.EXPLAIN_MAX_TOKENS)
+        return self._respond(prompt, config.EXPLAIN_PROMPT, config.EXPLAIN_MAX_TOKENS, config.EXPLAIN_CACHE_TTL, stream)
 
-    def suggest_command(self, history):
+    def suggest_command(self, history, stream=False):
         prompt = f"Based on this command history, suggest a helpful next command: {history}"
-        return self.get_ai_response(prompt, config.SUGGEST_PROMPT, config.SUGGEST_MAX_TOKENS)
+        return self._respond(prompt, config.SUGGEST_PROMPT, config.SUGGEST_MAX_TOKENS, config.SUGGEST_CACHE_TTL, stream)
 
-    def debug_command(self, command, output):
+    def debug_command(self, command, output, stream=False):
+        with tracing.span("prompt.build"):
+            output = compact_output(output, config.DEBUG_OUTPUT_TOKEN_BUDGET)
         prompt = f"Debug this command and its output. Explain what might have gone wrong and suggest a correction:\nCommand: {command}\nOutput: {output}"
-        return self.get_ai_response(prompt, config.DEBUG_PROMPT, config.DEBUG_MAX_TOKENS)
+        return self._respond(prompt, config.DEBUG_PROMPT, config.DEBUG_MAX_TOKENS, config.DEBUG_CACHE_TTL, stream)
 
     def generate_auto_commands(self, goal, tech_stack):
         prompt = f"Generate a command to help set up a project with the following goal: '{goal}' and tech stack: '{tech_stack}'. Provide the command and a detailed explanation of what it does."
-        return self.get_ai_response(prompt, config.AUTO_PROMPT, config.AUTO_MAX_TOKENS)
+        return self.get_ai_response(prompt, config.AUTO_PROMPT, config.AUTO_MAX_TOKENS, config.AUTO_CACHE_TTL)
+
+    def plan_auto_steps(self, goal, tech_stack, completed=None, remaining=None):
+        prompt = f"Goal: '{goal}'\nTech stack: '{tech_stack}'"
+        if completed:
+            prompt += f"\n\nSteps already run:\n{completed}"
+        if remaining:
+            prompt += f"\n\nCurrently planned next steps:\n{remaining}"
+        return self.get_ai_response(prompt, config.AUTO_PLAN_PROMPT, config.AUTO_PLAN_MAX_TOKENS, config.AUTO_CACHE_TTL)
 
-    def chat_response(self, user_input):
+    def chat_response(self, user_input, stream=False):
         prompt = f"Respond to this user query about terminal usage or programming: {user_input}"
-        return self.get_ai_response(prompt, config.CHAT_PROMPT, config.CHAT_MAX_TOKENS)
+        return self._respond(prompt, config.CHAT_PROMPT, config.CHAT_MAX_TOKENS, config.CHAT_CACHE_TTL, stream)
 
-    def summarize_contents(self, path):
+    def summarize_contents(self, path, depth=None):
         if os.path.isfile(path):
+            # Read at most one chunk's worth up front; larger files are summarized in chunks
+            limit = tokens_to_chars(config.SUMMARIZE_CHUNK_TOKENS)
             with open(path, 'r') as file:
-                content = file.read()
+                content = file.read(limit + 1)
+            if len(content) > limit:
+                return summarize_large_file(self, path)
             prompt = f"Summarize the contents of this file:\n\n{content}"
         elif os.path.isdir(path):
-            files = os.listdir(path)
-            prompt = f"Summarize the contents of this directory:\n\n{', '.join(files)}"
+            with tracing.span("prompt.build"):
+                profile = format_profile(profile_tree(path, max_depth=depth))
+            prompt = f"Summarize the contents of this directory from its profile (file counts, sizes, file types and largest files per subtree):\n\n{profile}"
         else:
             return "Error: The specified path is neither a file nor a directory."
 
-        return self.get_ai_response(prompt, config.SUMMARIZE_PROMPT, config.SUMMARIZE_MAX_TOKENS)
+        return self.get_ai_response(prompt, config.SUMMARIZE_PROMPT, config.SUMMARIZE_MAX_TOKENS, config.SUMMARIZE_CACHE_TTL)
 
     def suggest_code_improvements(self, analysis_summary):
         prompt = f"Based on the following code analysis summary, suggest improvements and best practices:\n\n{analysis_summary}"
-        return self.get_ai_response(prompt, config.CODE_IMPROVEMENT_PROMPT, config.CODE_IMPROVEMENT_MAX_TOKENS)
+        return self.get_ai_response(prompt, config.CODE_IMPROVEMENT_PROMPT, config.CODE_IMPROVEMENT_MAX_TOKENS, config.CODE_IMPROVEMENT_CACHE_TTL)
+
+    def iter_code_improvements(self, issues, group_size=None, concurrency=None):
+        # Sends the issues of each group of files as its own request, at most
+        # `concurrency` at a time, and yields (file_paths, suggestions) pairs in
+        # completion order. The event loop runs on a helper thread so callers
+        # can consume results with a plain for loop.
+        from .code_analyzer import get_analysis_summary
+        group_size = group_size or config.CODE_IMPROVEMENT_GROUP_SIZE
+        concurrency = concurrency or config.CODE_IMPROVEMENT_CONCURRENCY
+        items = list(issues.items())
+        groups = [dict(items[i:i + group_size]) for i in range(0, len(items), group_size)]
+        results = queue.Queue()
+        done = object()
+
+        async def suggest(client, semaphore, group):
+            prompt = f"Based on the following code analysis summary, suggest improvements and best practices:\n\n{get_analysis_summary(group)}"
+            async with semaphore:
+                response = await self.get_ai_response_async(
+                    prompt, config.CODE_IMPROVEMENT_PROMPT, config.CODE_IMPROVEMENT_MAX_TOKENS,
+                    config.CODE_IMPROVEMENT_CACHE_TTL, client=client
+                )
+            results.put((list(group), response))
+
+        async def suggest_all():
+            semaphore = asyncio.Semaphore(concurrency)
+            client = self.async_client or self._open_async_client()
+            try:
+                await asyncio.gather(*(suggest(client, semaphore, group) for group in groups))
+            finally:
+                if client is not self.async_client:
+                    await client.close()
+
+        def run():
+            try:
+                asyncio.run(suggest_all())
+            except Exception as e:
+                results.put(([], f"Error: {str(e)}"))
+            finally:
+                results.put(done)
+
+        worker = threading.Thread(target=run, daemon=True)
+        worker.start()
+        while True:
+            result = results.get()
+            if result is done:
+                break
+            yield result
+        worker.join()
 
     def suggest_test_improvements(self, project_path):
-        test_files = [f for f in os.listdir(project_path) if f.startswith('test_') and f.endswith('.py')]
-        test_contents = ""
-        for test_file in test_files:
-            with open(os.path.join(project_path, test_file), 'r') as f:
-                test_contents += f"File: {test_file}\n{f.read()}\n\n"
-        
+        with tracing.span("prompt.build"):
+            test_contents = select_test_context(project_path)
         prompt = f"Analyze the following test files and suggest improvements for better test coverage and quality:\n\n{test_contents}"
-        return self.get_ai_response(prompt, config.TEST_IMPROVEMENT_PROMPT, config.TEST_IMPROVEMENT_MAX_TOKENS)
\ No newline at end of file
+        return self.get_ai_response(prompt, config.TEST_IMPROVEMENT_PROMPT, config.TEST_IMPROVEMENT_MAX_TOKENS, config.TEST_IMPROVEMENT_CACHE_TTL)
\ No newline at end of file
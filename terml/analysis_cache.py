@@ -0,0 +1,89 @@
+import hashlib
+import json
+import os
+import tempfile
+from . import config
+
+def content_digest(data):
+    return hashlib.sha1(data).hexdigest()
+
+def file_digest(file_path):
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+# Per-file analysis results for one project, keyed by path relative to the
+# project and validated by mtime and size, falling back to a content hash.
+class AnalysisCache:
+    def __init__(self, project_path, version, path=None):
+        self.project_path = os.path.abspath(project_path)
+        self.version = str(version)
+        project_key = hashlib.sha1(self.project_path.encode('utf-8')).hexdigest()[:16]
+        self.path = path or os.path.join(config.CACHE_DIR, 'analysis', f'{project_key}.json')
+        self.entries = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') == self.version:
+            self.entries = data.get('files', {})
+
+    def _key(self, file_path):
+        return os.path.relpath(os.path.abspath(file_path), self.project_path)
+
+    def lookup(self, file_path, stat):
+        entry = self.entries.get(self._key(file_path))
+        if entry is None or entry['size'] != stat.st_size:
+            return None
+        if entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry['issues']
+        # Touched but possibly unchanged: compare content before re-parsing
+        try:
+            digest = file_digest(file_path)
+        except OSError:
+            return None
+        if digest != entry['digest']:
+            return None
+        entry['mtime_ns'] = stat.st_mtime_ns
+        self._dirty = True
+        return entry['issues']
+
+    def store(self, file_path, stat, digest, issues):
+        self.entries[self._key(file_path)] = {
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'digest': digest,
+            'issues': issues,
+        }
+        self._dirty = True
+
+    def prune(self, file_paths):
+        keep = {self._key(file_path) for file_path in file_paths}
+        for key in [key for key in self.entries if key not in keep]:
+            del self.entries[key]
+            self._dirty = True
+
+    def save(self):
+        if not self._dirty:
+            return
+        directory = os.path.dirname(self.path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'version': self.version, 'files': self.entries}, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            os.unlink(tmp_path)
+            return
+        self._dirty = False
@@ -0,0 +1,129 @@
+import json
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from . import config
+from .output_compactor import compact_output
+
+PlanStep = namedtuple('PlanStep', ['command', 'explanation'])
+
+def parse_plan(text):
+    # The model is asked for bare JSON but may wrap it in a code fence or prose
+    start = text.find('{')
+    end = text.rfind('}')
+    if start == -1 or end < start:
+        raise ValueError("no JSON object in the plan")
+    data = json.loads(text[start:end + 1])
+    if not isinstance(data, dict) or not isinstance(data.get('steps', []), list):
+        raise ValueError("the plan has no list of steps")
+    steps = []
+    for step in data.get('steps', []):
+        if not isinstance(step, dict):
+            continue
+        command = str(step.get('command', '')).strip()
+        if command:
+            steps.append(PlanStep(command, str(step.get('explanation', '')).strip()))
+    return steps
+
+def _format_steps(steps):
+    return "\n".join(f"{i}. {step.command}  # {step.explanation}" for i, step in enumerate(steps, 1))
+
+# Drives `terml auto`: one call plans every step, and the results of finished
+# steps are fed back to re-plan the rest. While the user is still reading the
+# confirmation prompt, the re-plan that assumes the shown step succeeds is
+# already running in the background. It is used only if the step succeeds with
+# little or no output; otherwise the rest is re-planned from the real output.
+class AutoPlanner:
+    def __init__(self, ai_integration, goal, tech_stack, prefetch=None):
+        self.ai = ai_integration
+        self.goal = goal
+        self.tech_stack = tech_stack
+        self.prefetch_enabled = config.AUTO_PREFETCH if prefetch is None else prefetch
+        self.steps = []
+        self.completed = []
+        self._pool = None
+        self._speculation = None
+
+    def plan(self):
+        # Returns an error message, or None once self.steps holds the plan
+        response = self.ai.plan_auto_steps(self.goal, self.tech_stack)
+        if response.startswith("Error:"):
+            return response
+        try:
+            self.steps = parse_plan(response)
+        except ValueError as e:
+            return f"Error: Could not read the plan: {str(e)}"
+        return None
+
+    def next_step(self):
+        return self.steps[0] if self.steps else None
+
+    def _completed_text(self, completed):
+        lines = []
+        for step, exit_code, output in completed:
+            status = "skipped" if exit_code == "skipped" else f"exit status {exit_code}"
+            lines.append(f"$ {step.command}  ({status})")
+            if output:
+                lines.append(compact_output(output, config.AUTO_STEP_OUTPUT_TOKEN_BUDGET))
+        return "\n".join(lines)
+
+    def _replan(self, completed, remaining):
+        response = self.ai.plan_auto_steps(
+            self.goal, self.tech_stack, self._completed_text(completed), _format_steps(remaining)
+        )
+        if response.startswith("Error:"):
+            return None
+        try:
+            return parse_plan(response)
+        except ValueError:
+            return None
+
+    def prefetch(self, step):
+        # Speculate that `step` succeeds; its output is not known yet
+        if not self.prefetch_enabled or step is not self.next_step():
+            return
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=1)
+        completed = self.completed + [(step, 0, "")]
+        future = self._pool.submit(self._replan, completed, self.steps[1:])
+        self._speculation = (step, len(self.completed), future)
+
+    def _take_speculation(self, step):
+        speculation, self._speculation = self._speculation, None
+        if speculation is None:
+            return None
+        speculated_step, basis, future = speculation
+        if speculated_step is not step or basis != len(self.completed) - 1:
+            future.cancel()
+            return None
+        return future.result()
+
+    def complete(self, step, exit_code, output=""):
+        self.steps.remove(step)
+        self.completed.append((step, exit_code, output))
+        if exit_code == 0 and len(output.strip()) <= config.AUTO_TRIVIAL_OUTPUT_CHARS:
+            steps = self._take_speculation(step)
+            if steps is None:
+                # No usable speculation: carry on with the existing plan
+                return
+        else:
+            self._discard_speculation()
+            steps = self._replan(self.completed, self.steps)
+            if steps is None:
+                return
+        self.steps = steps
+
+    def skip(self, step):
+        self._discard_speculation()
+        self.steps.remove(step)
+        self.completed.append((step, "skipped", ""))
+
+    def _discard_speculation(self):
+        if self._speculation is not None:
+            self._speculation[2].cancel()
+            self._speculation = None
+
+    def close(self):
+        self._discard_speculation()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
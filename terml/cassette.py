@@ -0,0 +1,214 @@
+import hashlib
+import json
+import os
+import threading
+from types import SimpleNamespace
+from . import config
+
+AI_MODES = ("live", "record", "replay")
+
+# Record/replay for the AI layer (TERML_AI_MODE=record|replay, TERML_CASSETTE=path).
+# A cassette is a JSON-lines file with one line per reply: the key of the
+# normalized request, the reply text and its token counts. Request bodies are
+# not stored. In record mode, every completed reply from the live API is
+# appended. In replay mode, replies are served from an in-memory index without
+# touching the network. When one request was recorded several times, its
+# replies are served in recording order and the last one repeats.
+
+class CassetteMiss(LookupError):
+    pass
+
+def _text(content):
+    if content is None:
+        return None
+    if isinstance(content, str):
+        return content.strip()
+    return "\n".join(block.get("text", "").strip() for block in content if block.get("type", "text") == "text")
+
+def normalize_request(model, max_tokens, messages, system=None):
+    # What decides the reply: cache_control markers and surrounding whitespace do not
+    return {
+        "model": model,
+        "max_tokens": max_tokens,
+        "system": _text(system),
+        "messages": [[message["role"], _text(message["content"])] for message in messages],
+    }
+
+def request_key(model, max_tokens, messages, system=None):
+    data = json.dumps(normalize_request(model, max_tokens, messages, system), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()[:32]
+
+def _usage(message):
+    usage = getattr(message, "usage", None)
+    counts = [getattr(usage, name, 0) for name in ("input_tokens", "output_tokens")]
+    return [count if isinstance(count, int) else 0 for count in counts]
+
+def _message(entry):
+    return SimpleNamespace(
+        content=[SimpleNamespace(type="text", text=entry["t"])],
+        usage=SimpleNamespace(input_tokens=entry["u"][0], output_tokens=entry["u"][1]),
+    )
+
+class Cassette:
+    def __init__(self, path):
+        self.path = path
+        self._index = {}
+        self._served = {}
+        self._lock = threading.Lock()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+        except OSError:
+            lines = []
+        for line in lines:
+            try:
+                entry = json.loads(line)
+                self._index.setdefault(entry["k"], []).append(entry)
+            except (ValueError, KeyError, TypeError):
+                continue
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._index.values())
+
+    def lookup(self, key):
+        with self._lock:
+            entries = self._index.get(key)
+            if not entries:
+                raise CassetteMiss(f"No recorded response for this request in {self.path}")
+            served = self._served.get(key, 0)
+            self._served[key] = served + 1
+            return entries[min(served, len(entries) - 1)]
+
+    def record(self, key, text, usage):
+        entry = {"k": key, "t": text, "u": usage}
+        line = json.dumps(entry, separators=(",", ":"), ensure_ascii=False) + "\n"
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+            self._index.setdefault(key, []).append(entry)
+
+_cassettes = {}
+
+def open_cassette(path=None):
+    # One instance per path, so sync and async clients share an index and a file
+    path = os.path.abspath(path or config.AI_CASSETTE)
+    if path not in _cassettes:
+        _cassettes[path] = Cassette(path)
+    return _cassettes[path]
+
+def ai_mode():
+    mode = config.AI_MODE.lower()
+    if mode not in AI_MODES:
+        raise ValueError(f"Unknown AI mode '{config.AI_MODE}'; use one of: {', '.join(AI_MODES)}")
+    return mode
+
+class _ReplayStream:
+    def __init__(self, entry):
+        self._entry = entry
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    @property
+    def text_stream(self):
+        return iter([self._entry["t"]])
+
+    def get_final_message(self):
+        return _message(self._entry)
+
+class _ReplayMessages:
+    def __init__(self, cassette):
+        self._cassette = cassette
+
+    def create(self, model, max_tokens, messages, system=None, **kwargs):
+        return _message(self._cassette.lookup(request_key(model, max_tokens, messages, system)))
+
+    def stream(self, model, max_tokens, messages, system=None, **kwargs):
+        return _ReplayStream(self._cassette.lookup(request_key(model, max_tokens, messages, system)))
+
+class ReplayClient:
+    def __init__(self, cassette):
+        self.messages = _ReplayMessages(cassette)
+
+class _AsyncReplayMessages(_ReplayMessages):
+    async def create(self, model, max_tokens, messages, system=None, **kwargs):
+        return _ReplayMessages.create(self, model, max_tokens, messages, system)
+
+class AsyncReplayClient:
+    def __init__(self, cassette):
+        self.messages = _AsyncReplayMessages(cassette)
+
+    async def close(self):
+        pass
+
+class _RecordingStream:
+    def __init__(self, manager, cassette, key):
+        self._manager = manager
+        self._cassette = cassette
+        self._key = key
+        self._stream = None
+
+    def __enter__(self):
+        self._stream = self._manager.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        return self._manager.__exit__(*exc_info)
+
+    @property
+    def text_stream(self):
+        # Only a reply streamed to the end is recorded
+        chunks = []
+        for text in self._stream.text_stream:
+            chunks.append(text)
+            yield text
+        self._cassette.record(self._key, "".join(chunks), _usage(self._stream.get_final_message()))
+
+    def get_final_message(self):
+        return self._stream.get_final_message()
+
+def _reply_text(message):
+    return "".join(getattr(block, "text", "") for block in message.content)
+
+class _RecordingMessages:
+    def __init__(self, messages, cassette):
+        self._messages = messages
+        self._cassette = cassette
+
+    def create(self, model, max_tokens, messages, system=None, **kwargs):
+        if system is not None:
+            kwargs["system"] = system
+        message = self._messages.create(model=model, max_tokens=max_tokens, messages=messages, **kwargs)
+        self._cassette.record(request_key(model, max_tokens, messages, system), _reply_text(message), _usage(message))
+        return message
+
+    def stream(self, model, max_tokens, messages, system=None, **kwargs):
+        if system is not None:
+            kwargs["system"] = system
+        manager = self._messages.stream(model=model, max_tokens=max_tokens, messages=messages, **kwargs)
+        return _RecordingStream(manager, self._cassette, request_key(model, max_tokens, messages, system))
+
+class RecordingClient:
+    def __init__(self, client, cassette):
+        self._client = client
+        self.messages = _RecordingMessages(client.messages, cassette)
+
+class _AsyncRecordingMessages(_RecordingMessages):
+    async def create(self, model, max_tokens, messages, system=None, **kwargs):
+        if system is not None:
+            kwargs["system"] = system
+        message = await self._messages.create(model=model, max_tokens=max_tokens, messages=messages, **kwargs)
+        self._cassette.record(request_key(model, max_tokens, messages, system), _reply_text(message), _usage(message))
+        return message
+
+class AsyncRecordingClient:
+    def __init__(self, client, cassette):
+        self._client = client
+        self.messages = _AsyncRecordingMessages(client.messages, cassette)
+
+    async def close(self):
+        await self._client.close()
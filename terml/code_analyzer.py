@@ -1,52 +1,170 @@
 import ast
+import functools
 import os
+from concurrent.futures import ProcessPoolExecutor
+from . import config, tracing
+from .analysis_cache import AnalysisCache, content_digest
+from .fs_walker import walk_files
+
+# Bump whenever a rule changes so cached per-file results are discarded
+RULESET_VERSION = 2
+
+# name -> (node types, check function, enabled by default). A check takes one
+# AST node and returns the issues it found for it.
+RULES = {}
+
+def register_rule(name, node_types, check, enabled=True):
+    RULES[name] = (tuple(node_types), check, enabled)
+    _dispatch_tables.clear()
+
+def rule(name, *node_types, enabled=True):
+    def decorator(check):
+        register_rule(name, node_types, check, enabled)
+        return check
+    return decorator
+
+def active_rules():
+    return sorted(
+        name for name, (_, _, enabled) in RULES.items()
+        if (enabled or name in config.ENABLED_ANALYZER_RULES) and name not in config.DISABLED_ANALYZER_RULES
+    )
+
+def ruleset_version(rule_names=None):
+    return f"{RULESET_VERSION}:{','.join(active_rules() if rule_names is None else rule_names)}"
+
+_dispatch_tables = {}
+
+def build_dispatch_table(rule_names):
+    key = tuple(rule_names)
+    if key not in _dispatch_tables:
+        table = {}
+        for name in key:
+            node_types, check, _ = RULES[name]
+            for node_type in node_types:
+                table.setdefault(node_type, []).append(check)
+        _dispatch_tables[key] = table
+    return _dispatch_tables[key]
+
+@rule("long-function", ast.FunctionDef)
+def check_long_function(node):
+    if len(node.body) > 50:
+        return [f"Function '{node.name}' is too long ({len(node.body)} lines). Consider refactoring."]
+    return []
+
+@rule("too-many-methods", ast.ClassDef)
+def check_too_many_methods(node):
+    methods = [n for n in node.body if isinstance(n, ast.FunctionDef)]
+    if len(methods) > 10:
+        return [f"Class '{node.name}' has too many methods ({len(methods)}). Consider splitting it."]
+    return []
+
+@rule("import-alias", ast.Import)
+def check_import_alias(node):
+    return [
+        f"Consider using 'from {alias.name} import {alias.asname}' instead of 'import {alias.name} as {alias.asname}'"
+        for alias in node.names if alias.asname
+    ]
 
 class CodeAnalyzer:
-    def __init__(self):
+    def __init__(self, rule_names=None, hash_content=False):
         self.issues = []
+        self.dispatch = build_dispatch_table(active_rules() if rule_names is None else rule_names)
+        self.hash_content = hash_content
+        # (stat, digest) of the bytes behind the last analyze_file, for the cache
+        self.fingerprint = None
 
     def analyze_file(self, file_path):
-        self.issues = []
-        with open(file_path, 'r') as file:
+        # The file is read once, so the stat, the digest and the issues all
+        # describe the same bytes; nothing is hashed unless asked for
+        with open(file_path, 'rb') as file:
+            stat = os.fstat(file.fileno())
             content = file.read()
-        tree = ast.parse(content)
-        self.visit(tree)
-        return self.issues
-
-    def visit(self, node):
-        for child in ast.iter_child_nodes(node):
-            method = getattr(self, f'visit_{child.__class__.__name__}', None)
-            if method:
-                method(child)
-            self.visit(child)
-
-    def visit_FunctionDef(self, node):
-        if len(node.body) > 50:
-            self.issues.append(f"Function '{node.name}' is too long ({len(node.body)} lines). Consider refactoring.")
-
-    def visit_ClassDef(self, node):
-        methods = [n for n in node.body if isinstance(n, ast.FunctionDef)]
-        if len(methods) > 10:
-            self.issues.append(f"Class '{node.name}' has too many methods ({len(methods)}). Consider splitting it.")
-
-    def visit_Import(self, node):
-        for alias in node.names:
-            if alias.asname:
-                self.issues.append(f"Consider using 'from {alias.name} import {alias.asname}' instead of 'import {alias.name} as {alias.asname}'")
-
-def analyze_project(project_path):
-    analyzer = CodeAnalyzer()
-    all_issues = {}
-
-    for root, _, files in os.walk(project_path):
-        for file in files:
-            if file.endswith('.py'):
-                file_path = os.path.join(root, file)
-                issues = analyzer.analyze_file(file_path)
-                if issues:
-                    all_issues[file_path] = issues
-
-    return all_issues
+        self.fingerprint = (stat, content_digest(content)) if self.hash_content else None
+        return self.analyze_tree(ast.parse(content))
+
+    def analyze_tree(self, tree):
+        # Iterative pre-order walk: one traversal runs every rule, and deeply
+        # nested generated code cannot hit the recursion limit.
+        issues = []
+        dispatch = self.dispatch
+        stack = list(ast.iter_child_nodes(tree))
+        stack.reverse()
+        while stack:
+            node = stack.pop()
+            checks = dispatch.get(type(node))
+            if checks:
+                for check in checks:
+                    issues.extend(check(node))
+            children = list(ast.iter_child_nodes(node))
+            children.reverse()
+            stack.extend(children)
+        self.issues = issues
+        return issues
+
+def _analyze_one(analyzer, file_path):
+    analyzer.fingerprint = None
+    issues = analyzer.analyze_file(file_path)
+    return file_path, issues, analyzer.fingerprint
+
+def _analyze_batch(rule_names, hash_content, file_paths):
+    analyzer = CodeAnalyzer(rule_names=rule_names, hash_content=hash_content)
+    return [_analyze_one(analyzer, file_path) for file_path in file_paths]
+
+def _chunked(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+def _resolve_jobs(jobs):
+    if jobs is None:
+        jobs = config.ANALYZE_JOBS
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+    return jobs
+
+# The rule names are resolved once by the caller, so every worker applies the
+# rule set recorded in the cache key whatever its own copy of config says
+def _analyze_files(file_paths, jobs, rule_names, hash_content):
+    jobs = _resolve_jobs(jobs)
+    analyze_batch = functools.partial(_analyze_batch, rule_names, hash_content)
+    if jobs > 1 and len(file_paths) > config.ANALYZE_CHUNK_SIZE:
+        # Several chunks per worker keep the pool balanced when file sizes vary;
+        # map() yields batches in submission order, so the merge stays deterministic.
+        chunk_size = max(1, min(config.ANALYZE_CHUNK_SIZE, len(file_paths) // (jobs * 4)))
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            return [result for batch in pool.map(analyze_batch, _chunked(file_paths, chunk_size)) for result in batch]
+    return analyze_batch(file_paths)
+
+@tracing.traced("analyze")
+def analyze_project(project_path, jobs=None, use_cache=True):
+    entries = list(walk_files(project_path, suffixes=('.py',)))
+    file_paths = [entry.path for entry in entries]
+
+    rule_names = active_rules()
+    cache = AnalysisCache(project_path, ruleset_version(rule_names)) if use_cache and config.ANALYSIS_CACHE_ENABLED else None
+    results = {}
+    stale = []
+    for entry in entries:
+        file_path = entry.path
+        issues = None
+        if cache is not None:
+            try:
+                issues = cache.lookup(file_path, entry.stat())
+            except OSError:
+                pass
+        if issues is None:
+            stale.append(file_path)
+        else:
+            results[file_path] = issues
+
+    for file_path, issues, fingerprint in _analyze_files(stale, jobs, rule_names, cache is not None):
+        results[file_path] = issues
+        if cache is not None and fingerprint is not None:
+            cache.store(file_path, fingerprint[0], fingerprint[1], issues)
+
+    if cache is not None:
+        cache.prune(file_paths)
+        cache.save()
+
+    return {file_path: results[file_path] for file_path in file_paths if results[file_path]}
 
 def get_analysis_summary(issues):
     total_issues = sum(len(file_issues) for file_issues in issues.values())
@@ -1,15 +1,37 @@
 import click
+import inspect
 import os
-from . import config
-from .project_templates import create_project_structure, list_available_templates
-from .code_analyzer import analyze_project, get_analysis_summary
-from .test_generator import generate_and_write_tests
-from .dependency_manager import get_dependency_info, update_dependencies, add_dependency, remove_dependency
+import time
+from . import config, tracing
 
+def _pop_option(args, name, default=None):
+    if name not in args:
+        return default, args
+    index = args.index(name)
+    if index + 1 >= len(args):
+        raise click.UsageError(f"Option '{name}' requires a value.")
+    return args[index + 1], args[:index] + args[index + 2:]
+
+def _pop_flag(args, name):
+    if name not in args:
+        return False, args
+    return True, [arg for arg in args if arg != name]
+
+# Subsystems are imported inside the handlers that use them so each command
+# only loads what it needs.
 class CommandExecutor:
-    def __init__(self, terminal_handler, ai_integration):
+    def __init__(self, terminal_handler, ai_integration=None, use_cache=True):
         self.terminal_handler = terminal_handler
-        self.ai_integration = ai_integration
+        self._ai_integration = ai_integration
+        self.use_cache = use_cache
+
+    @property
+    def ai_integration(self):
+        if self._ai_integration is None:
+            with tracing.span("import.ai"):
+                from .ai_integration import AIIntegration
+                self._ai_integration = AIIntegration(use_cache=self.use_cache)
+        return self._ai_integration
 
     def execute(self, command):
         parts = command.split()
@@ -33,70 +55,104 @@ class CommandExecutor:
         }
 
         if subcommand in command_map:
-            command_map[subcommand](args)
+            with tracing.span("execute", subcommand=subcommand):
+                command_map[subcommand](args)
         else:
             click.echo(f"Unknown TerML command. Use 'terml --help' for available commands.")
 
+    def _echo_response(self, prefix, response):
+        if not inspect.isgenerator(response):
+            click.echo(f"{prefix}{response}")
+            return
+        click.echo(prefix, nl=False)
+        for chunk in response:
+            click.echo(chunk, nl=False)
+        click.echo()
+
     def _explain(self, args):
         last_output = self.terminal_handler.get_last_output()
-        explanation = self.ai_integration.explain_output(last_output)
-        click.echo(f"TerML: {explanation}")
+        explanation = self.ai_integration.explain_output(last_output, stream=config.STREAM_RESPONSES)
+        self._echo_response("TerML: ", explanation)
 
     def _suggest(self, args):
         history = self.terminal_handler.get_formatted_history()
-        suggestion = self.ai_integration.suggest_command(history)
-        click.echo(f"TerML suggests: {suggestion}")
+        suggestion = self.ai_integration.suggest_command(history, stream=config.STREAM_RESPONSES)
+        self._echo_response("TerML suggests: ", suggestion)
 
     def _chat(self, args):
         if not args or args[0] != "-q":
             click.echo("Error: The chat command requires the -q (quick) argument.")
             return
+        from .conversation import Conversation
         click.echo("TerML: Welcome to quick chat mode. Type 'exit' to leave.")
+        conversation = Conversation(self.ai_integration)
         while True:
             user_input = click.prompt("You")
             if user_input.lower() == 'exit':
                 click.echo("TerML: Exiting chat mode.")
                 break
-            response = self.ai_integration.chat_response(user_input)
-            click.echo(f"TerML: {response}")
+            response = conversation.send(user_input, stream=config.STREAM_RESPONSES)
+            self._echo_response("TerML: ", response)
 
     def _debug(self, args):
         last_command = self.terminal_handler.get_last_command()
         last_output = self.terminal_handler.get_last_output()
-        debug_info = self.ai_integration.debug_command(last_command, last_output)
-        click.echo(f"TerML: {debug_info}")
+        debug_info = self.ai_integration.debug_command(last_command, last_output, stream=config.STREAM_RESPONSES)
+        self._echo_response("TerML: ", debug_info)
 
     def _auto(self, args):
         if not args or args[0] != "--with-user":
             click.echo("Error: The auto command requires the --with-user argument for safety.")
             return
+        from .auto_planner import AutoPlanner
         click.echo("TerML: Entering auto mode. I'll suggest commands to help you set up your project.")
         goal = click.prompt("What are you trying to achieve?")
         tech_stack = click.prompt("What tech stack are you using?")
-        while True:
-            suggestion = self.ai_integration.generate_auto_commands(goal, tech_stack)
-            click.echo(f"TerML suggests: {suggestion}")
-            click.echo("This command will: [explanation of what the command does]")
-            if click.confirm("Would you like to proceed?"):
-                output, error = self.terminal_handler.execute_command(suggestion)
-                click.echo(output)
-                if error:
-                    click.echo(f"Error: {error}")
-            else:
-                click.echo("Command skipped.")
-            if not click.confirm("Continue auto mode?"):
-                click.echo("TerML: Exiting auto mode.")
-                break
+        planner = AutoPlanner(self.ai_integration, goal, tech_stack)
+        error = planner.plan()
+        if error:
+            click.echo(error)
+            return
+        try:
+            while True:
+                step = planner.next_step()
+                if step is None:
+                    click.echo("TerML: All planned steps are done.")
+                    break
+                click.echo(f"TerML suggests: {step.command}")
+                click.echo(f"This command will: {step.explanation}")
+                planner.prefetch(step)
+                if click.confirm("Would you like to proceed?"):
+                    # Output is shown live while the command runs, so it is not echoed again
+                    _, error = self.terminal_handler.execute_command(step.command, echo=True)
+                    exit_code = self.terminal_handler.last_exit_code
+                    if exit_code is None:
+                        click.echo(f"Error: {error}")
+                        planner.complete(step, -1, error)
+                    else:
+                        if exit_code:
+                            click.echo(f"Error: command exited with status {exit_code}")
+                        planner.complete(step, exit_code, self.terminal_handler.last_output)
+                else:
+                    click.echo("Command skipped.")
+                    planner.skip(step)
+                if not click.confirm("Continue auto mode?"):
+                    click.echo("TerML: Exiting auto mode.")
+                    break
+        finally:
+            planner.close()
 
     def _summarize(self, args):
+        depth, args = _pop_option(args, "--depth")
         if not args:
             click.echo("Error: The summarize command requires a path argument.")
             return
         path = args[0]
-        summary = self.ai_integration.summarize_contents(path)
+        summary = self.ai_integration.summarize_contents(path, depth=int(depth) if depth is not None else None)
         click.echo(f"TerML Summary: {summary}")
 
     def _generate_project(self, args):
+        from .project_templates import create_project_structure, list_available_templates
         if len(args) != 2:
             click.echo("Error: The generate command requires two arguments: project type and project name.")
             click.echo(f"Available project types: {', '.join(list_available_templates())}")
@@ -110,6 +166,9 @@ class CommandExecutor:
             click.echo(f"Available project types: {', '.join(list_available_templates())}")
 
     def _analyze_code(self, args):
+        from .code_analyzer import analyze_project, get_analysis_summary
+        jobs, args = _pop_option(args, "--jobs")
+        per_file, args = _pop_flag(args, "--per-file")
         if not args:
             click.echo("Error: The analyze command requires a path argument.")
             return
@@ -117,17 +176,23 @@ class CommandExecutor:
         if not os.path.exists(path):
             click.echo(f"Error: The path '{path}' does not exist.")
             return
-        issues = analyze_project(path)
+        issues = analyze_project(path, jobs=int(jobs) if jobs is not None else None, use_cache=self.use_cache)
         summary = get_analysis_summary(issues)
         click.echo(summary)
         
         # AI-powered suggestions for improvements
-        if issues:
+        if issues and per_file:
+            click.echo("\nTerML AI Suggestions:")
+            for file_paths, suggestions in self.ai_integration.iter_code_improvements(issues):
+                click.echo(f"\n{', '.join(file_paths)}:")
+                click.echo(suggestions)
+        elif issues:
             suggestions = self.ai_integration.suggest_code_improvements(summary)
             click.echo("\nTerML AI Suggestions:")
             click.echo(suggestions)
 
     def _generate_tests(self, args):
+        from .test_generator import generate_and_write_tests
         if not args:
             click.echo("Error: The test command requires a path argument.")
             return
@@ -139,10 +204,14 @@ class CommandExecutor:
             click.echo(f"Error: The path '{path}' is not a directory.")
             return
         
-        generated_tests = generate_and_write_tests(path)
-        click.echo(f"Generated {len(generated_tests)} test files:")
-        for test_file in generated_tests:
+        report = generate_and_write_tests(path, use_cache=self.use_cache)
+        click.echo(f"Test scaffolds: {report.summary()}")
+        for test_file in report.written:
             click.echo(f"  - {test_file}")
+        for test_file in report.preserved:
+            click.echo(f"  - {test_file} (edited, left unchanged)")
+        for source, error in report.errors:
+            click.echo(f"  - {source}: {error}")
         
         # AI-powered suggestions for test improvements
         suggestions = self.ai_integration.suggest_test_improvements(path)
@@ -150,17 +219,24 @@ class CommandExecutor:
         click.echo(suggestions)
 
     def _manage_dependencies(self, args):
+        from .dependency_manager import get_dependency_info, update_dependencies, add_dependencies, remove_dependencies, parse_dependency_args
         if not args:
             click.echo("Error: The deps command requires a subcommand (list, update, add, remove).")
             return
         
+        offline, args = _pop_flag(args, "--offline")
         subcommand = args[0]
         project_path = os.getcwd()
 
         if subcommand == "list":
-            dep_info = get_dependency_info(project_path)
+            dep_info = get_dependency_info(project_path, offline=offline)
             click.echo(f"Total dependencies: {dep_info['total_dependencies']}")
-            click.echo(f"Outdated dependencies: {dep_info['outdated_dependencies']}")
+            checked_at = dep_info['outdated_checked_at']
+            if checked_at is None:
+                click.echo("Outdated dependencies: unknown (no cached check; run without --offline)")
+            else:
+                checked = time.strftime('%Y-%m-%d %H:%M', time.localtime(checked_at))
+                click.echo(f"Outdated dependencies: {dep_info['outdated_dependencies']} (checked {checked})")
             click.echo("\nCurrent dependencies:")
             for dep, version in dep_info['dependencies'].items():
                 click.echo(f"  - {dep}: {version}")
@@ -168,6 +244,10 @@ class CommandExecutor:
                 click.echo("\nOutdated dependencies:")
                 for dep in dep_info['outdated']:
                     click.echo(f"  - {dep['name']}: {dep['version']} (Latest: {dep['latest_version']})")
+            if dep_info['mismatched']:
+                click.echo("\nNot installed as required:")
+                for dep in dep_info['mismatched']:
+                    click.echo(f"  - {dep['name']}: requires {dep['required']}, installed {dep['installed'] or 'none'}")
 
         elif subcommand == "update":
             click.echo("Updating dependencies...")
@@ -175,23 +255,22 @@ class CommandExecutor:
             click.echo("Dependencies updated successfully.")
 
         elif subcommand == "add":
-            if len(args) < 2:
+            specs = parse_dependency_args(args[1:])
+            if not specs:
                 click.echo("Error: Please specify the dependency to add.")
                 return
-            dependency = args[1]
-            version = args[2] if len(args) > 2 else None
-            click.echo(f"Adding dependency: {dependency}")
-            add_dependency(project_path, dependency, version)
-            click.echo(f"Dependency {dependency} added successfully.")
+            click.echo(f"Adding dependencies: {', '.join(specs)}")
+            add_dependencies(project_path, specs)
+            click.echo(f"Added {len(specs)} {'dependency' if len(specs) == 1 else 'dependencies'} successfully.")
 
         elif subcommand == "remove":
-            if len(args) < 2:
+            names = list(args[1:])
+            if not names:
                 click.echo("Error: Please specify the dependency to remove.")
                 return
-            dependency = args[1]
-            click.echo(f"Removing dependency: {dependency}")
-            remove_dependency(project_path, dependency)
-            click.echo(f"Dependency {dependency} removed successfully.")
+            click.echo(f"Removing dependencies: {', '.join(names)}")
+            remove_dependencies(project_path, names)
+            click.echo(f"Removed {len(names)} {'dependency' if len(names) == 1 else 'dependencies'} successfully.")
 
         else:
             click.echo(f"Unknown deps subcommand: {subcommand}")
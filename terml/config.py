@@ -1,7 +1,8 @@
 import os
 from dotenv import load_dotenv
 
-# Load environment variables from .env file if it exists
+# Load environment variables from .env file if it exists. This runs before any
+# setting below is read, so TERML_* variables can be set there too.
 load_dotenv()
 
 # AI Model Configuration
@@ -12,11 +13,116 @@ MAX_TOKENS = 1000
 MAX_HISTORY = 100
 TERML_PREFIX = "terml"
 
+# Print explain/suggest/debug/chat responses token by token as they arrive
+STREAM_RESPONSES = True
+
 # API Keys
-ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
-if not ANTHROPIC_API_KEY:
-    print("Warning: ANTHROPIC_API_KEY environment variable is not set. Using a dummy key for testing.")
-    ANTHROPIC_API_KEY = "dummy_api_key_for_testing"
+# ANTHROPIC_API_KEY is resolved on first access (see __getattr__ below), so that
+# commands which never talk to the API skip the missing-key warning
+_anthropic_api_key = None
+
+def get_anthropic_api_key():
+    global _anthropic_api_key
+    if _anthropic_api_key is None:
+        _anthropic_api_key = os.getenv("ANTHROPIC_API_KEY")
+        if not _anthropic_api_key:
+            print("Warning: ANTHROPIC_API_KEY environment variable is not set. Using a dummy key for testing.")
+            _anthropic_api_key = "dummy_api_key_for_testing"
+    return _anthropic_api_key
+
+# Cache Configuration
+CACHE_DIR = os.getenv("TERML_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "terml"))
+RESPONSE_CACHE_ENABLED = True
+RESPONSE_CACHE_MAX_BYTES = 50 * 1024 * 1024
+
+# Command Journal Configuration (fed by the shell hook from `terml hook`)
+DATA_DIR = os.getenv("TERML_DATA_DIR", os.path.join(os.path.expanduser("~"), ".local", "share", "terml"))
+JOURNAL_PATH = os.path.join(DATA_DIR, "journal")
+JOURNAL_CAPACITY = MAX_HISTORY
+JOURNAL_COMMAND_BYTES = 1024
+JOURNAL_OUTPUT_BYTES = 16 * 1024
+
+# Daemon Configuration (opt-in, started with `terml daemon start`)
+DAEMON_SOCKET = os.getenv("TERML_SOCKET", os.path.join(DATA_DIR, "terml.sock"))
+DAEMON_CONNECT_TIMEOUT = 0.2
+
+# AI Record/Replay Configuration: "live" calls the API, "record" also appends
+# every reply to the cassette, "replay" answers from the cassette without network
+AI_MODE = os.getenv("TERML_AI_MODE", "live")
+AI_CASSETTE = os.getenv("TERML_CASSETTE", os.path.join(DATA_DIR, "cassette.jsonl"))
+
+# Filesystem Walk Configuration (.gitignore and .termlignore patterns are honoured too)
+WALK_PRUNED_DIRS = [".git", ".hg", ".svn", ".venv", "node_modules",
+                    "__pycache__", ".tox", ".nox", ".mypy_cache", ".pytest_cache", ".ruff_cache", ".eggs"]
+# Common words that only mean "generated" at the project root; deeper down they are
+# walked like any other directory unless they hold a virtualenv (pyvenv.cfg)
+WALK_ROOT_PRUNED_DIRS = ["venv", "env", "build", "dist"]
+
+# Code Analysis Configuration
+ANALYZE_JOBS = 1  # worker processes for `terml analyze`; 0 uses every CPU
+ANALYZE_CHUNK_SIZE = 64  # files per worker batch
+ANALYSIS_CACHE_ENABLED = True  # reuse per-file results for unchanged files
+ENABLED_ANALYZER_RULES = []  # opt-in rules that are off by default
+DISABLED_ANALYZER_RULES = []  # e.g. ["import-alias"]
+
+# Large File Summarization Configuration
+SUMMARIZE_CHUNK_TOKENS = 8000  # input budget per chunk; smaller files use a single prompt
+SUMMARIZE_CHUNK_MAX_TOKENS = 300  # output budget for each partial summary
+SUMMARIZE_CONCURRENCY = 4  # chunk requests in flight at once
+SUMMARIZE_REDUCE_FAN_IN = 8  # partial summaries combined per reduce step
+
+# Test Scaffold Generation Configuration (`terml test`)
+TEST_GENERATE_JOBS = 1  # parser processes; 0 uses every CPU
+TEST_GENERATE_CHUNK_SIZE = 64  # source files per worker batch
+
+# Test Improvement Context (`terml test` suggestions)
+TEST_IMPROVEMENT_TOKEN_BUDGET = 12000  # test files and coverage gaps sent in the prompt
+TEST_RANK_RECENCY_WEIGHT = 5.0  # ranking bonus for tests or modules changed in the last day
+
+# Per-file Code Improvement Configuration (`terml analyze --per-file`)
+CODE_IMPROVEMENT_GROUP_SIZE = 5  # files whose issues share one request
+CODE_IMPROVEMENT_CONCURRENCY = 8  # requests in flight at once
+
+# Directory Summarization Configuration
+SUMMARIZE_DIR_DEPTH = 2  # subtree levels broken out in the directory profile
+SUMMARIZE_DIR_TOP_FILES = 3  # largest files listed per subtree
+SUMMARIZE_DIR_TOKEN_BUDGET = 1500  # upper bound on the profile sent in the prompt
+
+# Command Execution Configuration
+COMMAND_TIMEOUT = None  # seconds before a command run by terml is stopped; None waits
+CAPTURE_MEMORY_BYTES = 1024 * 1024  # output per stream kept in memory before spilling to a temp file
+CAPTURE_VIEW_BYTES = 256 * 1024  # most output per stream read back for prompts and the journal
+
+# Terminal Output Compaction (token budgets for output sent with a prompt)
+EXPLAIN_OUTPUT_TOKEN_BUDGET = 2000
+DEBUG_OUTPUT_TOKEN_BUDGET = 3000
+
+# Chat Conversation Configuration (`terml chat -q`)
+CHAT_CONTEXT_TOKENS = 8000  # history size at which old turns are folded into a summary
+CHAT_SUMMARIZE_TRIMMED = True  # summarize dropped turns instead of forgetting them
+CHAT_SUMMARY_MAX_TOKENS = 300
+
+# Auto Mode Configuration (`terml auto`)
+AUTO_PLAN_MAX_TOKENS = 1500
+AUTO_STEP_OUTPUT_TOKEN_BUDGET = 500  # output of each finished step fed back into the plan
+AUTO_PREFETCH = True  # refine the plan in the background while the user confirms a step
+AUTO_TRIVIAL_OUTPUT_CHARS = 80  # successful steps with at most this much output keep the prefetched plan
+
+# Dependency Check Configuration (`terml deps list`)
+DEPS_OUTDATED_TTL = 6 * 3600  # age after which cached outdated results are refreshed in the background
+DEPS_REFRESH_TIMEOUT = 600  # seconds before a stuck background refresh may be started again
+
+# Project Template Configuration (`terml generate`)
+# User templates are directories or .zip/.tar(.gz/.bz2/.xz) archives named after the
+# project type, looked up in these directories before the built-in templates
+TEMPLATE_DIRS = [path for path in os.getenv("TERML_TEMPLATE_PATH", os.path.join(DATA_DIR, "templates")).split(os.pathsep) if path]
+TEMPLATE_WRITE_WORKERS = 8  # threads writing files when a project is generated
+
+# Tracing Configuration (summarized by `terml stats`)
+TRACE_ENABLED = os.getenv("TERML_TRACE", "1") != "0"
+TRACE_PATH = os.path.join(DATA_DIR, "trace.jsonl")
+TRACE_MAX_BYTES = 5 * 1024 * 1024  # size at which the trace file is rotated
+TRACE_BACKUPS = 1  # rotated trace files kept
 
 # Logging Configuration
 LOG_LEVEL = "INFO"
@@ -31,17 +137,34 @@ SUMMARIZE_MAX_TOKENS = 800
 CODE_IMPROVEMENT_MAX_TOKENS = 1000
 TEST_IMPROVEMENT_MAX_TOKENS = 1000
 
+# Command-specific response cache TTLs in seconds (0 disables caching)
+EXPLAIN_CACHE_TTL = 3600
+SUGGEST_CACHE_TTL = 0
+CHAT_CACHE_TTL = 0
+DEBUG_CACHE_TTL = 3600
+AUTO_CACHE_TTL = 0
+SUMMARIZE_CACHE_TTL = 24 * 3600
+CODE_IMPROVEMENT_CACHE_TTL = 24 * 3600
+TEST_IMPROVEMENT_CACHE_TTL = 24 * 3600
+
 # System Prompts
 BASE_PROMPT = "You are TerML, an AI assistant for terminal users. Provide clear, concise, and helpful responses."
 EXPLAIN_PROMPT = BASE_PROMPT + " Explain the given terminal output in simple terms, focusing on what it means and why it's important."
 SUGGEST_PROMPT = BASE_PROMPT + " Suggest a helpful next command based on the given command history. Explain why this command would be useful."
 DEBUG_PROMPT = BASE_PROMPT + " Analyze the given command and its output. Explain what might have gone wrong and suggest a correction or improvement."
 AUTO_PROMPT = BASE_PROMPT + " Generate a command to set up a project based on the given goal and tech stack. Provide a detailed explanation of what the command does and why it's appropriate."
+AUTO_PLAN_PROMPT = BASE_PROMPT + " Plan the shell commands that set up a project for the given goal and tech stack. Reply with JSON only, in the form {\"steps\": [{\"command\": \"...\", \"explanation\": \"...\"}]}. When steps already run are listed with their results, return only the steps that remain, adjusted to what happened."
 CHAT_PROMPT = BASE_PROMPT + " Respond to user questions about terminal usage, command-line interfaces, or programming concepts. Provide helpful and educational answers."
+CHAT_SUMMARY_PROMPT = BASE_PROMPT + " Condense the earlier summary and the given conversation into a short summary that keeps the user's goals, environment details, commands discussed and any open questions."
 SUMMARIZE_PROMPT = BASE_PROMPT + " Summarize the contents of the given file or directory. For files, focus on the main points and structure. For directories, provide an overview of the contained files and their purposes."
 CODE_IMPROVEMENT_PROMPT = BASE_PROMPT + " Analyze the given code analysis summary and suggest improvements. Focus on best practices, code organization, and potential optimizations."
 TEST_IMPROVEMENT_PROMPT = BASE_PROMPT + " Analyze the given test files and suggest improvements for better test coverage and quality. Focus on test completeness, edge cases, and best practices in unit testing."
 
 # Error Messages
 API_KEY_ERROR = "Error: Anthropic API key not found. Please set the ANTHROPIC_API_KEY environment variable."
-COMMAND_ERROR = "Error: Unknown TerML command. Use 'terml --help' for available commands."
\ No newline at end of file
+COMMAND_ERROR = "Error: Unknown TerML command. Use 'terml --help' for available commands."
+
+def __getattr__(name):
+    if name == "ANTHROPIC_API_KEY":
+        return get_anthropic_api_key()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,79 @@
+from . import config
+from .token_budget import estimate_tokens
+
+EPHEMERAL = {"type": "ephemeral"}
+
+# A multi-turn chat session. The system prompt and the history up to the last
+# assistant reply are marked as prompt-cache breakpoints, so each turn only pays
+# full price for the new input. When the history outgrows CHAT_CONTEXT_TOKENS
+# the oldest turns are folded into a running summary in one step, which keeps
+# the cached prefix stable for many turns between trims.
+class Conversation:
+    def __init__(self, ai_integration, system_prompt=None, max_tokens=None, context_tokens=None):
+        self.ai = ai_integration
+        self.system_prompt = config.CHAT_PROMPT if system_prompt is None else system_prompt
+        self.max_tokens = config.CHAT_MAX_TOKENS if max_tokens is None else max_tokens
+        self.context_tokens = config.CHAT_CONTEXT_TOKENS if context_tokens is None else context_tokens
+        self.turns = []
+        self.summary = ""
+        self.last_usage = None
+
+    def _system_blocks(self):
+        blocks = [{"type": "text", "text": self.system_prompt, "cache_control": EPHEMERAL}]
+        if self.summary:
+            blocks.append({"type": "text", "text": f"Summary of the earlier conversation:\n{self.summary}"})
+        return blocks
+
+    def build_messages(self, user_input):
+        messages = []
+        for user, assistant in self.turns:
+            messages.append({"role": "user", "content": user})
+            messages.append({"role": "assistant", "content": assistant})
+        if messages:
+            messages[-1]["content"] = [{"type": "text", "text": messages[-1]["content"], "cache_control": EPHEMERAL}]
+        messages.append({"role": "user", "content": user_input})
+        return messages
+
+    def context_size(self, user_input=""):
+        return estimate_tokens(
+            self.system_prompt + self.summary + user_input
+            + "".join(user + assistant for user, assistant in self.turns)
+        )
+
+    def _trim(self, user_input):
+        if self.context_size(user_input) <= self.context_tokens:
+            return
+        # Drop down to half the budget so the next few turns reuse the same prefix
+        target = self.context_tokens // 2
+        dropped = []
+        while self.turns and self.context_size(user_input) > target:
+            dropped.append(self.turns.pop(0))
+        if dropped and config.CHAT_SUMMARIZE_TRIMMED:
+            self.summary = self._summarize(dropped)
+
+    def _summarize(self, turns):
+        transcript = "\n".join(f"User: {user}\nTerML: {assistant}" for user, assistant in turns)
+        prompt = f"Earlier summary:\n{self.summary or '(none)'}\n\nConversation to fold in:\n{transcript}"
+        summary = self.ai.get_ai_response(prompt, config.CHAT_SUMMARY_PROMPT, config.CHAT_SUMMARY_MAX_TOKENS)
+        if summary.startswith("Error:"):
+            return self.summary
+        return summary
+
+    def send(self, user_input, stream=False):
+        self._trim(user_input)
+        if stream:
+            return self._stream(user_input)
+        reply = self.ai.create_message(self._system_blocks(), self.build_messages(user_input), self.max_tokens)
+        self._record(user_input, reply)
+        return reply.text
+
+    def _stream(self, user_input):
+        reply = self.ai.create_message(self._system_blocks(), self.build_messages(user_input), self.max_tokens, stream=True)
+        yield from reply
+        self._record(user_input, reply)
+
+    def _record(self, user_input, reply):
+        # Failed turns are left out of the history
+        if reply.error is None:
+            self.last_usage = reply.usage
+            self.turns.append((user_input, reply.text))
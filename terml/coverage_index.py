@@ -0,0 +1,177 @@
+import ast
+import os
+import time
+from . import config
+from .fs_walker import walk_files
+from .token_budget import CHARS_PER_TOKEN, estimate_tokens, tokens_to_chars
+
+def _is_test_file(name):
+    return name.startswith('test_')
+
+def _defined_symbols(tree):
+    # Public top-level functions and classes, and the public methods of those classes
+    symbols = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)) and not node.name.startswith('_'):
+            symbols.append(node.name)
+            if isinstance(node, ast.ClassDef):
+                symbols.extend(
+                    child.name for child in node.body
+                    if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)) and not child.name.startswith('_')
+                )
+    return symbols
+
+def _referenced_names(tree):
+    names = set()
+    modules = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            names.add(node.id)
+        elif isinstance(node, ast.Attribute):
+            names.add(node.attr)
+        elif isinstance(node, ast.Import):
+            modules.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.module:
+                modules.add(node.module)
+            for alias in node.names:
+                names.add(alias.name)
+                if node.module:
+                    modules.add(f"{node.module}.{alias.name}")
+    return names, modules
+
+def _parse(file_path):
+    try:
+        with open(file_path, 'rb') as f:
+            return ast.parse(f.read())
+    except (OSError, SyntaxError, ValueError):
+        return None
+
+class SourceModule:
+    def __init__(self, path, rel_path, symbols, mtime):
+        self.path = path
+        self.rel_path = rel_path
+        self.symbols = symbols
+        self.mtime = mtime
+        self.uncovered = []
+
+class IndexedTestFile:
+    def __init__(self, path, rel_path, size, mtime, targets):
+        self.path = path
+        self.rel_path = rel_path
+        self.size = size
+        self.mtime = mtime
+        self.targets = targets
+        self.score = 0.0
+
+# Which source modules each test file exercises (by import or test_<module>
+# naming) and which public source symbols no test refers to at all. The
+# index is built from one walk and one parse per file.
+class CoverageIndex:
+    def __init__(self, project_path):
+        self.project_path = project_path
+        self.sources = []
+        self.tests = []
+        self._build()
+
+    def _build(self):
+        by_module = {}
+        test_refs = []
+        referenced = set()
+        for entry in walk_files(self.project_path, suffixes=('.py',)):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            rel_path = os.path.relpath(entry.path, self.project_path).replace(os.sep, '/')
+            tree = _parse(entry.path)
+            if _is_test_file(entry.name):
+                names, modules = _referenced_names(tree) if tree is not None else (set(), set())
+                referenced.update(names)
+                test_refs.append((entry, rel_path, stat, modules))
+            elif tree is not None:
+                source = SourceModule(entry.path, rel_path, _defined_symbols(tree), stat.st_mtime)
+                self.sources.append(source)
+                dotted = rel_path[:-3].replace('/', '.')
+                if dotted.endswith('.__init__'):
+                    dotted = dotted[:-len('.__init__')]
+                parts = dotted.split('.')
+                # Register every dotted suffix so both `pkg.mod` and `mod` imports resolve
+                for i in range(len(parts)):
+                    by_module.setdefault('.'.join(parts[i:]), []).append(source)
+
+        for source in self.sources:
+            source.uncovered = [symbol for symbol in source.symbols if symbol not in referenced]
+
+        for entry, rel_path, stat, modules in test_refs:
+            targets = []
+            candidates = list(modules) + [entry.name[len('test_'):-3]]
+            for module in candidates:
+                for source in by_module.get(module, []):
+                    if source not in targets:
+                        targets.append(source)
+            self.tests.append(IndexedTestFile(entry.path, rel_path, stat.st_size, stat.st_mtime, targets))
+
+    def uncovered_symbols(self):
+        return [(source.rel_path, symbol) for source in self.sources for symbol in source.uncovered]
+
+    def ranked_tests(self, now=None):
+        # Tests whose modules have the most untested symbols come first; recent
+        # edits to the test or its modules add up to TEST_RANK_RECENCY_WEIGHT.
+        now = time.time() if now is None else now
+        for test in self.tests:
+            gaps = sum(len(source.uncovered) for source in test.targets)
+            latest = max([test.mtime] + [source.mtime for source in test.targets])
+            age_days = max(0.0, now - latest) / 86400
+            test.score = gaps + config.TEST_RANK_RECENCY_WEIGHT / (1 + age_days)
+        return sorted(self.tests, key=lambda test: (-test.score, test.rel_path))
+
+def _read_text(path):
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            return f.read()
+    except OSError:
+        return None
+
+def select_test_context(project_path, max_tokens=None, index=None):
+    # Prompt text for the suggestion request: untested symbols first, then the
+    # highest ranked test files that still fit into the token budget.
+    max_tokens = config.TEST_IMPROVEMENT_TOKEN_BUDGET if max_tokens is None else max_tokens
+    index = index if index is not None else CoverageIndex(project_path)
+    parts = []
+    used = 0
+
+    uncovered = index.uncovered_symbols()
+    if uncovered:
+        lines = ["Public source symbols that no test refers to:"]
+        gap_chars = tokens_to_chars(max_tokens // 10)
+        chars = len(lines[0])
+        for shown, (rel_path, symbol) in enumerate(uncovered):
+            line = f"- {rel_path}: {symbol}"
+            chars += len(line) + 1
+            if chars > gap_chars:
+                lines.append(f"- ... and {len(uncovered) - shown} more")
+                break
+            lines.append(line)
+        parts.append("\n".join(lines) + "\n\n")
+        used += estimate_tokens(parts[0])
+
+    omitted = 0
+    for test in index.ranked_tests():
+        # Cheap size check first, so oversized files are never read
+        if used + test.size // CHARS_PER_TOKEN > max_tokens:
+            omitted += 1
+            continue
+        content = _read_text(test.path)
+        if content is None:
+            continue
+        part = f"File: {test.rel_path}\n{content}\n\n"
+        cost = estimate_tokens(part)
+        if used + cost > max_tokens:
+            omitted += 1
+            continue
+        parts.append(part)
+        used += cost
+    if omitted:
+        parts.append(f"({omitted} lower-ranked test files omitted to fit the budget)\n")
+    return "".join(parts)
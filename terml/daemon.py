@@ -0,0 +1,213 @@
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import subprocess
+import sys
+import time
+import traceback
+from . import config, tracing
+
+# Interactive commands prompt on stdin, so they always run in the CLI process
+FORWARDED_COMMANDS = {"explain", "suggest", "debug", "summarize", "generate", "analyze", "test", "deps"}
+
+# The daemon went away after it received a request, so the command may have
+# run in part and must not be retried locally
+class ConnectionLost(ConnectionError):
+    pass
+
+def _supported():
+    return hasattr(socket, "AF_UNIX")
+
+def _send(sock, frame):
+    sock.sendall((json.dumps(frame) + "\n").encode("utf-8"))
+
+def _connect(socket_path, timeout):
+    if not _supported() or not os.path.exists(socket_path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(socket_path)
+    except OSError:
+        sock.close()
+        return None
+    sock.settimeout(None)
+    return sock
+
+def _request(request, socket_path=None, on_output=None):
+    sock = _connect(socket_path or config.DAEMON_SOCKET, config.DAEMON_CONNECT_TIMEOUT)
+    if sock is None:
+        return None
+    with sock, sock.makefile("r", encoding="utf-8") as reader:
+        try:
+            _send(sock, request)
+        except OSError:
+            return None
+        try:
+            for line in reader:
+                frame = json.loads(line)
+                if "out" in frame:
+                    if on_output is not None:
+                        on_output(frame["out"])
+                elif "exit" in frame:
+                    return frame
+        except (OSError, ValueError) as e:
+            raise ConnectionLost(str(e)) from e
+    raise ConnectionLost("the daemon closed the connection")
+
+# Returns the command's exit code, or None when no daemon is listening or the
+# command has to run locally. Once the request is sent the command never falls
+# back to running locally: a lost connection is reported and fails.
+def forward(command, no_cache=False, socket_path=None):
+    parts = command.split()
+    if len(parts) < 2 or parts[1] not in FORWARDED_COMMANDS:
+        return None
+    # Record and replay use this shell's cassette, so those commands run locally
+    if config.AI_MODE.lower() != "live":
+        return None
+
+    stdout = sys.stdout
+
+    def write(text):
+        stdout.write(text)
+        stdout.flush()
+
+    request = {"op": "run", "command": command, "cwd": os.getcwd(), "no_cache": no_cache}
+    try:
+        frame = _request(request, socket_path, on_output=write)
+    except ConnectionLost as e:
+        sys.stderr.write(f"Error: Lost the connection to the TerML daemon ({e}); the command may not have finished.\n")
+        return 1
+    except (OSError, ValueError):
+        return None
+    return frame["exit"] if frame else None
+
+def ping(socket_path=None):
+    try:
+        frame = _request({"op": "ping"}, socket_path)
+    except (OSError, ValueError):
+        return None
+    return frame.get("pid") if frame else None
+
+def shutdown(socket_path=None):
+    try:
+        return _request({"op": "shutdown"}, socket_path) is not None
+    except (OSError, ValueError):
+        return False
+
+class _SocketWriter(io.TextIOBase):
+    def __init__(self, sock):
+        self.sock = sock
+
+    @property
+    def encoding(self):
+        return "utf-8"
+
+    def writable(self):
+        return True
+
+    def isatty(self):
+        return False
+
+    def write(self, text):
+        if not isinstance(text, str):
+            raise TypeError(f"write() argument must be str, not {type(text).__name__}")
+        if text:
+            _send(self.sock, {"out": text})
+        return len(text)
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        request = json.loads(self.rfile.readline().decode("utf-8"))
+        op = request.get("op")
+        if op == "ping":
+            _send(self.connection, {"exit": 0, "pid": os.getpid()})
+        elif op == "shutdown":
+            _send(self.connection, {"exit": 0})
+            self.server.stopping = True
+        elif op == "run":
+            _send(self.connection, {"exit": self.server.run_command(request, _SocketWriter(self.connection))})
+
+# Requests are served one at a time: commands chdir into the client's
+# working directory and write through the process-wide stdout.
+class TermlDaemon(socketserver.UnixStreamServer):
+    def __init__(self, socket_path=None):
+        self.socket_path = socket_path or config.DAEMON_SOCKET
+        if ping(self.socket_path):
+            raise RuntimeError(f"A TerML daemon is already listening on {self.socket_path}")
+        self.stopping = False
+        self._ai_integrations = {}
+        self._terminal_handler = None
+        os.makedirs(os.path.dirname(os.path.abspath(self.socket_path)), mode=0o700, exist_ok=True)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(self.socket_path, _Handler)
+        finally:
+            os.umask(old_umask)
+
+    def _executor(self, no_cache):
+        from .ai_integration import AIIntegration
+        from .commands import CommandExecutor
+        from .terminal_handler import TerminalHandler
+        if self._terminal_handler is None:
+            self._terminal_handler = TerminalHandler()
+        if no_cache not in self._ai_integrations:
+            self._ai_integrations[no_cache] = AIIntegration(use_cache=not no_cache)
+        return CommandExecutor(self._terminal_handler, self._ai_integrations[no_cache])
+
+    def warm_up(self):
+        # Import every subsystem and build the API client before the first request arrives
+        from . import code_analyzer, dependency_manager, project_templates, test_generator
+        self._executor(False).ai_integration.client
+
+    def run_command(self, request, writer):
+        try:
+            os.chdir(request["cwd"])
+            executor = self._executor(bool(request.get("no_cache")))
+            self._terminal_handler.update_current_directory()
+            with contextlib.redirect_stdout(writer), contextlib.redirect_stderr(writer):
+                with tracing.trace_command(request["command"], origin="daemon"):
+                    executor.execute(request["command"])
+            return 0
+        except Exception:
+            writer.write(traceback.format_exc())
+            return 1
+
+    def serve(self):
+        try:
+            while not self.stopping:
+                self.handle_request()
+        finally:
+            self.server_close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+def start_background(socket_path=None, wait=5.0):
+    pid = ping(socket_path)
+    if pid:
+        return pid
+    cmd = [sys.executable, "-m", "terml.daemon"]
+    if socket_path:
+        cmd.append(socket_path)
+    subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                     stderr=subprocess.DEVNULL, start_new_session=True)
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        pid = ping(socket_path)
+        if pid:
+            return pid
+        time.sleep(0.05)
+    return None
+
+def main(socket_path=None):
+    daemon = TermlDaemon(socket_path)
+    daemon.warm_up()
+    daemon.serve()
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -1,6 +1,26 @@
+import hashlib
+import importlib
 import os
 import subprocess
 import json
+import re
+import shutil
+import sys
+import tempfile
+import time
+from . import config, tracing
+from .requirements_file import RequirementsFile, parse_requirement
+
+try:
+    from importlib import metadata as importlib_metadata
+except ImportError:  # Python 3.7
+    try:
+        import importlib_metadata
+    except ImportError:
+        importlib_metadata = None
+
+BARE_VERSION_RE = re.compile(r'^\d[0-9A-Za-z.+!*-]*$')
+SPECIFIER_RE = re.compile(r'[=<>~!@]')
 
 def get_project_type(project_path):
     if os.path.exists(os.path.join(project_path, 'package.json')):
@@ -10,6 +30,23 @@ def get_project_type(project_path):
     else:
         return 'unknown'
 
+def project_python():
+    # The interpreter of the project's environment: the active virtualenv, else
+    # the python on PATH, else the one running terml (e.g. from pipx)
+    venv = os.environ.get('VIRTUAL_ENV')
+    if venv:
+        python = os.path.join(venv, 'Scripts', 'python.exe') if os.name == 'nt' else os.path.join(venv, 'bin', 'python')
+        if os.path.exists(python):
+            return python
+    return shutil.which('python') or shutil.which('python3') or sys.executable
+
+def _pip(*args):
+    return [project_python(), '-m', 'pip'] + list(args)
+
+def _is_own_environment(python):
+    # Symlinks are not followed: a virtualenv's python links to its base interpreter
+    return os.path.dirname(os.path.abspath(python)) == os.path.dirname(os.path.abspath(sys.executable))
+
 def get_dependencies(project_path):
     project_type = get_project_type(project_path)
     if project_type == 'nodejs':
@@ -17,68 +54,256 @@ def get_dependencies(project_path):
             package_json = json.load(f)
         return package_json.get('dependencies', {})
     elif project_type == 'python':
-        with open(os.path.join(project_path, 'requirements.txt'), 'r') as f:
-            return dict(line.strip().split('==') for line in f if '==' in line)
+        requirements = RequirementsFile.read(os.path.join(project_path, 'requirements.txt'))
+        return {
+            requirement.name: requirement.pinned_version or requirement.specifier or '*'
+            for _, requirement in requirements.requirements()
+        }
     else:
         return {}
 
+def _normalize_name(name):
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+# python -> {normalized name: version}, for environments other than terml's own
+_installed_versions = {}
+
+def _other_environment_versions(python):
+    if python not in _installed_versions:
+        result = subprocess.run([python, '-m', 'pip', 'list', '--format=json'], capture_output=True, text=True)
+        try:
+            packages = json.loads(result.stdout or '[]')
+        except ValueError:
+            packages = []
+        _installed_versions[python] = {_normalize_name(package['name']): package['version'] for package in packages}
+    return _installed_versions[python]
+
+def get_installed_version(name):
+    # Read in-process when the project uses terml's own environment, otherwise
+    # listed once per run by that environment's pip
+    python = project_python()
+    if not _is_own_environment(python):
+        return _other_environment_versions(python).get(_normalize_name(name))
+    if importlib_metadata is None:
+        return None
+    try:
+        return importlib_metadata.version(name)
+    except importlib_metadata.PackageNotFoundError:
+        return None
+
+def diff_requirements(project_path):
+    # Requirements that are not installed, or installed at another version than
+    # their pin. Lines with environment markers are not evaluated.
+    if get_project_type(project_path) != 'python':
+        return []
+    requirements = RequirementsFile.read(os.path.join(project_path, 'requirements.txt'))
+    differences = []
+    for _, requirement in requirements.requirements():
+        if requirement.marker:
+            continue
+        installed = get_installed_version(requirement.name)
+        if installed is None or (requirement.pinned_version and installed != requirement.pinned_version):
+            differences.append({"name": requirement.name, "required": requirement.specifier or '*', "installed": installed})
+    return differences
+
+@tracing.traced("deps.update")
 def update_dependencies(project_path):
     project_type = get_project_type(project_path)
     if project_type == 'nodejs':
         subprocess.run(['npm', 'update'], cwd=project_path, check=True)
     elif project_type == 'python':
-        subprocess.run(['pip', 'install', '--upgrade', '-r', 'requirements.txt'], cwd=project_path, check=True)
+        subprocess.run(_pip('install', '--upgrade', '-r', 'requirements.txt'), cwd=project_path, check=True)
     else:
         raise ValueError(f"Unsupported project type in {project_path}")
 
-def add_dependency(project_path, dependency, version=None):
+def _pin_installed(requirement):
+    if requirement.specifier:
+        return requirement
+    installed = get_installed_version(requirement.name)
+    if installed is not None:
+        requirement.specifier = f'=={installed}'
+    return requirement
+
+def parse_dependency_args(args):
+    # "a b==1.2 c" -> ["a", "b==1.2", "c"]; a bare version after an unpinned
+    # name keeps the old "add <name> <version>" form working.
+    specs = []
+    for arg in args:
+        if specs and BARE_VERSION_RE.match(arg) and not SPECIFIER_RE.search(specs[-1]):
+            specs[-1] = f"{specs[-1]}=={arg}"
+        else:
+            specs.append(arg)
+    return specs
+
+def _npm_spec(spec):
+    name, _, version = spec.partition('==')
+    return f"{name}@{version}" if version else spec
+
+@tracing.traced("deps.add")
+def add_dependencies(project_path, specs):
+    # One package-manager run and at most one manifest write for all packages
     project_type = get_project_type(project_path)
+    if not specs:
+        return
     if project_type == 'nodejs':
-        cmd = ['npm', 'install', dependency]
-        if version:
-            cmd[-1] += f'@{version}'
-        subprocess.run(cmd, cwd=project_path, check=True)
+        # npm records every package in package.json itself, in the same run
+        subprocess.run(['npm', 'install'] + [_npm_spec(spec) for spec in specs], cwd=project_path, check=True)
     elif project_type == 'python':
-        cmd = ['pip', 'install', dependency]
-        if version:
-            cmd[-1] += f'=={version}'
-        subprocess.run(cmd, cwd=project_path, check=True)
-        # Update requirements.txt
-        subprocess.run(['pip', 'freeze', '>', 'requirements.txt'], cwd=project_path, shell=True, check=True)
+        requirements_to_add = []
+        for spec in specs:
+            requirement = parse_requirement(spec)
+            if requirement is None:
+                raise ValueError(f"Invalid requirement: {spec}")
+            requirements_to_add.append(requirement)
+        subprocess.run(_pip('install', *specs), cwd=project_path, check=True)
+        requirements_path = os.path.join(project_path, 'requirements.txt')
+        requirements = RequirementsFile.read(requirements_path)
+        importlib.invalidate_caches()
+        _installed_versions.clear()
+        for requirement in requirements_to_add:
+            requirements.set(_pin_installed(requirement))
+        requirements.write(requirements_path)
     else:
         raise ValueError(f"Unsupported project type in {project_path}")
 
-def remove_dependency(project_path, dependency):
+@tracing.traced("deps.remove")
+def remove_dependencies(project_path, names):
     project_type = get_project_type(project_path)
+    if not names:
+        return
     if project_type == 'nodejs':
-        subprocess.run(['npm', 'uninstall', dependency], cwd=project_path, check=True)
+        subprocess.run(['npm', 'uninstall'] + list(names), cwd=project_path, check=True)
     elif project_type == 'python':
-        subprocess.run(['pip', 'uninstall', '-y', dependency], cwd=project_path, check=True)
-        # Update requirements.txt
-        subprocess.run(['pip', 'freeze', '>', 'requirements.txt'], cwd=project_path, shell=True, check=True)
+        subprocess.run(_pip('uninstall', '-y', *names), cwd=project_path, check=True)
+        requirements_path = os.path.join(project_path, 'requirements.txt')
+        requirements = RequirementsFile.read(requirements_path)
+        for name in names:
+            requirements.remove(name)
+        requirements.write(requirements_path)
     else:
         raise ValueError(f"Unsupported project type in {project_path}")
 
+def add_dependency(project_path, dependency, version=None):
+    add_dependencies(project_path, [f"{dependency}=={version}" if version else dependency])
+
+def remove_dependency(project_path, dependency):
+    remove_dependencies(project_path, [dependency])
+
+@tracing.traced("deps.outdated")
 def check_outdated_dependencies(project_path):
+    # Normalized to pip's format: [{"name", "version", "latest_version"}]
     project_type = get_project_type(project_path)
     if project_type == 'nodejs':
-        result = subprocess.run(['npm', 'outdated', '--json'], cwd=project_path, capture_output=True, text=True, check=True)
-        return json.loads(result.stdout)
+        # npm outdated exits with 1 whenever something is outdated
+        result = subprocess.run(['npm', 'outdated', '--json'], cwd=project_path, capture_output=True, text=True)
+        outdated = json.loads(result.stdout or '{}')
+        return [
+            {"name": name, "version": info.get('current'), "latest_version": info.get('latest')}
+            for name, info in sorted(outdated.items())
+        ]
     elif project_type == 'python':
-        result = subprocess.run(['pip', 'list', '--outdated', '--format=json'], cwd=project_path, capture_output=True, text=True, check=True)
+        result = subprocess.run(_pip('list', '--outdated', '--format=json'), cwd=project_path, capture_output=True, text=True, check=True)
         return json.loads(result.stdout)
     else:
         raise ValueError(f"Unsupported project type in {project_path}")
 
-def get_dependency_info(project_path):
+def _manifest_hash(project_path):
+    manifest = 'package.json' if get_project_type(project_path) == 'nodejs' else 'requirements.txt'
+    try:
+        with open(os.path.join(project_path, manifest), 'r') as f:
+            return hashlib.sha1(f.read().encode('utf-8')).hexdigest()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+def _outdated_cache_path(project_path):
+    project_key = hashlib.sha1(os.path.abspath(project_path).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(config.CACHE_DIR, 'deps', f'{project_key}.json')
+
+def _load_outdated_cache(project_path):
+    try:
+        with open(_outdated_cache_path(project_path), 'r') as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return entry if isinstance(entry, dict) else None
+
+def _store_outdated_cache(project_path, entry):
+    path = _outdated_cache_path(project_path)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        os.unlink(tmp_path)
+
+def refresh_outdated_cache(project_path):
+    entry = {
+        "manifest_hash": _manifest_hash(project_path),
+        "checked_at": time.time(),
+        "outdated": check_outdated_dependencies(project_path),
+    }
+    _store_outdated_cache(project_path, entry)
+    return entry
+
+def _spawn_refresh(project_path, entry):
+    # One detached refresher at a time; a marker older than the timeout is ignored
+    started = entry.get("refresh_started") or 0
+    if time.time() - started < config.DEPS_REFRESH_TIMEOUT:
+        return
+    entry["refresh_started"] = time.time()
+    _store_outdated_cache(project_path, entry)
+    try:
+        subprocess.Popen([sys.executable, "-m", "terml.dependency_manager", "refresh", os.path.abspath(project_path)],
+                         stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                         stderr=subprocess.DEVNULL, start_new_session=True)
+    except OSError:
+        pass
+
+def get_outdated_dependencies(project_path, offline=False):
+    # Returns (outdated, checked_at). A cached result for the same manifest is
+    # returned at once; past DEPS_OUTDATED_TTL it is refreshed in a detached
+    # process for the next run. Offline, the package manager is never started.
+    manifest_hash = _manifest_hash(project_path)
+    entry = _load_outdated_cache(project_path)
+    if entry is not None and (offline or entry.get("manifest_hash") == manifest_hash):
+        if not offline and time.time() - entry.get("checked_at", 0) > config.DEPS_OUTDATED_TTL:
+            _spawn_refresh(project_path, entry)
+        return entry.get("outdated", []), entry.get("checked_at")
+    if offline:
+        return [], None
+    entry = refresh_outdated_cache(project_path)
+    return entry["outdated"], entry["checked_at"]
+
+@tracing.traced("deps.info")
+def get_dependency_info(project_path, offline=False):
     dependencies = get_dependencies(project_path)
-    outdated = check_outdated_dependencies(project_path)
+    outdated, checked_at = get_outdated_dependencies(project_path, offline)
     
     info = {
         "total_dependencies": len(dependencies),
         "outdated_dependencies": len(outdated),
         "dependencies": dependencies,
-        "outdated": outdated
+        "outdated": outdated,
+        "outdated_checked_at": checked_at,
+        "mismatched": diff_requirements(project_path)
     }
     
-    return info
\ No newline at end of file
+    return info
+
+def main(argv):
+    if len(argv) == 2 and argv[0] == "refresh":
+        try:
+            refresh_outdated_cache(argv[1])
+        except (OSError, ValueError, subprocess.CalledProcessError):
+            return 1
+        return 0
+    print("usage: python -m terml.dependency_manager refresh <project_path>", file=sys.stderr)
+    return 2
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
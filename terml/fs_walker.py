@@ -0,0 +1,173 @@
+import os
+import re
+import time
+from . import config, tracing
+
+IGNORE_FILES = ('.gitignore', '.termlignore')
+
+def _translate(pattern):
+    # Translate one gitignore glob into a regular expression over '/'-separated paths
+    parts = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            parts.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('/**', i) and i + 3 == len(pattern):
+            parts.append('/.*')
+            i += 3
+        elif pattern.startswith('**', i):
+            parts.append('.*')
+            i += 2
+        elif pattern[i] == '*':
+            parts.append('[^/]*')
+            i += 1
+        elif pattern[i] == '?':
+            parts.append('[^/]')
+            i += 1
+        elif pattern[i] == '[':
+            end = pattern.find(']', i + 2 if pattern.startswith('[!', i) else i + 1)
+            if end == -1:
+                parts.append(re.escape(pattern[i]))
+                i += 1
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                parts.append(f'[{body}]')
+                i = end + 1
+        elif pattern[i] == '\\' and i + 1 < len(pattern):
+            parts.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    return ''.join(parts)
+
+# Compiled .gitignore-style patterns for one directory. Patterns are matched
+# against paths relative to that directory, and the last matching pattern wins.
+class IgnoreMatcher:
+    def __init__(self, lines):
+        self.rules = []
+        for line in lines:
+            line = line.rstrip('\n').rstrip('\r')
+            if not line.strip() or line.startswith('#'):
+                continue
+            line = line.rstrip(' ') if not line.endswith('\\ ') else line
+            negate = line.startswith('!')
+            if negate or line.startswith('\\!') or line.startswith('\\#'):
+                line = line[1:]
+            dir_only = line.endswith('/')
+            line = line.rstrip('/')
+            if not line:
+                continue
+            anchored = '/' in line
+            regex = _translate(line.lstrip('/'))
+            if not anchored:
+                regex = '(?:.*/)?' + regex
+            self.rules.append((re.compile(regex + r'\Z'), negate, dir_only))
+        # Without negations every rule agrees, so a single alternation answers the query
+        if self.rules and not any(negate for _, negate, _ in self.rules):
+            self._any_file = self._combine([r for r, _, dir_only in self.rules if not dir_only])
+            self._any_dir = self._combine([r for r, _, _ in self.rules])
+        else:
+            self._any_file = self._any_dir = None
+
+    @staticmethod
+    def _combine(regexes):
+        if not regexes:
+            return None
+        return re.compile('|'.join(f'(?:{r.pattern})' for r in regexes))
+
+    @classmethod
+    def from_file(cls, path):
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                return cls(f.readlines())
+        except OSError:
+            return cls([])
+
+    def match(self, rel_path, is_dir):
+        # True: ignored, False: explicitly re-included, None: no pattern applies
+        if not self.rules:
+            return None
+        if self._any_dir is not None or self._any_file is not None:
+            combined = self._any_dir if is_dir else self._any_file
+            return True if combined is not None and combined.match(rel_path) else None
+        for regex, negate, dir_only in reversed(self.rules):
+            if dir_only and not is_dir:
+                continue
+            if regex.match(rel_path):
+                return not negate
+        return None
+
+def _is_ignored(matchers, rel_path, is_dir):
+    for base, matcher in reversed(matchers):
+        result = matcher.match(rel_path[len(base) + 1:] if base else rel_path, is_dir)
+        if result is not None:
+            return result
+    return False
+
+# Yields an os.DirEntry for every file under root that is not ignored, in a
+# stable, name-sorted, top-down order. Directories in config.WALK_PRUNED_DIRS,
+# those in config.WALK_ROOT_PRUNED_DIRS directly under root (or holding a
+# virtualenv deeper down), and those matched by a .gitignore/.termlignore
+# pattern are skipped without being scanned.
+def walk_files(root, suffixes=None, pruned_dirs=None, ignore_files=IGNORE_FILES, root_pruned_dirs=None):
+    # Traced as one fs.walk span covering only the time spent walking, not the
+    # time the caller spends on each entry
+    walker = _walk_files(root, suffixes, pruned_dirs, ignore_files, root_pruned_dirs)
+    walked = 0.0
+    count = 0
+    try:
+        while True:
+            resumed = time.perf_counter()
+            try:
+                entry = next(walker)
+            except StopIteration:
+                return
+            finally:
+                walked += time.perf_counter() - resumed
+            count += 1
+            yield entry
+    finally:
+        walker.close()
+        tracing.record("fs.walk", walked, files=count)
+
+def _is_pruned(entry, rel_dir, pruned_dirs, root_pruned_dirs):
+    if entry.name in pruned_dirs:
+        return True
+    if entry.name not in root_pruned_dirs:
+        return False
+    # src/app/env/ or pkg/build/ is ordinary source unless it is a virtualenv
+    return not rel_dir or os.path.exists(os.path.join(entry.path, 'pyvenv.cfg'))
+
+def _walk_files(root, suffixes, pruned_dirs, ignore_files, root_pruned_dirs):
+    pruned_dirs = set(config.WALK_PRUNED_DIRS if pruned_dirs is None else pruned_dirs)
+    root_pruned_dirs = set(config.WALK_ROOT_PRUNED_DIRS if root_pruned_dirs is None else root_pruned_dirs)
+    stack = [(root, '', [])]
+    while stack:
+        directory, rel_dir, matchers = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError:
+            continue
+        names = {entry.name for entry in entries}
+        local = [name for name in ignore_files if name in names]
+        if local:
+            matchers = matchers + [(rel_dir, IgnoreMatcher.from_file(os.path.join(directory, name))) for name in local]
+        subdirs = []
+        for entry in entries:
+            rel_path = f'{rel_dir}/{entry.name}' if rel_dir else entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if not _is_pruned(entry, rel_dir, pruned_dirs, root_pruned_dirs) and not _is_ignored(matchers, rel_path, True):
+                        subdirs.append((entry.path, rel_path, matchers))
+                    continue
+                is_file = entry.is_file()
+            except OSError:
+                continue
+            if is_file and (suffixes is None or entry.name.endswith(suffixes)) and not _is_ignored(matchers, rel_path, False):
+                yield entry
+        stack.extend(reversed(subdirs))
@@ -0,0 +1,149 @@
+import mmap
+import os
+import struct
+import time
+from collections import namedtuple
+from . import config
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+MAGIC = b"TRMLJNL1"
+HEADER = struct.Struct("<8sIIIQ")
+HEADER_SIZE = 64
+SLOT_HEADER = struct.Struct("<QiddII")
+
+JournalEntry = namedtuple("JournalEntry", ["command", "exit_code", "duration", "timestamp", "output"])
+
+def _head_bytes(text, limit):
+    data = text.encode("utf-8", errors="replace")
+    return data[:limit].decode("utf-8", errors="ignore").encode("utf-8")
+
+def _tail_bytes(text, limit):
+    data = text.encode("utf-8", errors="replace")
+    return data[-limit:].decode("utf-8", errors="ignore").encode("utf-8") if limit else b""
+
+# A small header followed by `capacity` fixed-size slots, so the newest
+# entries are read by offset without scanning or loading the whole file.
+class Journal:
+    def __init__(self, path=None, capacity=None, command_bytes=None, output_bytes=None):
+        self.path = path or config.JOURNAL_PATH
+        self.capacity = capacity or config.JOURNAL_CAPACITY
+        self.command_bytes = command_bytes or config.JOURNAL_COMMAND_BYTES
+        self.output_bytes = output_bytes or config.JOURNAL_OUTPUT_BYTES
+
+    @property
+    def slot_size(self):
+        return SLOT_HEADER.size + self.command_bytes + self.output_bytes
+
+    def _create(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            os.ftruncate(fd, HEADER_SIZE + self.capacity * self.slot_size)
+            os.write(fd, HEADER.pack(MAGIC, self.capacity, self.command_bytes, self.output_bytes, 0))
+        finally:
+            os.close(fd)
+
+    def _read_geometry(self, buf):
+        magic, capacity, command_bytes, output_bytes, next_seq = HEADER.unpack_from(buf, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Not a TerML journal: {self.path}")
+        # The file's own geometry wins over config so that older journals stay readable
+        self.capacity, self.command_bytes, self.output_bytes = capacity, command_bytes, output_bytes
+        return next_seq
+
+    def _slot_offset(self, seq):
+        return HEADER_SIZE + (seq % self.capacity) * self.slot_size
+
+    def append(self, command, exit_code=0, duration=0.0, output="", timestamp=None):
+        if not os.path.exists(self.path):
+            try:
+                self._create()
+            except FileExistsError:
+                pass
+        with open(self.path, "r+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                with mmap.mmap(f.fileno(), 0) as buf:
+                    seq = self._read_geometry(buf)
+                    command_data = _head_bytes(command, self.command_bytes)
+                    output_data = _tail_bytes(output or "", self.output_bytes)
+                    offset = self._slot_offset(seq)
+                    SLOT_HEADER.pack_into(
+                        buf, offset, seq + 1, int(exit_code), float(duration),
+                        timestamp if timestamp is not None else time.time(),
+                        len(command_data), len(output_data)
+                    )
+                    start = offset + SLOT_HEADER.size
+                    buf[start:start + len(command_data)] = command_data
+                    start += self.command_bytes
+                    buf[start:start + len(output_data)] = output_data
+                    # Publish the entry only after its slot is fully written
+                    HEADER.pack_into(buf, 0, MAGIC, self.capacity, self.command_bytes, self.output_bytes, seq + 1)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _read_slot(self, buf, seq):
+        offset = self._slot_offset(seq)
+        stored_seq, exit_code, duration, timestamp, command_len, output_len = SLOT_HEADER.unpack_from(buf, offset)
+        if stored_seq != seq + 1:
+            return None
+        start = offset + SLOT_HEADER.size
+        command = bytes(buf[start:start + command_len]).decode("utf-8", errors="replace")
+        start += self.command_bytes
+        output = bytes(buf[start:start + output_len]).decode("utf-8", errors="replace")
+        return JournalEntry(command, exit_code, duration, timestamp, output)
+
+    def entries(self, limit=10):
+        if limit <= 0 or not os.path.exists(self.path):
+            return []
+        try:
+            with open(self.path, "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                    next_seq = self._read_geometry(buf)
+                    first = max(0, next_seq - min(limit, self.capacity))
+                    entries = [self._read_slot(buf, seq) for seq in range(first, next_seq)]
+        except (OSError, ValueError):
+            return []
+        return [entry for entry in entries if entry is not None]
+
+    def last(self):
+        entries = self.entries(1)
+        return entries[0] if entries else None
+
+    def __len__(self):
+        if not os.path.exists(self.path):
+            return 0
+        try:
+            with open(self.path, "rb") as f:
+                next_seq = self._read_geometry(f.read(HEADER.size))
+        except (OSError, ValueError, struct.error):
+            return 0
+        return min(next_seq, self.capacity)
+
+def record_command(command, exit_code=0, started=None, capture_file=None, journal=None):
+    if command.split()[:1] == [config.TERML_PREFIX]:
+        return False
+    if journal is None:
+        journal = Journal()
+    duration = max(0.0, time.time() - started) if started else 0.0
+    output = ""
+    if capture_file and os.path.exists(capture_file):
+        # The shell hook hands over a per-command copy of the capture, which is
+        # removed once read
+        with open(capture_file, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - journal.output_bytes))
+            output = f.read().decode("utf-8", errors="replace")
+        try:
+            os.unlink(capture_file)
+        except OSError:
+            pass
+    journal.append(command, exit_code, duration, output)
+    return True
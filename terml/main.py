@@ -1,44 +1,67 @@
 import sys
+import time
+_import_started = time.perf_counter()
 import click
-from .terminal_handler import TerminalHandler
-from .ai_integration import AIIntegration
-from .commands import CommandExecutor
+
+# Keep module-level imports to click only: every subcommand imports what it
+# needs when it runs, so `terml --help` and light commands start fast.
+
+def _run(command):
+    from . import tracing
+    with tracing.trace_command(command):
+        tracing.record("import.cli", _import_seconds, started=_import_started)
+        _execute(command, tracing)
+
+def _execute(command, tracing):
+    from . import daemon as terml_daemon
+    ctx = click.get_current_context()
+    no_cache = (ctx.obj or {}).get("no_cache", False)
+    with tracing.span("daemon.forward"):
+        exit_code = terml_daemon.forward(command, no_cache=no_cache)
+    if exit_code is not None:
+        if exit_code:
+            ctx.exit(exit_code)
+        return
+    with tracing.span("import.commands"):
+        from .commands import CommandExecutor
+        from .terminal_handler import TerminalHandler
+    executor = CommandExecutor(TerminalHandler(), use_cache=not no_cache)
+    executor.execute(command)
 
 @click.group(invoke_without_command=True)
+@click.option('--no-cache', is_flag=True, help="Bypass the AI response and analysis caches")
 @click.pass_context
-def cli(ctx):
+def cli(ctx, no_cache):
     """TerML - AI-powered Terminal Assistant"""
+    ctx.ensure_object(dict)
+    ctx.obj["no_cache"] = no_cache
     if ctx.invoked_subcommand is None:
         click.echo("TerML: AI-powered Terminal Assistant")
         click.echo("Use 'terml [command]' to interact with TerML.")
-        click.echo("Available commands: explain, suggest, debug, chat, auto, summarize, generate, analyze, test, deps")
+        click.echo("Available commands: explain, suggest, debug, chat, auto, summarize, generate, analyze, test, deps, stats, hook, daemon")
         click.echo("For more information, use 'terml [command] --help'")
 
 @cli.command()
 def explain():
     """Explain the last command output"""
-    executor = CommandExecutor(TerminalHandler(), AIIntegration())
-    executor.execute("terml explain")
+    _run("terml explain")
 
 @cli.command()
 def suggest():
     """Suggest a helpful next command"""
-    executor = CommandExecutor(TerminalHandler(), AIIntegration())
-    executor.execute("terml suggest")
+    _run("terml suggest")
 
 @cli.command()
 def debug():
     """Debug the last command execution"""
-    executor = CommandExecutor(TerminalHandler(), AIIntegration())
-    executor.execute("terml debug")
+    _run("terml debug")
 
 @cli.command()
 @click.option('-q', '--quick', is_flag=True, help="Start a quick chat session")
 def chat(quick):
     """Start a chat session with TerML"""
     if quick:
-        executor = CommandExecutor(TerminalHandler(), AIIntegration())
-        executor.execute("terml chat -q")
+        _run("terml chat -q")
     else:
         click.echo("Please use 'terml chat -q' for a quick chat session.")
 
@@ -47,47 +70,106 @@ def chat(quick):
 def auto(with_user):
     """Automatically run commands with user approval"""
     if with_user:
-        executor = CommandExecutor(TerminalHandler(), AIIntegration())
-        executor.execute("terml auto --with-user")
+        _run("terml auto --with-user")
     else:
         click.echo("The --with-user flag is required for safety.")
 
 @cli.command()
 @click.argument('path', type=click.Path(exists=True))
-def summarize(path):
+@click.option('--depth', type=click.IntRange(min=0), default=None, help="Subdirectory levels to profile when summarizing a directory")
+def summarize(path, depth):
     """Summarize the contents of a file or directory"""
-    executor = CommandExecutor(TerminalHandler(), AIIntegration())
-    executor.execute(f"terml summarize {path}")
+    command = f"terml summarize {path}"
+    if depth is not None:
+        command += f" --depth {depth}"
+    _run(command)
 
 @cli.command()
 @click.argument('project_type')
 @click.argument('project_name')
 def generate(project_type, project_name):
     """Generate a new project structure"""
-    executor = CommandExecutor(TerminalHandler(), AIIntegration())
-    executor.execute(f"terml generate {project_type} {project_name}")
+    _run(f"terml generate {project_type} {project_name}")
 
 @cli.command()
 @click.argument('path', type=click.Path(exists=True))
-def analyze(path):
+@click.option('-j', '--jobs', type=click.IntRange(min=0), default=None, help="Worker processes to analyze with (0 uses every CPU)")
+@click.option('--per-file', is_flag=True, help="Request AI suggestions per group of files concurrently")
+def analyze(path, jobs, per_file):
     """Analyze code in the specified path"""
-    executor = CommandExecutor(TerminalHandler(), AIIntegration())
-    executor.execute(f"terml analyze {path}")
+    command = f"terml analyze {path}"
+    if jobs is not None:
+        command += f" --jobs {jobs}"
+    if per_file:
+        command += " --per-file"
+    _run(command)
 
 @cli.command()
 @click.argument('path', type=click.Path(exists=True))
 def test(path):
     """Generate tests for the project in the specified path"""
-    executor = CommandExecutor(TerminalHandler(), AIIntegration())
-    executor.execute(f"terml test {path}")
+    _run(f"terml test {path}")
 
 @cli.command()
 @click.argument('subcommand', type=click.Choice(['list', 'update', 'add', 'remove']))
 @click.argument('args', nargs=-1)
-def deps(subcommand, args):
+@click.option('--offline', is_flag=True, help="Use only cached version checks; never run the package manager")
+def deps(subcommand, args, offline):
     """Manage project dependencies"""
-    executor = CommandExecutor(TerminalHandler(), AIIntegration())
-    executor.execute(f"terml deps {subcommand} {' '.join(args)}")
+    command = f"terml deps {subcommand} {' '.join(args)}"
+    if offline:
+        command += " --offline"
+    _run(command)
+
+@cli.command()
+def stats():
+    """Show p50/p95 timings per command from the local trace file"""
+    from .tracing import format_stats, read_traces, summarize_traces
+    click.echo(format_stats(summarize_traces(read_traces())))
+
+@cli.command()
+@click.argument('shell', type=click.Choice(['bash', 'zsh']))
+@click.option('--capture-output', is_flag=True, help="Also tee terminal output into the journal")
+def hook(shell, capture_output):
+    """Print the shell hook that feeds the TerML command journal"""
+    from .shell_hooks import render_hook
+    click.echo(render_hook(shell, capture_output))
+
+@cli.command(hidden=True)
+@click.option('--exit-code', type=int, default=0)
+@click.option('--started', type=float, default=None)
+@click.option('--capture-file', type=click.Path(dir_okay=False), default=None)
+@click.argument('command', nargs=-1, required=True)
+def record(exit_code, started, capture_file, command):
+    """Record a finished shell command in the TerML journal"""
+    from .journal import record_command
+    record_command(" ".join(command), exit_code, started, capture_file)
+
+@cli.command()
+@click.argument('action', type=click.Choice(['start', 'stop', 'status']))
+@click.option('--foreground', is_flag=True, help="Run the daemon in this process instead of detaching")
+def daemon(action, foreground):
+    """Manage the background daemon that keeps TerML warm between commands"""
+    from . import daemon as terml_daemon
+    if action == "start":
+        if foreground:
+            terml_daemon.main()
+            return
+        pid = terml_daemon.start_background()
+        if pid:
+            click.echo(f"TerML daemon running (pid {pid}).")
+        else:
+            click.echo("Error: The TerML daemon did not start.")
+    elif action == "stop":
+        if terml_daemon.shutdown():
+            click.echo("TerML daemon stopped.")
+        else:
+            click.echo("TerML daemon is not running.")
+    else:
+        pid = terml_daemon.ping()
+        click.echo(f"TerML daemon running (pid {pid})." if pid else "TerML daemon is not running.")
+
+_import_seconds = time.perf_counter() - _import_started
 
 if __name__ == "__main__":
     cli()
\ No newline at end of file
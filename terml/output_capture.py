@@ -0,0 +1,81 @@
+import tempfile
+import threading
+from collections import deque
+from . import config
+
+# Captured bytes of one output stream. Up to memory_bytes are kept in memory;
+# past that the whole stream spills to an anonymous temp file and memory only
+# holds a ring buffer of the most recent chunks.
+class OutputCapture:
+    def __init__(self, memory_bytes=None):
+        self.memory_bytes = config.CAPTURE_MEMORY_BYTES if memory_bytes is None else memory_bytes
+        self.size = 0
+        self._recent = deque()
+        self._recent_size = 0
+        self._spill = None
+        self._lock = threading.Lock()
+
+    @property
+    def spilled(self):
+        return self._spill is not None
+
+    def write(self, data):
+        if not data:
+            return
+        with self._lock:
+            self.size += len(data)
+            if self._spill is None and self.size > self.memory_bytes:
+                self._spill = tempfile.TemporaryFile(prefix='terml-output-')
+                self._spill.writelines(self._recent)
+            if self._spill is not None:
+                self._spill.write(data)
+            self._recent.append(data)
+            self._recent_size += len(data)
+            if self._spill is not None:
+                while self._recent_size - len(self._recent[0]) >= self.memory_bytes:
+                    self._recent_size -= len(self._recent.popleft())
+
+    def _read_spill(self, offset, length):
+        self._spill.flush()
+        self._spill.seek(offset)
+        return self._spill.read(length)
+
+    def tail(self, max_bytes):
+        with self._lock:
+            if max_bytes >= self.size:
+                max_bytes = self.size
+            if max_bytes <= self._recent_size:
+                return b''.join(self._recent)[self._recent_size - max_bytes:]
+            return self._read_spill(self.size - max_bytes, max_bytes)
+
+    def getvalue(self, max_bytes=None):
+        # Past max_bytes only the head and the tail are returned, around a marker
+        with self._lock:
+            if self._spill is None:
+                data = b''.join(self._recent)
+            elif max_bytes is None or self.size <= max_bytes:
+                data = self._read_spill(0, self.size)
+            else:
+                data = None
+        if data is not None:
+            if max_bytes is None or len(data) <= max_bytes:
+                return data
+            head = data[:max_bytes // 4]
+            tail = data[len(data) - (max_bytes - len(head)):]
+        else:
+            with self._lock:
+                head = self._read_spill(0, max_bytes // 4)
+            tail = self.tail(max_bytes - len(head))
+        omitted = self.size - len(head) - len(tail)
+        return head + f"\n[... {omitted} bytes omitted ...]\n".encode() + tail
+
+    def text(self, max_bytes=None):
+        return self.getvalue(max_bytes).decode('utf-8', errors='replace')
+
+    def close(self):
+        with self._lock:
+            if self._spill is not None:
+                self._spill.close()
+                self._spill = None
+            self._recent.clear()
+            self._recent_size = 0
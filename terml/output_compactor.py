@@ -0,0 +1,102 @@
+import re
+from .token_budget import estimate_tokens, tokens_to_chars
+
+# CSI sequences (colours, cursor movement), OSC sequences (titles, hyperlinks)
+# and the remaining two-character escapes
+ANSI_RE = re.compile(r'\x1b\[[0-?]*[ -/]*[@-~]|\x1b\][^\x07\x1b]*(?:\x07|\x1b\\)|\x1b[@-Z\\-_]')
+CONTROL_RE = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]')
+VARIABLE_RE = re.compile(r'0x[0-9a-fA-F]+|\d+(?:\.\d+)?')
+ERROR_RE = re.compile(
+    r'error|exception|traceback|fail|fatal|panic|denied|not found|no such|cannot|unable|warning|exit code|\bE\d{3,}\b',
+    re.IGNORECASE
+)
+MAX_LINE_CHARS = 400
+
+def strip_control_sequences(text):
+    text = ANSI_RE.sub('', text)
+    lines = []
+    for line in text.split('\n'):
+        # A carriage return redraws the line (progress bars, spinners); keep the final frame
+        line = line.rstrip('\r').rsplit('\r', 1)[-1]
+        lines.append(CONTROL_RE.sub('', line))
+    return lines
+
+def collapse_repeats(lines):
+    # Runs of lines that differ only in numbers ("Downloading 12/400 ...") become
+    # one line and a count.
+    collapsed = []
+    previous_key = None
+    for line in lines:
+        key = VARIABLE_RE.sub('#', line.strip())
+        if collapsed and key == previous_key:
+            collapsed[-1][1] += 1
+            collapsed[-1][2] = line
+        else:
+            collapsed.append([line, 1, line])
+            previous_key = key
+    result = []
+    for first, count, last in collapsed:
+        if count == 1:
+            result.append(first)
+        elif count == 2:
+            result.extend([first, last])
+        else:
+            result.append(f"{first}  [... {count - 2} similar lines ...]")
+            result.append(last)
+    return result
+
+def _shorten(line):
+    if len(line) <= MAX_LINE_CHARS:
+        return line
+    half = MAX_LINE_CHARS // 2
+    return f"{line[:half]} [...] {line[-half:]}"
+
+def compact_output(text, max_tokens):
+    if not text:
+        return text
+    lines = [_shorten(line) for line in collapse_repeats(strip_control_sequences(text))]
+    while lines and not lines[-1].strip():
+        lines.pop()
+    compacted = '\n'.join(lines)
+    if estimate_tokens(compacted) <= max_tokens:
+        return compacted
+
+    # Over budget: keep the head (what ran), the tail (how it ended) and any
+    # error-looking lines in between, in their original order. Every omission
+    # marker is paid for: one is reserved up front, and a kept line with no kept
+    # neighbour can split a gap in two, so it is charged for one more.
+    marker_cost = len(f"[... {len(lines)} lines omitted ...]") + 1
+    budget = tokens_to_chars(max_tokens) - marker_cost
+    last = len(lines) - 1
+    keep = set()
+
+    def take(indices, limit):
+        used = 0
+        for index in indices:
+            cost = len(lines[index]) + 1
+            if 0 < index < last and index - 1 not in keep and index + 1 not in keep:
+                cost += marker_cost
+            if used + cost > limit:
+                break
+            keep.add(index)
+            used += cost
+        return used
+
+    used = take(range(len(lines)), budget // 4)
+    used += take(range(last, -1, -1), budget // 2)
+    errors = [i for i, line in enumerate(lines) if i not in keep and ERROR_RE.search(line)]
+    take(errors, budget - used)
+
+    result = []
+    omitted = 0
+    for index, line in enumerate(lines):
+        if index in keep:
+            if omitted:
+                result.append(f"[... {omitted} lines omitted ...]")
+                omitted = 0
+            result.append(line)
+        else:
+            omitted += 1
+    if omitted:
+        result.append(f"[... {omitted} lines omitted ...]")
+    return '\n'.join(result)
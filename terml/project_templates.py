@@ -1,5 +1,14 @@
 import os
 import json
+import hashlib
+import posixpath
+import re
+import tarfile
+import tempfile
+import zipfile
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from . import config
 
 TEMPLATES = {
     "python": {
@@ -40,28 +49,259 @@ TEMPLATES = {
     }
 }
 
-def create_project_structure(project_type, project_name):
-    if project_type not in TEMPLATES:
-        raise ValueError(f"Unsupported project type: {project_type}")
+MANIFEST_VERSION = 1
+ARCHIVE_SUFFIXES = ('.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz', '.tar', '.zip')
+SKIPPED_DIRS = ('.git', '.hg', '.svn')
+VARIABLE_RE = re.compile(r'\{\{\s*(\w+)\s*\}\}')
+WRITE_BATCH_SIZE = 64  # files handed to a writer thread at a time
 
-    template = TEMPLATES[project_type]
-    project_path = os.path.join(os.getcwd(), project_name)
+# One file of a template: its path in the generated project (may contain
+# {{variables}}), its permission bits and its name in the template source.
+TemplateFile = namedtuple('TemplateFile', ['path', 'mode', 'member'])
 
-    # Create project directory
-    os.makedirs(project_path, exist_ok=True)
+def _relative_path(name):
+    # Template paths are relative and may not climb out of the project
+    parts = [part for part in name.replace('\\', '/').split('/') if part not in ('', '.')]
+    if '..' in parts or name.startswith(('/', '\\')):
+        raise ValueError(f"Unsafe path in template: {name}")
+    return '/'.join(parts)
+
+def template_variables(project_name):
+    name = os.path.basename(os.path.normpath(project_name))
+    return {
+        'project_name': name,
+        'package_name': re.sub(r'\W+', '_', name).strip('_').lower() or 'project',
+    }
+
+def render(text, variables):
+    # Unknown {{names}} are left as they are
+    return VARIABLE_RE.sub(lambda match: variables.get(match.group(1), match.group(0)), text)
+
+def _render_bytes(data, variables):
+    try:
+        return render(data.decode('utf-8'), variables).encode('utf-8')
+    except UnicodeDecodeError:
+        return data
+
+# A project template indexed into its directories and files, whether it is a
+# built-in entry of TEMPLATES, a directory, or a tar or zip archive.
+class Template:
+    def __init__(self, name, kind, source, directories, files):
+        self.name = name
+        self.kind = kind
+        self.source = source
+        self.directories = directories
+        self.files = files
+
+    def contents(self):
+        # (TemplateFile, bytes) for every file; archives are read in one pass
+        if self.kind == 'builtin':
+            for entry in self.files:
+                yield entry, TEMPLATES[self.name]['files'][entry.member].encode('utf-8')
+        elif self.kind == 'directory':
+            for entry in self.files:
+                with open(os.path.join(self.source, entry.member), 'rb') as f:
+                    yield entry, f.read()
+        elif self.kind == 'zip':
+            with zipfile.ZipFile(self.source) as archive:
+                for entry in self.files:
+                    yield entry, archive.read(entry.member)
+        else:
+            entries = {entry.member: entry for entry in self.files}
+            with tarfile.open(self.source, 'r:*') as archive:
+                for member in archive:
+                    entry = entries.get(member.name)
+                    if entry is not None and member.isfile():
+                        yield entry, archive.extractfile(member).read()
+
+def _builtin_template(name):
+    template = TEMPLATES[name]
+    files = [TemplateFile(path, 0o644, path) for path in template["files"]]
+    return Template(name, 'builtin', None, list(template["directories"]), files)
+
+def _index_directory(path):
+    directories, files = [], []
+    for root, dirnames, filenames in os.walk(path):
+        dirnames[:] = sorted(dirname for dirname in dirnames if dirname not in SKIPPED_DIRS)
+        rel_root = os.path.relpath(root, path)
+        for dirname in dirnames:
+            directories.append(_relative_path(os.path.join(rel_root, dirname)))
+        for filename in sorted(filenames):
+            full_path = os.path.join(root, filename)
+            if os.path.isfile(full_path):
+                member = os.path.relpath(full_path, path)
+                files.append(TemplateFile(_relative_path(member), os.stat(full_path).st_mode & 0o777, member))
+    return directories, files
+
+def _strip_top_directory(directories, files):
+    # Archives made with `tar czf name.tar.gz name/` keep everything in one folder
+    tops = {path.split('/', 1)[0] for path in directories} | {entry.path.split('/', 1)[0] for entry in files}
+    if len(tops) != 1 or not files or any('/' not in entry.path for entry in files):
+        return directories, files
+    prefix = tops.pop() + '/'
+    directories = [path[len(prefix):] for path in directories if path.startswith(prefix)]
+    files = [entry._replace(path=entry.path[len(prefix):]) for entry in files]
+    return directories, files
 
-    # Create subdirectories
-    for directory in template["directories"]:
-        os.makedirs(os.path.join(project_path, directory), exist_ok=True)
+def _index_archive(path, kind):
+    directories, files = [], []
+    if kind == 'zip':
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                rel_path = _relative_path(info.filename)
+                if not rel_path:
+                    continue
+                if info.is_dir():
+                    directories.append(rel_path)
+                else:
+                    files.append(TemplateFile(rel_path, (info.external_attr >> 16) & 0o777 or 0o644, info.filename))
+    else:
+        with tarfile.open(path, 'r:*') as archive:
+            for member in archive:
+                rel_path = _relative_path(member.name)
+                if not rel_path:
+                    continue
+                # Links, devices and fifos are not part of a generated project
+                if member.isdir():
+                    directories.append(rel_path)
+                elif member.isfile():
+                    files.append(TemplateFile(rel_path, member.mode & 0o777, member.name))
+    return _strip_top_directory(directories, files)
 
-    # Create files
-    for file_name, content in template["files"].items():
-        file_path = os.path.join(project_path, file_name)
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        with open(file_path, "w") as f:
-            f.write(content)
+def _manifest_cache_path(source):
+    key = hashlib.sha1(os.path.abspath(source).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(config.CACHE_DIR, 'templates', f'{key}.json')
 
+def _store_manifest(cache_path, manifest):
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), suffix='.tmp')
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        os.unlink(tmp_path)
+
+def _load_archive_template(name, kind, source):
+    # Listing a compressed tarball means decompressing all of it, so the index is
+    # cached until the archive changes and generation reads the archive only once
+    stat = os.stat(source)
+    signature = [stat.st_mtime_ns, stat.st_size]
+    cache_path = _manifest_cache_path(source)
+    try:
+        with open(cache_path, 'r') as f:
+            manifest = json.load(f)
+        if manifest.get('version') == MANIFEST_VERSION and manifest.get('signature') == signature:
+            files = [TemplateFile(*entry) for entry in manifest['files']]
+            return Template(name, kind, source, manifest['directories'], files)
+    except (OSError, ValueError, TypeError, KeyError):
+        pass
+    try:
+        directories, files = _index_archive(source, kind)
+    except (tarfile.TarError, zipfile.BadZipFile, EOFError) as e:
+        raise ValueError(f"Invalid template archive {source}: {e}")
+    _store_manifest(cache_path, {
+        'version': MANIFEST_VERSION,
+        'signature': signature,
+        'directories': directories,
+        'files': [list(entry) for entry in files],
+    })
+    return Template(name, kind, source, directories, files)
+
+def _archive_template_name(filename):
+    lower = filename.lower()
+    for suffix in ARCHIVE_SUFFIXES:
+        if lower.endswith(suffix):
+            return filename[:-len(suffix)], 'zip' if suffix == '.zip' else 'tar'
+    return None, None
+
+def find_user_templates():
+    # name -> (kind, path); a name found in an earlier TEMPLATE_DIRS entry wins
+    found = {}
+    for directory in config.TEMPLATE_DIRS:
+        try:
+            entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.is_dir():
+                name, kind = entry.name, 'directory'
+            else:
+                name, kind = _archive_template_name(entry.name)
+            if name and not name.startswith('.'):
+                found.setdefault(name, (kind, entry.path))
+    return found
+
+def load_template(project_type):
+    user_template = find_user_templates().get(project_type)
+    if user_template is not None:
+        kind, source = user_template
+        if kind == 'directory':
+            directories, files = _index_directory(source)
+            return Template(project_type, kind, source, directories, files)
+        return _load_archive_template(project_type, kind, source)
+    if project_type in TEMPLATES:
+        return _builtin_template(project_type)
+    raise ValueError(f"Unsupported project type: {project_type}")
+
+def _write_batch(batch):
+    for file_path, data, mode in batch:
+        with open(file_path, 'wb') as f:
+            f.write(data)
+        if mode is not None:
+            os.chmod(file_path, mode)
+
+def materialize(template, project_path, variables):
+    # Every directory is created once, parents first, so the writer threads only
+    # have to open and write files
+    targets = {}
+    wanted = [_relative_path(render(directory, variables)) for directory in template.directories]
+    for entry in template.files:
+        targets[entry.member] = _relative_path(render(entry.path, variables))
+        wanted.append(posixpath.dirname(targets[entry.member]))
+    directories = {''}
+    for directory in wanted:
+        while directory not in directories:
+            directories.add(directory)
+            directory = posixpath.dirname(directory)
+
+    os.makedirs(project_path, exist_ok=True)
+    for directory in sorted(directories):
+        if directory:
+            try:
+                os.mkdir(os.path.join(project_path, *directory.split('/')))
+            except FileExistsError:
+                pass
+
+    umask = os.umask(0)
+    os.umask(umask)
+    futures = []
+    with ThreadPoolExecutor(max_workers=max(1, config.TEMPLATE_WRITE_WORKERS)) as executor:
+        batch = []
+        for entry, data in template.contents():
+            if b'{{' in data:
+                data = _render_bytes(data, variables)
+            # Only executables need a chmod; everything else gets the default mode
+            mode = entry.mode & ~umask if entry.mode & 0o111 else None
+            batch.append((os.path.join(project_path, *targets[entry.member].split('/')), data, mode))
+            if len(batch) >= WRITE_BATCH_SIZE:
+                futures.append(executor.submit(_write_batch, batch))
+                batch = []
+        if batch:
+            futures.append(executor.submit(_write_batch, batch))
+    for future in futures:
+        future.result()
+
+def create_project_structure(project_type, project_name):
+    template = load_template(project_type)
+    project_path = os.path.join(os.getcwd(), project_name)
+    materialize(template, project_path, template_variables(project_name))
     return project_path
 
 def list_available_templates():
-    return list(TEMPLATES.keys())
\ No newline at end of file
+    names = list(TEMPLATES.keys())
+    names.extend(name for name in find_user_templates() if name not in TEMPLATES)
+    return names
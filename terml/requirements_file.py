@@ -0,0 +1,134 @@
+import os
+import re
+import tempfile
+
+# name[extras] specifier ; marker  # comment
+REQUIREMENT_RE = re.compile(
+    r'^(?P<name>[A-Za-z0-9](?:[A-Za-z0-9._-]*[A-Za-z0-9])?)\s*'
+    r'(?P<extras>\[[^\]]*\])?\s*'
+    r'(?P<specifier>[^;]*?)\s*'
+    r'(?P<marker>;.*?)?\s*$'
+)
+COMMENT_RE = re.compile(r'(^|\s)#.*$')
+
+def normalize_name(name):
+    # PEP 503: case-insensitive, runs of '-', '_' and '.' are equivalent
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+class Requirement:
+    def __init__(self, name, extras='', specifier='', marker=''):
+        self.name = name
+        self.extras = extras or ''
+        self.specifier = specifier or ''
+        self.marker = marker or ''
+
+    @property
+    def key(self):
+        return normalize_name(self.name)
+
+    @property
+    def pinned_version(self):
+        spec = self.specifier.replace(' ', '')
+        if spec.startswith('==') and ',' not in spec and '*' not in spec:
+            return spec[2:]
+        return None
+
+    def format(self):
+        marker = f"; {self.marker.lstrip(';').strip()}" if self.marker else ''
+        return f"{self.name}{self.extras}{self.specifier}{marker}"
+
+def parse_requirement(line):
+    # None for blank lines, comments, options (-r, -e, --hash ...) and URLs
+    text = COMMENT_RE.sub('', line).strip().rstrip('\\').strip()
+    if not text or text.startswith('-') or '://' in text:
+        return None
+    match = REQUIREMENT_RE.match(text)
+    if match is None:
+        return None
+    return Requirement(
+        match.group('name'), match.group('extras'),
+        match.group('specifier').replace(' ', ''), match.group('marker')
+    )
+
+# A requirements file kept as its original lines, so edits touch only the
+# lines of the packages that changed and everything else is written back as-is.
+class RequirementsFile:
+    def __init__(self, text=''):
+        self.lines = text.splitlines(True)
+        self._original = text
+
+    @classmethod
+    def read(cls, path):
+        with open(path, 'r') as f:
+            return cls(f.read())
+
+    def requirements(self):
+        result = []
+        for index, line in enumerate(self.lines):
+            requirement = parse_requirement(line)
+            if requirement is not None:
+                result.append((index, requirement))
+        return result
+
+    def find(self, name):
+        key = normalize_name(name)
+        return [(index, requirement) for index, requirement in self.requirements() if requirement.key == key]
+
+    def _replace_line(self, index, requirement):
+        line = self.lines[index]
+        body = line.rstrip('\r\n')
+        ending = line[len(body):]
+        comment = COMMENT_RE.search(body)
+        suffix = f"  {comment.group(0).strip()}" if comment else ''
+        if not comment and body.rstrip().endswith('\\'):
+            # Keep the continuation so following --hash lines stay attached
+            suffix = ' \\'
+        self.lines[index] = f"{requirement.format()}{suffix}{ending}"
+
+    def set(self, requirement):
+        # Updates the existing entry in place, or appends a new line
+        matches = self.find(requirement.name)
+        if matches:
+            index, current = matches[0]
+            current.specifier = requirement.specifier
+            if requirement.extras:
+                current.extras = requirement.extras
+            self._replace_line(index, current)
+            return
+        if self.lines and not self.lines[-1].endswith(('\n', '\r')):
+            self.lines[-1] += '\n'
+        self.lines.append(requirement.format() + '\n')
+
+    def remove(self, name):
+        indices = {index for index, _ in self.find(name)}
+        kept = []
+        continued = False
+        for index, line in enumerate(self.lines):
+            # Continuation lines (--hash ...) go with the requirement they belong to
+            removing = index in indices or continued
+            continued = removing and line.rstrip().endswith('\\')
+            if not removing:
+                kept.append(line)
+        self.lines = kept
+        return bool(indices)
+
+    def text(self):
+        return ''.join(self.lines)
+
+    def write(self, path):
+        # Atomic, and skipped entirely when nothing changed
+        text = self.text()
+        if text == self._original:
+            return False
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+        try:
+            if os.path.exists(path):
+                os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+            with os.fdopen(fd, 'w') as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        except OSError:
+            os.unlink(tmp_path)
+            raise
+        self._original = text
+        return True
@@ -0,0 +1,80 @@
+# The terminal is teed into one file for the whole session. When a command
+# finishes, the prompt hook snapshots that file to a per-command copy and empties
+# it; `terml record` reads the copy in the background and deletes it, so the next
+# command can never overwrite output that is still waiting to be recorded.
+CAPTURE_SETUP = r'''
+__terml_capture="${TMPDIR:-/tmp}/terml-capture-$$"
+__terml_seq=0
+: > "$__terml_capture"
+exec > >(tee -a "$__terml_capture") 2> >(tee -a "$__terml_capture" >&2)
+'''
+
+BASH_HOOK = r'''# TerML command journal hook for bash. Add to ~/.bashrc:
+#   eval "$(terml hook bash)"
+__terml_capture=""
+{capture_setup}
+__terml_at_prompt=1
+__terml_preexec() {{
+    [ "$BASH_COMMAND" = "__terml_precmd" ] && return
+    [ -z "$__terml_at_prompt" ] && return
+    __terml_at_prompt=
+    __terml_started="${{EPOCHREALTIME:-$(date +%s)}}"
+}}
+__terml_precmd() {{
+    local exit_code=$?
+    if [ -n "$__terml_started" ]; then
+        local cmd capture=
+        cmd=$(HISTTIMEFORMAT= history 1 | sed 's/^ *[0-9]* *//')
+        if [ -n "$__terml_capture" ]; then
+            __terml_seq=$((__terml_seq + 1))
+            capture="$__terml_capture.$__terml_seq"
+            command cp "$__terml_capture" "$capture" 2>/dev/null && : > "$__terml_capture" || capture=
+        fi
+        (terml record --exit-code "$exit_code" --started "$__terml_started" \
+            ${{capture:+--capture-file "$capture"}} -- "$cmd" >/dev/null 2>&1 &)
+    fi
+    __terml_started=
+    __terml_at_prompt=1
+}}
+trap '__terml_preexec' DEBUG
+PROMPT_COMMAND="__terml_precmd${{PROMPT_COMMAND:+;$PROMPT_COMMAND}}"
+'''
+
+ZSH_HOOK = r'''# TerML command journal hook for zsh. Add to ~/.zshrc:
+#   eval "$(terml hook zsh)"
+zmodload zsh/datetime
+__terml_capture=""
+{capture_setup}
+__terml_preexec() {{
+    __terml_cmd="$1"
+    __terml_started=$EPOCHREALTIME
+}}
+__terml_precmd() {{
+    local exit_code=$?
+    if [[ -n "$__terml_started" ]]; then
+        local capture=
+        if [[ -n "$__terml_capture" ]]; then
+            (( __terml_seq++ ))
+            capture="$__terml_capture.$__terml_seq"
+            command cp "$__terml_capture" "$capture" 2>/dev/null && : > "$__terml_capture" || capture=
+        fi
+        terml record --exit-code "$exit_code" --started "$__terml_started" \
+            ${{capture:+--capture-file "$capture"}} -- "$__terml_cmd" >/dev/null 2>&1 &!
+    fi
+    __terml_started=
+}}
+autoload -Uz add-zsh-hook
+add-zsh-hook preexec __terml_preexec
+add-zsh-hook precmd __terml_precmd
+'''
+
+HOOKS = {
+    "bash": BASH_HOOK,
+    "zsh": ZSH_HOOK,
+}
+
+def render_hook(shell, capture_output=False):
+    if shell not in HOOKS:
+        raise ValueError(f"Unsupported shell: {shell}")
+    # Teeing the terminal through a pipe hides the TTY from programs, so output capture is opt-in
+    return HOOKS[shell].format(capture_setup=CAPTURE_SETUP.strip() if capture_output else "")
@@ -0,0 +1,92 @@
+import mmap
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from . import config
+from .token_budget import tokens_to_chars
+
+def iter_file_chunks(path, chunk_bytes):
+    # Slices the file through mmap and ends each chunk on a line boundary when
+    # one exists, so only the chunks currently in flight are held in memory.
+    # Without one the chunk ends before a UTF-8 continuation byte, so no
+    # character is split across chunks.
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            start = 0
+            while start < size:
+                end = min(start + chunk_bytes, size)
+                if end < size:
+                    newline = data.rfind(b'\n', start, end)
+                    if newline > start:
+                        end = newline + 1
+                    else:
+                        boundary = end
+                        while boundary > start and data[boundary] & 0xC0 == 0x80:
+                            boundary -= 1
+                        if boundary > start:
+                            end = boundary
+                yield data[start:end].decode('utf-8', errors='replace')
+                start = end
+
+def _bounded_map(func, items, limit):
+    # Like pool.map, but pulls items lazily and keeps at most `limit` calls in flight
+    with ThreadPoolExecutor(max_workers=limit) as pool:
+        pending = deque()
+        for item in items:
+            pending.append(pool.submit(func, item))
+            if len(pending) >= limit:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+class _SummaryError(Exception):
+    pass
+
+def summarize_large_file(ai_integration, path):
+    name = os.path.basename(path)
+
+    def ask(prompt, max_tokens):
+        response = ai_integration.get_ai_response(prompt, config.SUMMARIZE_PROMPT, max_tokens, config.SUMMARIZE_CACHE_TTL)
+        if response.startswith("Error:"):
+            raise _SummaryError(response)
+        return response
+
+    def summarize_chunk(numbered_chunk):
+        number, chunk = numbered_chunk
+        prompt = f"Summarize part {number} of the file '{name}'. Focus on the main points and structure:\n\n{chunk}"
+        return ask(prompt, config.SUMMARIZE_CHUNK_MAX_TOKENS)
+
+    def combine(summaries, max_tokens):
+        parts = "\n\n".join(f"Part {i}:\n{summary}" for i, summary in enumerate(summaries, 1))
+        return ask(f"Combine these consecutive partial summaries of the file '{name}' into one summary:\n\n{parts}", max_tokens)
+
+    # Partial summaries are reduced as soon as SUMMARIZE_REDUCE_FAN_IN of them
+    # exist at a level, so memory grows with the tree depth, not the file size.
+    fan_in = max(2, config.SUMMARIZE_REDUCE_FAN_IN)
+    levels = []
+    chunks = enumerate(iter_file_chunks(path, tokens_to_chars(config.SUMMARIZE_CHUNK_TOKENS)), 1)
+    try:
+        for summary in _bounded_map(summarize_chunk, chunks, config.SUMMARIZE_CONCURRENCY):
+            level = 0
+            while True:
+                if level == len(levels):
+                    levels.append([])
+                levels[level].append(summary)
+                if len(levels[level]) < fan_in:
+                    break
+                summary = combine(levels[level], config.SUMMARIZE_CHUNK_MAX_TOKENS)
+                levels[level] = []
+                level += 1
+
+        # Lower levels cover later parts of the file, so reverse to restore order
+        remaining = [summary for level in reversed(levels) for summary in level]
+        if not remaining:
+            return "The file is empty."
+        if len(remaining) == 1:
+            return remaining[0]
+        return combine(remaining, config.SUMMARIZE_MAX_TOKENS)
+    except _SummaryError as e:
+        return str(e)
@@ -1,35 +1,177 @@
+import codecs
+import signal
 import subprocess
+import sys
+import threading
+import time
 from collections import deque
 import os
 from . import config
+from .journal import Journal
+from .output_capture import OutputCapture
+
+READ_CHUNK_BYTES = 64 * 1024
+
+def _pump(pipe, capture, echo_stream):
+    # Reader thread: tee one pipe of the child into its capture and, optionally, the terminal
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    fd = pipe.fileno()
+    try:
+        while True:
+            chunk = os.read(fd, READ_CHUNK_BYTES)
+            if not chunk:
+                break
+            capture.write(chunk)
+            if echo_stream is not None:
+                echo_stream.write(decoder.decode(chunk))
+                echo_stream.flush()
+    except (OSError, ValueError):
+        pass
+    finally:
+        if echo_stream is not None:
+            echo_stream.write(decoder.decode(b'', final=True))
+            echo_stream.flush()
+        pipe.close()
 
 class TerminalHandler:
-    def __init__(self, max_history=config.MAX_HISTORY):
+    def __init__(self, max_history=config.MAX_HISTORY, journal=None):
         self.history = deque(maxlen=max_history)
-        self.last_output = ""
+        self._last_output = ""
+        self._captures = None
         self.last_command = ""
+        self.last_exit_code = None
         self.current_directory = os.getcwd()
+        self.journal = journal if journal is not None else Journal()
+        self._process = None
+        self._cancel_requested = False
+
+    @property
+    def last_output(self):
+        # Lazy view over the last command's capture; large output is only read
+        # back (head and tail, bounded by CAPTURE_VIEW_BYTES) when asked for.
+        if self._captures is not None:
+            stdout, stderr = self._captures
+            return stdout.text(config.CAPTURE_VIEW_BYTES) + stderr.text(config.CAPTURE_VIEW_BYTES)
+        return self._last_output
+
+    @last_output.setter
+    def last_output(self, value):
+        self._release_captures()
+        self._last_output = value
 
-    def execute_command(self, command):
+    def _release_captures(self):
+        if self._captures is not None:
+            for capture in self._captures:
+                capture.close()
+            self._captures = None
+
+    def execute_command(self, command, timeout=None, echo=False):
+        # Output is read while the command runs: echo=True shows it live, and
+        # only a bounded amount stays in memory whatever the command prints.
+        timeout = config.COMMAND_TIMEOUT if timeout is None else timeout
         try:
-            result = subprocess.run(command, shell=True, text=True, capture_output=True, cwd=self.current_directory)
-            self.history.append(command)
-            self.last_command = command
-            self.last_output = result.stdout + result.stderr
-            return result.stdout, result.stderr
+            start = time.monotonic()
+            # Its own process group, so a timeout or cancel can stop the whole
+            # pipeline, but the same session: prompts through /dev/tty (sudo,
+            # ssh, credential helpers) still reach the controlling terminal.
+            process = subprocess.Popen(
+                command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                cwd=self.current_directory, preexec_fn=os.setpgrp if os.name == 'posix' else None
+            )
         except Exception as e:
             error_message = str(e)
             self.last_output = error_message
+            self.last_exit_code = None
             return "", error_message
 
+        stdout, stderr = OutputCapture(), OutputCapture()
+        readers = [
+            threading.Thread(target=_pump, args=(process.stdout, stdout, sys.stdout if echo else None), daemon=True),
+            threading.Thread(target=_pump, args=(process.stderr, stderr, sys.stderr if echo else None), daemon=True),
+        ]
+        for reader in readers:
+            reader.start()
+
+        self._process = process
+        self._cancel_requested = False
+        note = None
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self._stop(process)
+            note = f"terml: command timed out after {timeout} seconds"
+        except KeyboardInterrupt:
+            self._stop(process)
+            note = "terml: command cancelled"
+        finally:
+            self._process = None
+        process.wait()
+        if note is None and self._cancel_requested:
+            note = "terml: command cancelled"
+        for reader in readers:
+            # A background child that inherited the pipes must not hang a stopped command
+            reader.join(timeout=None if note is None else 1)
+        if note is not None:
+            stderr.write(f"\n{note}\n".encode())
+            if echo:
+                print(note, file=sys.stderr)
+
+        self.history.append(command)
+        self.last_command = command
+        self.last_exit_code = process.returncode
+        self._release_captures()
+        self._captures = (stdout, stderr)
+        self._journal_command(command, process.returncode, time.monotonic() - start, self.last_output)
+        return stdout.text(config.CAPTURE_VIEW_BYTES), stderr.text(config.CAPTURE_VIEW_BYTES)
+
+    def cancel(self):
+        # Stop the command currently running in execute_command (e.g. from another thread)
+        process = self._process
+        if process is not None:
+            self._cancel_requested = True
+            self._stop(process)
+
+    def _stop(self, process, grace=2):
+        if process.poll() is not None:
+            return
+        try:
+            if os.name == 'posix':
+                os.killpg(process.pid, signal.SIGTERM)
+            else:
+                process.terminate()
+            process.wait(timeout=grace)
+        except subprocess.TimeoutExpired:
+            if os.name == 'posix':
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+            process.wait()
+        except OSError:
+            pass
+
+    def _journal_command(self, command, exit_code, duration, output):
+        try:
+            self.journal.append(command, exit_code, duration, output)
+        except (OSError, ValueError):
+            pass
+
     def get_history(self, limit=10):
-        return list(self.history)[-limit:]
+        # Commands run in this process take precedence over the shell journal
+        if self.history:
+            return list(self.history)[-limit:]
+        return [entry.command for entry in self.journal.entries(limit)]
 
     def get_last_output(self):
-        return self.last_output
+        if self.last_command:
+            return self.last_output
+        entry = self.journal.last()
+        return entry.output if entry else ""
 
     def get_last_command(self):
-        return self.last_command
+        if self.last_command:
+            return self.last_command
+        entry = self.journal.last()
+        return entry.command if entry else ""
 
     def get_formatted_history(self, limit=10):
         return "\n".join(self.get_history(limit))
@@ -45,11 +187,10 @@ class TerminalHandler:
 
     def list_directory(self, path='.'):
         try:
-            items = os.listdir(os.path.join(self.current_directory, path))
-            for item in items:
-                full_path = os.path.join(self.current_directory, path, item)
-                item_type = "[DIR]" if os.path.isdir(full_path) else "[FILE]"
-                print(f"{item_type} {item}")
+            with os.scandir(os.path.join(self.current_directory, path)) as entries:
+                for entry in entries:
+                    item_type = "[DIR]" if entry.is_dir() else "[FILE]"
+                    print(f"{item_type} {entry.name}")
         except Exception as e:
             print(f"Error listing directory: {str(e)}")
 
@@ -1,56 +1,233 @@
 import ast
+import hashlib
+import json
 import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from . import config
+from .analysis_cache import file_digest
+from .fs_walker import walk_files
 
-def generate_test_file(file_path):
-    with open(file_path, 'r') as file:
-        content = file.read()
-    
-    tree = ast.parse(content)
-    
-    functions = [node for node in ast.walk(tree) if isinstance(node, ast.FunctionDef)]
-    
-    test_content = f"""import unittest
-from {os.path.splitext(os.path.basename(file_path))[0]} import *
+# Bump when the generated file layout changes so every scaffold is rebuilt
+GENERATOR_VERSION = 1
+
+def public_functions(tree):
+    names = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.FunctionDef) and not node.name.startswith('_') and node.name not in names:
+            names.append(node.name)
+    return names
+
+def render_test_file(module_name, functions):
+    parts = [f"""import unittest
+from {module_name} import *
 
 class TestFunctions(unittest.TestCase):
-"""
-    
-    for func in functions:
-        test_content += f"""
-    def test_{func.name}(self):
-        # TODO: Implement test for {func.name}
+"""]
+    for name in functions:
+        parts.append(f"""
+    def test_{name}(self):
+        # TODO: Implement test for {name}
         self.assertTrue(True)  # Placeholder assertion
-"""
-    
-    test_content += """
+""")
+    parts.append("""
 if __name__ == '__main__':
     unittest.main()
-"""
-    
-    return test_content
+""")
+    return "".join(parts)
+
+def _module_name(file_path):
+    return os.path.splitext(os.path.basename(file_path))[0]
+
+def _scaffold_path(file_path):
+    return os.path.join(os.path.dirname(file_path), f"test_{os.path.basename(file_path)}")
+
+def generate_test_file(file_path):
+    with open(file_path, 'r') as file:
+        content = file.read()
+    return render_test_file(_module_name(file_path), public_functions(ast.parse(content)))
+
+def _parse_batch(file_paths):
+    results = []
+    for file_path in file_paths:
+        try:
+            with open(file_path, 'rb') as file:
+                content = file.read()
+            functions = public_functions(ast.parse(content))
+        except (OSError, SyntaxError, ValueError) as e:
+            results.append((file_path, None, None, str(e)))
+        else:
+            results.append((file_path, functions, hashlib.sha1(content).hexdigest(), None))
+    return results
+
+def _parse_sources(file_paths, jobs=None):
+    jobs = config.TEST_GENERATE_JOBS if jobs is None else jobs
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+    if jobs > 1 and len(file_paths) > config.TEST_GENERATE_CHUNK_SIZE:
+        chunk_size = max(1, min(config.TEST_GENERATE_CHUNK_SIZE, len(file_paths) // (jobs * 4)))
+        chunks = [file_paths[i:i + chunk_size] for i in range(0, len(file_paths), chunk_size)]
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            return [result for batch in pool.map(_parse_batch, chunks) for result in batch]
+    return _parse_batch(file_paths)
+
+def _content_digest(content):
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
 
-def generate_tests_for_project(project_path):
+def _write_atomic(file_path, content):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(file_path) or '.', suffix='.tmp')
+    try:
+        # mkstemp creates the file 0600; give it the mode a plain open() would
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp_path, os.stat(file_path).st_mode & 0o7777 if os.path.exists(file_path) else 0o666 & ~umask)
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+        os.replace(tmp_path, file_path)
+    except OSError:
+        os.unlink(tmp_path)
+        raise
+
+# What terml generated last time, per source file relative to the project:
+# the source's stat and content hash, its public functions, and the hash of
+# the scaffold written for it (used to tell untouched scaffolds from user edits).
+class GenerationManifest:
+    def __init__(self, project_path, path=None):
+        self.project_path = os.path.abspath(project_path)
+        project_key = hashlib.sha1(self.project_path.encode('utf-8')).hexdigest()[:16]
+        self.path = path or os.path.join(config.CACHE_DIR, 'tests', f'{project_key}.json')
+        self.entries = {}
+        self._dirty = False
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') == GENERATOR_VERSION:
+            self.entries = data.get('files', {})
+
+    def _key(self, file_path):
+        return os.path.relpath(os.path.abspath(file_path), self.project_path)
+
+    def get(self, file_path):
+        return self.entries.get(self._key(file_path))
+
+    def set(self, file_path, **fields):
+        self.entries.setdefault(self._key(file_path), {}).update(fields)
+        self._dirty = True
+
+    def prune(self, file_paths):
+        keep = {self._key(file_path) for file_path in file_paths}
+        for key in [key for key in self.entries if key not in keep]:
+            del self.entries[key]
+            self._dirty = True
+
+    def save(self):
+        if not self._dirty:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            _write_atomic(self.path, json.dumps({'version': GENERATOR_VERSION, 'files': self.entries}))
+        except OSError:
+            return
+        self._dirty = False
+
+class GenerationReport:
+    def __init__(self):
+        self.written = []    # scaffolds created or updated
+        self.unchanged = []  # scaffolds regenerated but identical on disk
+        self.skipped = []    # sources whose content or public functions did not change
+        self.preserved = []  # scaffolds left alone because they were edited by hand
+        self.errors = []     # (source path, message) for sources that could not be parsed
+
+    def summary(self):
+        return (f"{len(self.written)} written, {len(self.skipped) + len(self.unchanged)} up to date, "
+                f"{len(self.preserved)} preserved, {len(self.errors)} failed")
+
+def generate_tests_for_project(project_path, jobs=None):
+    sources = [entry.path for entry in walk_files(project_path, suffixes=('.py',)) if not entry.name.startswith('test_')]
     generated_tests = {}
-    
-    for root, _, files in os.walk(project_path):
-        for file in files:
-            if file.endswith('.py') and not file.startswith('test_'):
-                file_path = os.path.join(root, file)
-                test_content = generate_test_file(file_path)
-                test_file_name = f"test_{file}"
-                test_file_path = os.path.join(root, test_file_name)
-                generated_tests[test_file_path] = test_content
-    
+    for file_path, functions, _, error in _parse_sources(sources, jobs):
+        # A module without public functions gets no scaffold: its test class would be empty
+        if error is None and functions:
+            generated_tests[_scaffold_path(file_path)] = render_test_file(_module_name(file_path), functions)
     return generated_tests
 
-def write_test_files(generated_tests):
+def write_test_files(generated_tests, manifest=None, report=None, sources=None):
+    # Writes only scaffolds whose content changed. With a manifest, an existing
+    # file that no longer matches what terml last wrote is kept as the user's.
+    report = report if report is not None else GenerationReport()
     for test_file_path, test_content in generated_tests.items():
-        with open(test_file_path, 'w') as test_file:
-            test_file.write(test_content)
-    
-    return list(generated_tests.keys())
-
-def generate_and_write_tests(project_path):
-    generated_tests = generate_tests_for_project(project_path)
-    written_files = write_test_files(generated_tests)
-    return written_files
\ No newline at end of file
+        digest = _content_digest(test_content)
+        source = sources.get(test_file_path) if sources else None
+        record = manifest.get(source) if manifest is not None and source else None
+        try:
+            current = file_digest(test_file_path)
+        except OSError:
+            current = None
+        if current == digest:
+            report.unchanged.append(test_file_path)
+        elif current is not None and manifest is not None and (record is None or current != record.get('output_digest')):
+            report.preserved.append(test_file_path)
+            continue
+        else:
+            _write_atomic(test_file_path, test_content)
+            report.written.append(test_file_path)
+        if manifest is not None and source:
+            manifest.set(source, output_digest=digest)
+    return report.written
+
+def generate_and_write_tests(project_path, jobs=None, use_cache=True):
+    # The manifest is always kept so hand-edited scaffolds are never overwritten;
+    # use_cache=False only disables skipping unchanged sources.
+    manifest = GenerationManifest(project_path)
+    report = GenerationReport()
+    sources = []
+    stale = []
+    stats = {}
+    for entry in walk_files(project_path, suffixes=('.py',)):
+        if entry.name.startswith('test_'):
+            continue
+        sources.append(entry.path)
+        record = manifest.get(entry.path) if use_cache else None
+        try:
+            stats[entry.path] = stat = entry.stat()
+        except OSError:
+            continue
+        if record is None or (record.get('functions') and not os.path.exists(_scaffold_path(entry.path))):
+            stale.append(entry.path)
+            continue
+        if (record.get('mtime_ns'), record.get('size')) == (stat.st_mtime_ns, stat.st_size):
+            report.skipped.append(entry.path)
+            continue
+        try:
+            digest = file_digest(entry.path)
+        except OSError:
+            continue
+        if digest == record.get('digest'):
+            manifest.set(entry.path, mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+            report.skipped.append(entry.path)
+        else:
+            stale.append(entry.path)
+
+    generated_tests = {}
+    scaffold_sources = {}
+    for file_path, functions, digest, error in _parse_sources(stale, jobs):
+        if error is not None:
+            report.errors.append((file_path, error))
+            continue
+        stat = stats[file_path]
+        record = manifest.get(file_path) if use_cache else None
+        unchanged_api = record is not None and record.get('functions') == functions
+        manifest.set(file_path, mtime_ns=stat.st_mtime_ns, size=stat.st_size, digest=digest, functions=functions)
+        test_file_path = _scaffold_path(file_path)
+        if not functions or (unchanged_api and os.path.exists(test_file_path)):
+            report.skipped.append(file_path)
+            continue
+        generated_tests[test_file_path] = render_test_file(_module_name(file_path), functions)
+        scaffold_sources[test_file_path] = file_path
+
+    write_test_files(generated_tests, manifest, report, scaffold_sources)
+    manifest.prune(sources)
+    manifest.save()
+    return report
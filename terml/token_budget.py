@@ -0,0 +1,9 @@
+# Rough token accounting used to size prompts without a tokenizer dependency.
+# Claude models average roughly four characters of English or code per token.
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def tokens_to_chars(tokens):
+    return tokens * CHARS_PER_TOKEN
@@ -0,0 +1,185 @@
+import functools
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from . import config
+
+TRACE_VERSION = 1
+
+# The spans of one terml invocation. Each span has a name, its offset from the
+# start of the command and its duration in milliseconds, plus attributes such
+# as token counts or file counts. The trace is written as one JSON line when
+# the command finishes.
+class Trace:
+    def __init__(self, command, origin):
+        self.command = command
+        self.origin = origin
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, name, start, seconds, attrs):
+        span = {'name': name, 'start_ms': _ms(start - self._start), 'duration_ms': _ms(seconds)}
+        span.update(attrs)
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dict(self, status):
+        return {
+            'version': TRACE_VERSION,
+            'command': self.command,
+            'origin': self.origin,
+            'started': self.started,
+            'duration_ms': _ms(time.perf_counter() - self._start),
+            'status': status,
+            'spans': self.spans,
+        }
+
+_current = None
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+def subcommand_name(command):
+    # Only the subcommand is kept: paths and chat input stay out of the trace
+    parts = command.split()
+    return parts[1].lower() if len(parts) > 1 else 'help'
+
+@contextmanager
+def trace_command(command, origin='cli'):
+    # The outermost call owns the trace; nested calls only run the body
+    global _current
+    if _current is not None or not config.TRACE_ENABLED:
+        yield
+        return
+    trace = _current = Trace(subcommand_name(command), origin)
+    status = 'ok'
+    try:
+        yield
+    except KeyboardInterrupt:
+        status = 'cancelled'
+        raise
+    except Exception:
+        status = 'error'
+        raise
+    finally:
+        _current = None
+        write_trace(trace.to_dict(status))
+
+@contextmanager
+def span(name, **attrs):
+    # Yields a dict the body can add attributes to, e.g. token counts
+    trace = _current
+    if trace is None:
+        yield attrs
+        return
+    start = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        trace.add(name, start, time.perf_counter() - start, attrs)
+
+def record(name, seconds, started=None, **attrs):
+    # A span measured by the caller; it ends now unless its perf_counter start is given
+    trace = _current
+    if trace is not None:
+        trace.add(name, time.perf_counter() - seconds if started is None else started, seconds, attrs)
+
+def traced(name):
+    # Decorator form of span() for functions traced as a whole
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def _rotate(path):
+    for index in range(config.TRACE_BACKUPS, 0, -1):
+        source = path if index == 1 else f"{path}.{index - 1}"
+        if os.path.exists(source):
+            os.replace(source, f"{path}.{index}")
+    if config.TRACE_BACKUPS <= 0:
+        os.unlink(path)
+
+def write_trace(entry):
+    # Tracing must never break a command, so I/O errors are dropped
+    path = config.TRACE_PATH
+    line = json.dumps(entry, separators=(',', ':'), default=str) + '\n'
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            if os.path.getsize(path) + len(line) > config.TRACE_MAX_BYTES:
+                _rotate(path)
+        except FileNotFoundError:
+            pass
+        with open(path, 'a') as f:
+            f.write(line)
+    except OSError:
+        pass
+
+def read_traces(path=None):
+    # Oldest first, across the rotated files
+    path = path or config.TRACE_PATH
+    paths = [f"{path}.{index}" for index in range(config.TRACE_BACKUPS, 0, -1)] + [path]
+    traces = []
+    for trace_path in paths:
+        try:
+            with open(trace_path, 'r') as f:
+                lines = f.readlines()
+        except OSError:
+            continue
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(entry, dict) and entry.get('version') == TRACE_VERSION:
+                traces.append(entry)
+    return traces
+
+def percentile(values, p):
+    # Nearest-rank percentile of a non-empty list
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+def summarize_traces(traces):
+    # Command totals come from the process the user ran; spans recorded by the
+    # daemon on its behalf are counted with the other spans. Cache hits are
+    # reported apart from real API calls and never count towards api.ttft.
+    commands = {}
+    spans = {}
+    for trace in traces:
+        if trace.get('origin') != 'daemon':
+            commands.setdefault(trace['command'], []).append(trace['duration_ms'])
+        for entry in trace.get('spans', []):
+            name = f"{entry['name']} (cached)" if entry.get('cached') else entry['name']
+            spans.setdefault(name, []).append(entry['duration_ms'])
+            if 'ttft_ms' in entry and not entry.get('cached'):
+                spans.setdefault('api.ttft', []).append(entry['ttft_ms'])
+    return {
+        'commands': {name: _stats(values) for name, values in sorted(commands.items())},
+        'spans': {name: _stats(values) for name, values in sorted(spans.items())},
+    }
+
+def _stats(values):
+    return {'count': len(values), 'p50': percentile(values, 50), 'p95': percentile(values, 95)}
+
+def format_stats(summary):
+    if not summary['commands'] and not summary['spans']:
+        return "No traces recorded yet."
+    lines = []
+    for title, rows in (("Command", summary['commands']), ("Span", summary['spans'])):
+        if not rows:
+            continue
+        width = max(len(title), max(len(name) for name in rows))
+        lines.append(f"{title:<{width}}  {'count':>6}  {'p50 ms':>10}  {'p95 ms':>10}")
+        for name, row in rows.items():
+            lines.append(f"{name:<{width}}  {row['count']:>6}  {row['p50']:>10.1f}  {row['p95']:>10.1f}")
+        lines.append("")
+    return "\n".join(lines).rstrip()
@@ -0,0 +1,91 @@
+import heapq
+import os
+from collections import Counter
+from . import config
+from .fs_walker import walk_files
+from .token_budget import tokens_to_chars
+
+class TreeProfile:
+    def __init__(self, rel_path, top_n):
+        self.rel_path = rel_path
+        self.top_n = top_n
+        self.file_count = 0
+        self.total_bytes = 0
+        self.extensions = Counter()
+        self.extension_bytes = Counter()
+        self.largest = []
+        self.children = {}
+
+    def add(self, rel_path, extension, size):
+        self.file_count += 1
+        self.total_bytes += size
+        self.extensions[extension] += 1
+        self.extension_bytes[extension] += size
+        if len(self.largest) < self.top_n:
+            heapq.heappush(self.largest, (size, rel_path))
+        elif size > self.largest[0][0]:
+            heapq.heapreplace(self.largest, (size, rel_path))
+
+    def largest_files(self):
+        return sorted(self.largest, reverse=True)
+
+def profile_tree(path, max_depth=None, top_n=None):
+    # One scandir pass: every file updates the profile of each ancestor
+    # directory down to max_depth, deeper directories roll up into those.
+    max_depth = config.SUMMARIZE_DIR_DEPTH if max_depth is None else max_depth
+    top_n = config.SUMMARIZE_DIR_TOP_FILES if top_n is None else top_n
+    root = TreeProfile('.', top_n)
+    for entry in walk_files(path):
+        try:
+            size = entry.stat().st_size
+        except OSError:
+            continue
+        rel_path = os.path.relpath(entry.path, path).replace(os.sep, '/')
+        extension = os.path.splitext(entry.name)[1].lower() or '(none)'
+        node = root
+        node.add(rel_path, extension, size)
+        for depth, part in enumerate(rel_path.split('/')[:-1], 1):
+            if depth > max_depth:
+                break
+            child = node.children.get(part)
+            if child is None:
+                child = node.children[part] = TreeProfile(f'{node.rel_path}/{part}' if node is not root else part, top_n)
+            child.add(rel_path, extension, size)
+            node = child
+    return root
+
+def _format_size(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+
+def _format_line(node, indent, top_extensions):
+    extensions = ", ".join(
+        f"{ext} {count} ({_format_size(node.extension_bytes[ext])})"
+        for ext, count in node.extensions.most_common(top_extensions)
+    )
+    largest = ", ".join(f"{rel_path} ({_format_size(size)})" for size, rel_path in node.largest_files())
+    return (f"{'  ' * indent}{node.rel_path}/: {node.file_count} files, {_format_size(node.total_bytes)}"
+            f"; types: {extensions}; largest: {largest}")
+
+def format_profile(profile, max_tokens=None, top_extensions=5):
+    # Larger subtrees are listed first, and lines stop once the token budget is
+    # used, so the prompt size is bounded however big the directory is.
+    max_chars = tokens_to_chars(config.SUMMARIZE_DIR_TOKEN_BUDGET if max_tokens is None else max_tokens)
+    lines = [_format_line(profile, 0, top_extensions)]
+    used = len(lines[0])
+    omitted = 0
+    stack = [(child, 1) for child in sorted(profile.children.values(), key=lambda n: n.total_bytes)]
+    while stack:
+        node, indent = stack.pop()
+        line = _format_line(node, indent, top_extensions)
+        if used + len(line) + 1 > max_chars:
+            omitted += 1
+            continue
+        lines.append(line)
+        used += len(line) + 1
+        stack.extend((child, indent + 1) for child in sorted(node.children.values(), key=lambda n: n.total_bytes))
+    if omitted:
+        lines.append(f"... {omitted} more subtrees omitted")
+    return "\n".join(lines)
@@ -1,6 +1,22 @@
 import sys
 import os
+import pytest
 
 # Add the project root directory to the Python path
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-sys.path.insert(0, project_root)
\ No newline at end of file
+sys.path.insert(0, project_root)
+
+from terml import config
+
+@pytest.fixture(autouse=True)
+def isolated_terml_dirs(tmp_path, monkeypatch):
+    # Keep caches, journals, traces, cassettes and user templates used by tests out of the
+    # user's real directories, whatever TERML_* variables are set. The socket points at
+    # tmp_path too, so CLI tests never forward commands to a daemon the user is running.
+    monkeypatch.setattr(config, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(config, "JOURNAL_PATH", str(tmp_path / "data" / "journal"))
+    monkeypatch.setattr(config, "TRACE_PATH", str(tmp_path / "data" / "trace.jsonl"))
+    monkeypatch.setattr(config, "AI_MODE", "live")
+    monkeypatch.setattr(config, "AI_CASSETTE", str(tmp_path / "data" / "cassette.jsonl"))
+    monkeypatch.setattr(config, "TEMPLATE_DIRS", [str(tmp_path / "templates")])
+    monkeypatch.setattr(config, "DAEMON_SOCKET", str(tmp_path / "terml.sock"))
@@ -39,6 +39,44 @@ def test_get_ai_response(mock_anthropic, ai_integration):
         ]
     )
 
+def test_stream_ai_response(ai_integration):
+    mock_client = MagicMock()
+    mock_stream = MagicMock()
+    mock_stream.text_stream = iter(["Hello", ", ", "world"])
+    mock_client.messages.stream.return_value.__enter__.return_value = mock_stream
+    ai_integration.client = mock_client
+
+    chunks = list(ai_integration.stream_ai_response("Test prompt", "Test system prompt", 100))
+
+    assert chunks == ["Hello", ", ", "world"]
+    assert ai_integration.last_time_to_first_token is not None
+    assert ai_integration.time_to_first_token_history == [ai_integration.last_time_to_first_token]
+    mock_client.messages.stream.assert_called_once_with(
+        model=config.AI_MODEL,
+        max_tokens=100,
+        messages=[
+            {"role": "system", "content": "Test system prompt"},
+            {"role": "user", "content": "Test prompt"}
+        ]
+    )
+
+def test_stream_ai_response_error(ai_integration):
+    mock_client = MagicMock()
+    mock_client.messages.stream.side_effect = Exception("connection reset")
+    ai_integration.client = mock_client
+
+    chunks = list(ai_integration.stream_ai_response("Test prompt", "Test system prompt", 100))
+
+    assert chunks == ["Error: connection reset"]
+    assert ai_integration.last_time_to_first_token is None
+
+def test_explain_output_stream(ai_integration):
+    with patch.object(AIIntegration, 'stream_ai_response') as mock_stream_ai_response:
+        mock_stream_ai_response.return_value = iter(["Mocked ", "explanation"])
+        explanation = ai_integration.explain_output("Test output", stream=True)
+        assert "".join(explanation) == "Mocked explanation"
+        mock_stream_ai_response.assert_called_once()
+
 def test_explain_output(ai_integration):
     with patch.object(AIIntegration, 'get_ai_response') as mock_get_ai_response:
         mock_get_ai_response.return_value = "Mocked explanation"
@@ -115,5 +153,42 @@ def test_suggest_test_improvements(ai_integration):
         assert suggestions == "Add more edge case tests to improve coverage."
         mock_get_ai_response.assert_called_once()
 
+def test_iter_code_improvements_runs_groups_concurrently(ai_integration):
+    import asyncio
+    in_flight = []
+    peak = []
+
+    async def fake_create(**kwargs):
+        in_flight.append(1)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0.05 if "slow.py" in kwargs["messages"][1]["content"] else 0.01)
+        in_flight.pop()
+        response = MagicMock()
+        response.content = "Split the long functions."
+        return response
+
+    ai_integration.async_client = MagicMock()
+    ai_integration.async_client.messages.create = fake_create
+    issues = {f"file{i}.py": ["Function 'f' is too long (60 lines). Consider refactoring."] for i in range(5)}
+    issues["slow.py"] = ["Class 'C' has too many methods (12). Consider splitting it."]
+
+    results = list(ai_integration.iter_code_improvements(issues, group_size=2, concurrency=2))
+
+    assert sorted(path for paths, _ in results for path in paths) == sorted(issues)
+    assert all(suggestions == "Split the long functions." for _, suggestions in results)
+    assert max(peak) == 2
+    assert results[-1][0] == ["file4.py", "slow.py"]
+
+def test_iter_code_improvements_reports_errors(ai_integration):
+    async def failing_create(**kwargs):
+        raise RuntimeError("overloaded")
+
+    ai_integration.async_client = MagicMock()
+    ai_integration.async_client.messages.create = failing_create
+
+    results = list(ai_integration.iter_code_improvements({"a.py": ["issue"]}))
+
+    assert results == [(["a.py"], "Error: overloaded")]
+
 if __name__ == "__main__":
     pytest.main([__file__])
\ No newline at end of file
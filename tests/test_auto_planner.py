@@ -0,0 +1,108 @@
+import json
+import threading
+from unittest.mock import MagicMock, patch
+import pytest
+from click.testing import CliRunner
+from terml.auto_planner import AutoPlanner, PlanStep, parse_plan
+from terml.main import cli
+
+def _plan(*commands):
+    return json.dumps({"steps": [{"command": c, "explanation": f"runs {c}"} for c in commands]})
+
+def test_parse_plan_accepts_fenced_json():
+    text = "Here is the plan:\n```json\n" + _plan("npm init -y", "npm install express") + "\n```"
+    assert parse_plan(text) == [
+        PlanStep("npm init -y", "runs npm init -y"),
+        PlanStep("npm install express", "runs npm install express"),
+    ]
+
+def test_parse_plan_rejects_prose():
+    with pytest.raises(ValueError):
+        parse_plan("Run npm init -y to get started.")
+
+def test_successful_step_uses_speculative_replan():
+    ai = MagicMock()
+    release = threading.Event()
+    responses = [_plan("a", "b"), _plan("b2")]
+
+    def plan_auto_steps(goal, tech_stack, completed=None, remaining=None):
+        if completed:
+            release.wait(5)
+        return responses.pop(0)
+    ai.plan_auto_steps.side_effect = plan_auto_steps
+
+    planner = AutoPlanner(ai, "api", "node", prefetch=True)
+    assert planner.plan() is None
+    step = planner.next_step()
+    planner.prefetch(step)
+    # The re-plan is already in flight before the step has even run
+    assert ai.plan_auto_steps.call_count == 2
+    completed_arg = ai.plan_auto_steps.call_args[0][2]
+    assert "$ a  (exit status 0)" in completed_arg
+    release.set()
+    planner.complete(step, 0, "done")
+    planner.close()
+
+    assert planner.steps == [PlanStep("b2", "runs b2")]
+    assert ai.plan_auto_steps.call_count == 2
+
+def test_successful_step_with_output_replans_with_that_output():
+    ai = MagicMock()
+    ai.plan_auto_steps.side_effect = [_plan("a", "b"), _plan("speculative"), _plan("b", "c")]
+    output = "Created package.json\n" + "added 57 packages, found 2 vulnerabilities\n" * 3
+
+    planner = AutoPlanner(ai, "api", "node", prefetch=True)
+    planner.plan()
+    step = planner.next_step()
+    planner.prefetch(step)
+    planner.complete(step, 0, output)
+    planner.close()
+
+    assert [s.command for s in planner.steps] == ["b", "c"]
+    assert ai.plan_auto_steps.call_count == 3
+    completed_arg = ai.plan_auto_steps.call_args[0][2]
+    assert "$ a  (exit status 0)" in completed_arg
+    assert "2 vulnerabilities" in completed_arg
+
+def test_failed_step_discards_speculation_and_replans_with_output():
+    ai = MagicMock()
+    ai.plan_auto_steps.side_effect = [_plan("a", "b"), _plan("speculative"), _plan("fix-a", "b")]
+
+    planner = AutoPlanner(ai, "api", "node", prefetch=True)
+    planner.plan()
+    step = planner.next_step()
+    planner.prefetch(step)
+    planner.complete(step, 1, "a: permission denied")
+    planner.close()
+
+    assert [s.command for s in planner.steps] == ["fix-a", "b"]
+    completed_arg = ai.plan_auto_steps.call_args[0][2]
+    assert "(exit status 1)" in completed_arg
+    assert "permission denied" in completed_arg
+
+def test_unusable_replan_keeps_remaining_steps():
+    ai = MagicMock()
+    ai.plan_auto_steps.side_effect = [_plan("a", "b"), "Error: overloaded"]
+
+    planner = AutoPlanner(ai, "api", "node", prefetch=True)
+    planner.plan()
+    step = planner.next_step()
+    planner.prefetch(step)
+    planner.complete(step, 0, "")
+    planner.close()
+
+    assert [s.command for s in planner.steps] == ["b"]
+
+@patch("terml.commands.CommandExecutor.ai_integration", new_callable=MagicMock)
+def test_auto_command_runs_plan(mock_ai, monkeypatch):
+    monkeypatch.setattr("terml.config.AUTO_PREFETCH", False)
+    mock_ai.plan_auto_steps.side_effect = [_plan("echo one", "echo two")]
+
+    result = CliRunner().invoke(cli, ["auto", "--with-user"], input="api\nnode\ny\ny\nn\ny\n")
+
+    assert "TerML suggests: echo one" in result.output
+    assert "This command will: runs echo one" in result.output
+    assert "TerML suggests: echo two" in result.output
+    assert "Command skipped." in result.output
+    assert "All planned steps are done." in result.output
+    assert mock_ai.plan_auto_steps.call_count == 1
@@ -0,0 +1,41 @@
+import json
+import time
+from benchmarks import run_benchmarks
+from benchmarks.fake_anthropic import FakeAnthropic
+from terml import config
+
+# Smoke tests for the benchmark harness only; the benchmarks themselves run
+# with `python -m benchmarks.run_benchmarks`.
+
+def test_fake_client_paces_streamed_tokens():
+    client = FakeAnthropic(latency=0.01, tokens_per_second=200, reply_tokens=10)
+    messages = [{"role": "system", "content": "system"}, {"role": "user", "content": "prompt"}]
+
+    start = time.perf_counter()
+    with client.messages.stream(model="m", max_tokens=5, messages=messages) as stream:
+        text = "".join(stream.text_stream)
+    elapsed = time.perf_counter() - start
+
+    assert text.split() == ["lorem", "ipsum", "dolor", "sit", "amet"]
+    assert elapsed >= 0.01 + 5 / 200
+    assert stream.get_final_message().usage.output_tokens == 5
+    assert client.requests == 1
+
+def test_regressions_fail_the_run(tmp_path, monkeypatch):
+    for name in ("CACHE_DIR", "DATA_DIR", "JOURNAL_PATH", "DAEMON_SOCKET", "TRACE_ENABLED", "TEMPLATE_DIRS"):
+        monkeypatch.setattr(config, name, getattr(config, name))
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "offline-benchmark")
+    monkeypatch.setattr(run_benchmarks, "E2E_REPO_FILES", 30)
+    baseline = tmp_path / "baselines.json"
+    argv = ["--sizes", "40", "--repeat", "1", "--latency", "0", "--tokens-per-second", "0",
+            "--workdir", str(tmp_path / "work"), "--baseline", str(baseline)]
+
+    assert run_benchmarks.main(argv) == 0
+    recorded = json.loads(baseline.read_text())
+    assert {"e2e.explain", "e2e.deps", "analyze.cold.40", "analyze.warm.40", "test_generator.40", "summarize.40"} <= set(recorded["results"])
+
+    recorded["results"]["analyze.cold.40"] = 1e-9
+    baseline.write_text(json.dumps(recorded))
+    assert run_benchmarks.main(argv) == 1
+
+    assert run_benchmarks.main(argv + ["--latency", "0.001", "--skip-subcommands"]) == 2
@@ -0,0 +1,87 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from terml import config
+from terml.ai_integration import AIIntegration
+from terml.cassette import request_key
+from terml.conversation import Conversation
+from terml.daemon import forward
+
+def _message(text, input_tokens=10, output_tokens=5):
+    return SimpleNamespace(content=[SimpleNamespace(type="text", text=text)],
+                           usage=SimpleNamespace(input_tokens=input_tokens, output_tokens=output_tokens))
+
+def _recording_ai(monkeypatch, live_client):
+    monkeypatch.setattr(config, "AI_MODE", "record")
+    with patch("terml.ai_integration.anthropic.Anthropic", return_value=live_client):
+        return AIIntegration()
+
+def _replaying_ai(monkeypatch):
+    monkeypatch.setattr(config, "AI_MODE", "replay")
+    with patch("terml.ai_integration.anthropic.Anthropic", side_effect=AssertionError("no network in replay")):
+        return AIIntegration()
+
+def test_recorded_replies_replay_without_the_api(monkeypatch):
+    live = MagicMock()
+    live.messages.create.return_value = _message("Use ls -la.")
+    recorder = _recording_ai(monkeypatch, live)
+    assert recorder.cache is None
+    assert recorder.get_ai_response("How do I list files?", "system", 100, cache_ttl=3600) == "Use ls -la."
+
+    lines = open(config.AI_CASSETTE).read().splitlines()
+    assert [json.loads(line)["t"] for line in lines] == ["Use ls -la."]
+    assert "How do I list files?" not in lines[0]
+
+    replayer = _replaying_ai(monkeypatch)
+    assert replayer.get_ai_response("How do I list files?", "system", 100) == "Use ls -la."
+    assert replayer.get_ai_response("Something new", "system", 100).startswith("Error: No recorded response")
+
+def test_repeated_requests_replay_in_recorded_order(monkeypatch):
+    live = MagicMock()
+    live.messages.create.side_effect = [_message("first"), _message("second")]
+    recorder = _recording_ai(monkeypatch, live)
+    recorder.get_ai_response("plan", "system", 100)
+    recorder.get_ai_response("plan", "system", 100)
+
+    replayer = _replaying_ai(monkeypatch)
+    assert [replayer.get_ai_response("plan", "system", 100) for _ in range(3)] == ["first", "second", "second"]
+
+def test_request_key_ignores_cache_markers_and_outer_whitespace():
+    plain = request_key("model", 100, [{"role": "user", "content": "hello"}], system="be brief")
+    marked = request_key(
+        "model", 100,
+        [{"role": "user", "content": [{"type": "text", "text": "hello\n", "cache_control": {"type": "ephemeral"}}]}],
+        system=[{"type": "text", "text": " be brief", "cache_control": {"type": "ephemeral"}}],
+    )
+    assert plain == marked
+    assert plain != request_key("model", 200, [{"role": "user", "content": "hello"}], system="be brief")
+
+def test_streams_and_conversations_replay(monkeypatch):
+    live = MagicMock()
+    stream = live.messages.stream.return_value.__enter__.return_value
+    stream.text_stream = ["Hel", "lo"]
+    stream.get_final_message.return_value = _message("Hello")
+    live.messages.create.return_value = _message("Sure.")
+    recorder = _recording_ai(monkeypatch, live)
+    assert "".join(recorder.stream_ai_response("Explain", "system", 100)) == "Hello"
+    assert Conversation(recorder).send("Hi there") == "Sure."
+
+    replayer = _replaying_ai(monkeypatch)
+    assert "".join(replayer.stream_ai_response("Explain", "system", 100)) == "Hello"
+    assert Conversation(replayer).send("Hi there") == "Sure."
+
+def test_async_requests_replay(monkeypatch):
+    live = MagicMock()
+    live.messages.create.return_value = _message("Split the module.")
+    recorder = _recording_ai(monkeypatch, live)
+    recorder.get_ai_response("improve", "system", 100)
+
+    replayer = _replaying_ai(monkeypatch)
+    assert asyncio.run(replayer.get_ai_response_async("improve", "system", 100)) == "Split the module."
+
+def test_commands_are_not_forwarded_to_the_daemon_outside_live_mode(monkeypatch):
+    monkeypatch.setattr(config, "AI_MODE", "replay")
+    with patch("terml.daemon._request") as mock_request:
+        assert forward("terml explain") is None
+    mock_request.assert_not_called()
@@ -0,0 +1,140 @@
+import os
+from unittest.mock import ANY, patch, MagicMock
+from terml import config
+from terml.analysis_cache import AnalysisCache
+from terml.code_analyzer import CodeAnalyzer, analyze_project, ruleset_version
+from terml.commands import CommandExecutor
+
+def _write_project(root, count):
+    for i in range(count):
+        package = root / f"pkg{i % 3}"
+        package.mkdir(exist_ok=True)
+        body = "\n".join(f"    x{j} = {j}" for j in range(i % 2 * 60 + 1))
+        (package / f"module{i}.py").write_text(f"import os as o{i}\n\ndef func{i}():\n{body}\n")
+
+def test_analyze_file_reports_issues(tmp_path):
+    source = tmp_path / "module.py"
+    source.write_text("import numpy as np\n\ndef f():\n" + "\n".join(f"    x{i} = {i}" for i in range(51)) + "\n")
+
+    issues = CodeAnalyzer().analyze_file(str(source))
+
+    assert issues == [
+        "Consider using 'from numpy import np' instead of 'import numpy as np'",
+        "Function 'f' is too long (51 lines). Consider refactoring.",
+    ]
+
+def test_parallel_analysis_matches_sequential(tmp_path, monkeypatch):
+    _write_project(tmp_path, 12)
+    monkeypatch.setattr(config, "ANALYZE_CHUNK_SIZE", 2)
+
+    sequential = analyze_project(str(tmp_path), jobs=1, use_cache=False)
+    parallel = analyze_project(str(tmp_path), jobs=2, use_cache=False)
+
+    assert len(sequential) == 12
+    assert parallel == sequential
+    assert list(parallel) == list(sequential)
+
+def test_workers_apply_the_rule_set_resolved_by_the_parent(tmp_path, monkeypatch):
+    from terml import code_analyzer
+    _write_project(tmp_path, 12)
+    monkeypatch.setattr(config, "ANALYZE_CHUNK_SIZE", 2)
+    # Any later resolution, e.g. in a worker, would disagree with the first one
+    resolve = MagicMock(side_effect=[["import-alias"]] + [["long-function"]] * 20)
+    monkeypatch.setattr(code_analyzer, "active_rules", resolve)
+
+    issues = analyze_project(str(tmp_path), jobs=2)
+
+    assert resolve.call_count == 1
+    assert all(issue.startswith("Consider using") for file_issues in issues.values() for issue in file_issues)
+    assert AnalysisCache(str(tmp_path), ruleset_version(["import-alias"])).entries
+
+def test_analyze_command_passes_jobs(tmp_path):
+    executor = CommandExecutor(MagicMock(), MagicMock())
+    with patch('terml.code_analyzer.analyze_project', return_value={}) as mock_analyze:
+        executor.execute(f"terml analyze {tmp_path} --jobs 4")
+    mock_analyze.assert_called_once_with(str(tmp_path), jobs=4, use_cache=True)
+
+def test_warm_run_skips_unchanged_files(tmp_path):
+    _write_project(tmp_path, 6)
+    cold = analyze_project(str(tmp_path))
+
+    with patch.object(CodeAnalyzer, 'analyze_file', wraps=CodeAnalyzer().analyze_file) as mock_analyze_file:
+        warm = analyze_project(str(tmp_path))
+
+    assert warm == cold
+    mock_analyze_file.assert_not_called()
+
+def test_changed_and_deleted_files_are_refreshed(tmp_path):
+    _write_project(tmp_path, 6)
+    analyze_project(str(tmp_path))
+    changed = tmp_path / "pkg0" / "module0.py"
+    changed.write_text("def small():\n    return 1\n")
+    os.remove(tmp_path / "pkg1" / "module1.py")
+
+    with patch.object(CodeAnalyzer, 'analyze_file', autospec=True, side_effect=CodeAnalyzer.analyze_file) as mock_analyze_file:
+        result = analyze_project(str(tmp_path))
+
+    mock_analyze_file.assert_called_once_with(ANY, str(changed))
+    assert str(changed) not in result
+    cache = AnalysisCache(str(tmp_path), ruleset_version())
+    assert os.path.join("pkg1", "module1.py") not in cache.entries
+    assert len(cache.entries) == 5
+
+def test_touched_file_with_same_content_is_not_reparsed(tmp_path):
+    _write_project(tmp_path, 2)
+    analyze_project(str(tmp_path))
+    touched = tmp_path / "pkg0" / "module0.py"
+    stat = touched.stat()
+    os.utime(touched, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    with patch.object(CodeAnalyzer, 'analyze_file') as mock_analyze_file:
+        analyze_project(str(tmp_path))
+
+    mock_analyze_file.assert_not_called()
+
+def test_uncached_analysis_does_not_hash_files(tmp_path):
+    _write_project(tmp_path, 3)
+    with patch("terml.code_analyzer.content_digest") as mock_digest:
+        assert len(analyze_project(str(tmp_path), use_cache=False)) == 3
+    mock_digest.assert_not_called()
+
+def test_ruleset_version_change_invalidates_cache(tmp_path):
+    _write_project(tmp_path, 2)
+    analyze_project(str(tmp_path))
+    assert AnalysisCache(str(tmp_path), ruleset_version()).entries
+    assert AnalysisCache(str(tmp_path), "other-version").entries == {}
+
+def test_disabled_rules_are_skipped(tmp_path, monkeypatch):
+    source = tmp_path / "module.py"
+    source.write_text("import numpy as np\n")
+    monkeypatch.setattr(config, "DISABLED_ANALYZER_RULES", ["import-alias"])
+
+    assert CodeAnalyzer().analyze_file(str(source)) == []
+
+def test_registered_rules_run_in_one_pass(tmp_path):
+    from terml import code_analyzer
+    source = tmp_path / "module.py"
+    source.write_text("def outer():\n    def inner():\n        pass\n")
+    seen = []
+
+    @code_analyzer.rule("test-function-names", code_analyzer.ast.FunctionDef, enabled=False)
+    def check_function_names(node):
+        seen.append(node.name)
+        return [f"Function '{node.name}' seen"]
+
+    try:
+        assert CodeAnalyzer().analyze_file(str(source)) == []
+        analyzer = CodeAnalyzer(rule_names=["test-function-names", "long-function"])
+        assert analyzer.analyze_file(str(source)) == ["Function 'outer' seen", "Function 'inner' seen"]
+        assert seen == ["outer", "inner"]
+    finally:
+        del code_analyzer.RULES["test-function-names"]
+
+def test_deeply_nested_code_does_not_hit_recursion_limit():
+    import ast
+    expression = ast.Constant(1)
+    for _ in range(5000):
+        expression = ast.BinOp(left=expression, op=ast.Add(), right=ast.Constant(1))
+    tree = ast.Module(body=[ast.Expr(expression)], type_ignores=[])
+
+    assert CodeAnalyzer().analyze_tree(tree) == []
@@ -0,0 +1,82 @@
+from unittest.mock import MagicMock, patch
+from click.testing import CliRunner
+from terml import config
+from terml.ai_integration import AIIntegration, Reply
+from terml.conversation import Conversation
+from terml.main import cli
+
+def _reply(text):
+    message = MagicMock()
+    message.content = [MagicMock(text=text)]
+    return message
+
+def _ai(*replies):
+    ai = AIIntegration(use_cache=False)
+    ai.client = MagicMock()
+    ai.client.messages.create.side_effect = [_reply(text) for text in replies]
+    return ai
+
+def test_send_keeps_history_and_marks_cache_breakpoints():
+    ai = _ai("Use ls.", "Add -a.")
+    conversation = Conversation(ai)
+
+    assert conversation.send("How do I list files?") == "Use ls."
+    assert conversation.send("And hidden ones?") == "Add -a."
+
+    kwargs = ai.client.messages.create.call_args[1]
+    assert kwargs["system"] == [{"type": "text", "text": config.CHAT_PROMPT, "cache_control": {"type": "ephemeral"}}]
+    assert kwargs["messages"] == [
+        {"role": "user", "content": "How do I list files?"},
+        {"role": "assistant", "content": [{"type": "text", "text": "Use ls.", "cache_control": {"type": "ephemeral"}}]},
+        {"role": "user", "content": "And hidden ones?"},
+    ]
+    assert conversation.turns == [("How do I list files?", "Use ls."), ("And hidden ones?", "Add -a.")]
+
+def test_old_turns_are_folded_into_a_summary():
+    ai = _ai("a" * 600, "b" * 600, "c" * 600)
+    conversation = Conversation(ai, system_prompt="sys", context_tokens=300)
+    with patch.object(AIIntegration, "get_ai_response", return_value="User asked about q1 and q2.") as mock_summary:
+        conversation.send("q1")
+        conversation.send("q2")
+        mock_summary.assert_not_called()
+        conversation.send("q3")
+
+    mock_summary.assert_called_once()
+    assert "User: q1" in mock_summary.call_args[0][0]
+    assert conversation.summary == "User asked about q1 and q2."
+    assert [user for user, _ in conversation.turns] == ["q3"]
+    system = ai.client.messages.create.call_args[1]["system"]
+    assert system[1]["text"].endswith("User asked about q1 and q2.")
+    assert conversation.context_size() <= 300
+
+def test_failed_turn_is_not_recorded():
+    ai = AIIntegration(use_cache=False)
+    ai.client = MagicMock()
+    ai.client.messages.create.side_effect = Exception("overloaded")
+    conversation = Conversation(ai)
+
+    assert conversation.send("hi") == "Error: overloaded"
+    assert conversation.turns == []
+
+def test_stream_records_turn_after_completion():
+    ai = AIIntegration(use_cache=False)
+    ai.client = MagicMock()
+    stream = ai.client.messages.stream.return_value.__enter__.return_value
+    stream.text_stream = iter(["Hel", "lo"])
+    conversation = Conversation(ai)
+
+    assert "".join(conversation.send("hi", stream=True)) == "Hello"
+    assert conversation.turns == [("hi", "Hello")]
+    assert ai.last_time_to_first_token is not None
+    assert ai.client.messages.stream.call_args[1]["system"][0]["cache_control"] == {"type": "ephemeral"}
+
+@patch("terml.commands.CommandExecutor.ai_integration", new_callable=MagicMock)
+def test_chat_command_uses_one_conversation(mock_ai, monkeypatch):
+    monkeypatch.setattr(config, "STREAM_RESPONSES", False)
+    mock_ai.create_message.side_effect = [Reply("first"), Reply("second")]
+
+    result = CliRunner().invoke(cli, ["--no-cache", "chat", "-q"], input="one\ntwo\nexit\n")
+
+    assert "TerML: first" in result.output
+    assert "TerML: second" in result.output
+    assert len(mock_ai.create_message.call_args[0][1]) == 3
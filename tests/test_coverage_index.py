@@ -0,0 +1,57 @@
+import os
+import time
+from unittest.mock import patch
+from terml.ai_integration import AIIntegration
+from terml.coverage_index import CoverageIndex, select_test_context
+
+def _write(root, path, text, age_days=0):
+    full_path = root / path
+    full_path.parent.mkdir(parents=True, exist_ok=True)
+    full_path.write_text(text)
+    stamp = time.time() - age_days * 86400
+    os.utime(full_path, (stamp, stamp))
+
+def _project(tmp_path):
+    _write(tmp_path, "pkg/calc.py", "def add(a, b):\n    return a + b\n\ndef sub(a, b):\n    return a - b\n\ndef mul(a, b):\n    return a * b\n", 30)
+    _write(tmp_path, "pkg/text.py", "class Formatter:\n    def shout(self, s):\n        return s.upper()\n", 30)
+    _write(tmp_path, "tests/unit/test_calc.py", "from pkg.calc import add\n\ndef test_add():\n    assert add(1, 2) == 3\n", 30)
+    _write(tmp_path, "tests/test_text.py", "from pkg.text import Formatter\n\ndef test_shout():\n    assert Formatter().shout('a') == 'A'\n", 30)
+
+def test_index_maps_tests_to_modules_and_gaps(tmp_path):
+    _project(tmp_path)
+    index = CoverageIndex(str(tmp_path))
+
+    assert sorted(index.uncovered_symbols()) == [("pkg/calc.py", "mul"), ("pkg/calc.py", "sub")]
+    targets = {test.rel_path: [source.rel_path for source in test.targets] for test in index.tests}
+    assert targets == {"tests/unit/test_calc.py": ["pkg/calc.py"], "tests/test_text.py": ["pkg/text.py"]}
+
+def test_ranking_prefers_gaps_then_recent_changes(tmp_path):
+    _project(tmp_path)
+    ranked = [test.rel_path for test in CoverageIndex(str(tmp_path)).ranked_tests()]
+    assert ranked == ["tests/unit/test_calc.py", "tests/test_text.py"]
+
+    _write(tmp_path, "pkg/calc.py", "def add(a, b):\n    return a + b\n", 30)
+    _write(tmp_path, "tests/test_text.py", "from pkg.text import Formatter\n\ndef test_shout():\n    pass\n", 0)
+    ranked = [test.rel_path for test in CoverageIndex(str(tmp_path)).ranked_tests()]
+    assert ranked == ["tests/test_text.py", "tests/unit/test_calc.py"]
+
+def test_context_respects_token_budget(tmp_path):
+    _project(tmp_path)
+    for i in range(50):
+        _write(tmp_path, f"tests/bulk/test_bulk{i}.py", f"def test_case_{i}():\n    assert True\n" * 20, 60)
+
+    context = select_test_context(str(tmp_path), max_tokens=1000)
+
+    assert len(context) <= 4000
+    assert context.startswith("Public source symbols that no test refers to:")
+    assert "File: tests/unit/test_calc.py" in context
+    assert "lower-ranked test files omitted" in context
+
+def test_suggest_test_improvements_sends_selected_context(tmp_path):
+    _project(tmp_path)
+    with patch.object(AIIntegration, "get_ai_response", return_value="Test sub and mul.") as mock_get_ai_response:
+        assert AIIntegration().suggest_test_improvements(str(tmp_path)) == "Test sub and mul."
+
+    prompt = mock_get_ai_response.call_args[0][0]
+    assert "- pkg/calc.py: sub" in prompt
+    assert "File: tests/test_text.py" in prompt
@@ -0,0 +1,88 @@
+import json
+import socket
+import threading
+import click
+import pytest
+from unittest.mock import MagicMock
+from terml import daemon
+
+pytestmark = pytest.mark.skipif(not hasattr(daemon.socket, "AF_UNIX"), reason="Unix sockets are not available")
+
+@pytest.fixture
+def running_daemon(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    socket_path = str(tmp_path / "terml.sock")
+    server = daemon.TermlDaemon(socket_path)
+    executor = MagicMock()
+    executor.execute.side_effect = lambda command: click.echo(f"ran {command}")
+    server._executor = MagicMock(return_value=executor)
+    server._terminal_handler = MagicMock()
+    thread = threading.Thread(target=server.serve, daemon=True)
+    thread.start()
+    yield socket_path, server, executor
+    daemon.shutdown(socket_path)
+    thread.join(timeout=5)
+
+def test_forward_without_daemon_returns_none(tmp_path):
+    assert daemon.forward("terml explain", socket_path=str(tmp_path / "missing.sock")) is None
+
+def test_forward_streams_output(running_daemon, capsys):
+    socket_path, server, executor = running_daemon
+
+    exit_code = daemon.forward("terml explain", socket_path=socket_path)
+
+    assert exit_code == 0
+    assert capsys.readouterr().out == "ran terml explain\n"
+    executor.execute.assert_called_once_with("terml explain")
+    server._executor.assert_called_once_with(False)
+
+def test_forward_reports_failures(running_daemon, capsys):
+    socket_path, server, executor = running_daemon
+    executor.execute.side_effect = RuntimeError("boom")
+
+    assert daemon.forward("terml summarize .", no_cache=True, socket_path=socket_path) == 1
+    assert "RuntimeError: boom" in capsys.readouterr().out
+    server._executor.assert_called_once_with(True)
+
+def test_lost_connection_fails_instead_of_running_locally(tmp_path, capsys):
+    socket_path = str(tmp_path / "terml.sock")
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    listener.listen(1)
+
+    def drop_mid_stream():
+        conn, _ = listener.accept()
+        with conn, conn.makefile("r") as reader:
+            reader.readline()
+            conn.sendall((json.dumps({"out": "Adding requests\n"}) + "\n").encode("utf-8"))
+
+    thread = threading.Thread(target=drop_mid_stream, daemon=True)
+    thread.start()
+    try:
+        exit_code = daemon.forward("terml deps add requests", socket_path=socket_path)
+    finally:
+        thread.join(timeout=5)
+        listener.close()
+
+    assert exit_code == 1
+    captured = capsys.readouterr()
+    assert captured.out == "Adding requests\n"
+    assert "Lost the connection to the TerML daemon" in captured.err
+
+def test_interactive_commands_are_not_forwarded(running_daemon):
+    socket_path, server, executor = running_daemon
+    assert daemon.forward("terml chat -q", socket_path=socket_path) is None
+    executor.execute.assert_not_called()
+
+def test_ping_and_shutdown(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    socket_path = str(tmp_path / "terml.sock")
+    server = daemon.TermlDaemon(socket_path)
+    thread = threading.Thread(target=server.serve, daemon=True)
+    thread.start()
+
+    assert daemon.ping(socket_path) is not None
+    assert daemon.shutdown(socket_path)
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert daemon.ping(socket_path) is None
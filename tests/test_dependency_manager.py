@@ -0,0 +1,129 @@
+import json
+import time
+from unittest.mock import MagicMock, patch
+from click.testing import CliRunner
+from terml import dependency_manager
+from terml.dependency_manager import get_outdated_dependencies
+from terml.main import cli
+from terml.requirements_file import RequirementsFile
+
+OUTDATED = [{"name": "click", "version": "8.0.3", "latest_version": "8.1.7"}]
+
+def _python_project(tmp_path):
+    (tmp_path / "requirements.txt").write_text("pytest==6.2.5\nclick==8.0.3\n")
+    return str(tmp_path)
+
+@patch("terml.dependency_manager.check_outdated_dependencies", return_value=OUTDATED)
+def test_outdated_check_is_cached(mock_check, tmp_path):
+    project = _python_project(tmp_path)
+
+    assert get_outdated_dependencies(project)[0] == OUTDATED
+    assert get_outdated_dependencies(project)[0] == OUTDATED
+    mock_check.assert_called_once()
+
+@patch("terml.dependency_manager.check_outdated_dependencies", return_value=OUTDATED)
+def test_manifest_change_invalidates_cache(mock_check, tmp_path):
+    project = _python_project(tmp_path)
+    get_outdated_dependencies(project)
+    (tmp_path / "requirements.txt").write_text("click==8.1.7\n")
+
+    get_outdated_dependencies(project)
+
+    assert mock_check.call_count == 2
+
+@patch("terml.dependency_manager.subprocess.Popen")
+@patch("terml.dependency_manager.check_outdated_dependencies", return_value=OUTDATED)
+def test_expired_cache_is_returned_and_refreshed_in_background(mock_check, mock_popen, tmp_path, monkeypatch):
+    project = _python_project(tmp_path)
+    get_outdated_dependencies(project)
+    monkeypatch.setattr("terml.config.DEPS_OUTDATED_TTL", -1)
+
+    assert get_outdated_dependencies(project)[0] == OUTDATED
+    assert get_outdated_dependencies(project)[0] == OUTDATED
+
+    mock_check.assert_called_once()
+    mock_popen.assert_called_once()
+    assert mock_popen.call_args[0][0][-2:] == ["refresh", str(tmp_path)]
+    assert mock_popen.call_args[1]["start_new_session"] is True
+
+@patch("terml.dependency_manager.subprocess")
+def test_offline_never_runs_package_manager(mock_subprocess, tmp_path):
+    project = _python_project(tmp_path)
+
+    assert get_outdated_dependencies(project, offline=True) == ([], None)
+    mock_subprocess.run.assert_not_called()
+    mock_subprocess.Popen.assert_not_called()
+
+def test_refresh_entry_point_writes_cache(tmp_path):
+    project = _python_project(tmp_path)
+    with patch("terml.dependency_manager.check_outdated_dependencies", return_value=OUTDATED):
+        assert dependency_manager.main(["refresh", project]) == 0
+
+    with patch("terml.dependency_manager.check_outdated_dependencies") as mock_check:
+        outdated, checked_at = get_outdated_dependencies(project, offline=True)
+    assert outdated == OUTDATED
+    assert checked_at <= time.time()
+    mock_check.assert_not_called()
+
+@patch("terml.dependency_manager.subprocess.run")
+def test_npm_outdated_is_normalized(mock_run, tmp_path):
+    (tmp_path / "package.json").write_text(json.dumps({"dependencies": {"express": "^4.0.0"}}))
+    mock_run.return_value = MagicMock(returncode=1, stdout=json.dumps({"express": {"current": "4.0.0", "latest": "4.19.2"}}))
+
+    assert dependency_manager.check_outdated_dependencies(str(tmp_path)) == [
+        {"name": "express", "version": "4.0.0", "latest_version": "4.19.2"}
+    ]
+
+def test_deps_list_offline(tmp_path, monkeypatch):
+    _python_project(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    with patch("terml.dependency_manager.subprocess") as mock_subprocess:
+        result = CliRunner().invoke(cli, ["deps", "list", "--offline"])
+
+    assert "Total dependencies: 2" in result.output
+    assert "Outdated dependencies: unknown" in result.output
+    mock_subprocess.run.assert_not_called()
+
+def test_parse_dependency_args_keeps_legacy_version_form():
+    assert dependency_manager.parse_dependency_args(["requests", "2.31.0"]) == ["requests==2.31.0"]
+    assert dependency_manager.parse_dependency_args(["a", "b==1.2", "c"]) == ["a", "b==1.2", "c"]
+    assert dependency_manager.parse_dependency_args(["b==1.2", "3.0"]) == ["b==1.2", "3.0"]
+
+@patch("terml.dependency_manager.get_installed_version", side_effect=lambda name: {"a": "1.0", "c": "3.1"}.get(name))
+@patch("terml.dependency_manager.subprocess.run")
+def test_add_dependencies_installs_once_and_writes_once(mock_run, mock_version, tmp_path):
+    (tmp_path / "requirements.txt").write_text("b==1.0\n")
+
+    with patch.object(RequirementsFile, "write", autospec=True, side_effect=RequirementsFile.write) as mock_write:
+        dependency_manager.add_dependencies(str(tmp_path), ["a", "b==1.2", "c"])
+
+    mock_run.assert_called_once()
+    assert mock_run.call_args[0][0][-4:] == ["install", "a", "b==1.2", "c"]
+    mock_write.assert_called_once()
+    assert (tmp_path / "requirements.txt").read_text() == "b==1.2\na==1.0\nc==3.1\n"
+
+@patch("terml.dependency_manager.subprocess.run")
+def test_remove_dependencies_uninstalls_once(mock_run, tmp_path):
+    (tmp_path / "requirements.txt").write_text("a==1.0\nb==1.2\nc==3.1\n")
+
+    dependency_manager.remove_dependencies(str(tmp_path), ["a", "c"])
+
+    mock_run.assert_called_once()
+    assert mock_run.call_args[0][0][-4:] == ["uninstall", "-y", "a", "c"]
+    assert (tmp_path / "requirements.txt").read_text() == "b==1.2\n"
+
+@patch("terml.dependency_manager.subprocess.run")
+def test_npm_add_uses_one_install(mock_run, tmp_path):
+    (tmp_path / "package.json").write_text("{}")
+
+    dependency_manager.add_dependencies(str(tmp_path), ["express", "lodash==4.17.21"])
+
+    mock_run.assert_called_once_with(["npm", "install", "express", "lodash@4.17.21"], cwd=str(tmp_path), check=True)
+
+def test_deps_add_command_batches(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with patch("terml.dependency_manager.add_dependencies") as mock_add:
+        result = CliRunner().invoke(cli, ["deps", "add", "requests", "2.31.0", "rich"])
+
+    mock_add.assert_called_once_with(str(tmp_path), ["requests==2.31.0", "rich"])
+    assert "Added 2 dependencies successfully." in result.output
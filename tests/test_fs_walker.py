@@ -0,0 +1,55 @@
+import os
+import pytest
+from terml.fs_walker import IgnoreMatcher, walk_files
+
+def _touch(root, *paths):
+    for path in paths:
+        full_path = root / path
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        full_path.write_text("")
+
+def _walk(root, **kwargs):
+    return [os.path.relpath(entry.path, root).replace(os.sep, '/') for entry in walk_files(str(root), **kwargs)]
+
+def test_prunes_default_directories(tmp_path):
+    _touch(tmp_path, "app.py", ".git/config", "venv/lib/site.py", "node_modules/x/index.js",
+           "build/lib/app.py", "dist/app.py", "pkg/__pycache__/app.pyc", "pkg/module.py")
+    assert _walk(tmp_path) == ["app.py", "pkg/module.py"]
+
+def test_root_only_names_are_walked_deeper_down(tmp_path):
+    _touch(tmp_path, "src/app/env/settings.py", "pkg/build/steps.py", "pkg/dist/names.py",
+           "tools/venv/pyvenv.cfg", "tools/venv/lib/site.py", "env/lib/site.py")
+    assert _walk(tmp_path) == ["pkg/build/steps.py", "pkg/dist/names.py", "src/app/env/settings.py"]
+
+def test_honours_gitignore_and_termlignore(tmp_path):
+    _touch(tmp_path, "keep.py", "secret.env", "logs/today.log", "generated/models.py", "docs/notes.txt")
+    (tmp_path / ".gitignore").write_text("*.env\nlogs/\n")
+    (tmp_path / ".termlignore").write_text("/generated\n")
+    assert _walk(tmp_path) == [".gitignore", ".termlignore", "keep.py", "docs/notes.txt"]
+
+def test_nested_ignore_files_and_negation(tmp_path):
+    _touch(tmp_path, "pkg/a.py", "pkg/b.py", "pkg/c.txt", "other/a.py")
+    (tmp_path / "pkg" / ".gitignore").write_text("*.py\n!b.py\n")
+    assert _walk(tmp_path, suffixes=('.py',)) == ["other/a.py", "pkg/b.py"]
+
+def test_ignored_directory_is_not_scanned(tmp_path, monkeypatch):
+    _touch(tmp_path, "data/huge/file.bin", "main.py")
+    (tmp_path / ".gitignore").write_text("data/\n")
+    scanned = []
+    real_scandir = os.scandir
+    monkeypatch.setattr(os, "scandir", lambda path: scanned.append(path) or real_scandir(path))
+    assert _walk(tmp_path) == [".gitignore", "main.py"]
+    assert scanned == [str(tmp_path)]
+
+@pytest.mark.parametrize("pattern,path,is_dir,expected", [
+    ("*.log", "a/b/debug.log", False, True),
+    ("/build", "build", True, True),
+    ("/build", "src/build", True, None),
+    ("docs/*.md", "docs/index.md", False, True),
+    ("docs/*.md", "docs/api/index.md", False, None),
+    ("**/fixtures/**", "tests/fixtures/data.json", False, True),
+    ("cache/", "cache", False, None),
+    ("file[0-9].txt", "file7.txt", False, True),
+])
+def test_ignore_matcher_patterns(pattern, path, is_dir, expected):
+    assert IgnoreMatcher([pattern]).match(path, is_dir) is expected
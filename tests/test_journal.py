@@ -0,0 +1,106 @@
+import os
+import shutil
+import subprocess
+import time
+import pytest
+from click.testing import CliRunner
+from terml.journal import Journal, record_command
+from terml.main import cli
+from terml.shell_hooks import render_hook
+from terml.terminal_handler import TerminalHandler
+
+@pytest.fixture
+def journal(tmp_path):
+    return Journal(path=str(tmp_path / "journal"), capacity=3, command_bytes=32, output_bytes=64)
+
+def test_empty_journal(journal):
+    assert journal.entries() == []
+    assert journal.last() is None
+    assert len(journal) == 0
+
+def test_append_and_read_last(journal):
+    journal.append("ls -la", exit_code=0, duration=0.5, output="total 0")
+    journal.append("make", exit_code=2, duration=1.25, output="error: missing target")
+
+    last = journal.last()
+    assert last.command == "make"
+    assert last.exit_code == 2
+    assert last.duration == 1.25
+    assert last.output == "error: missing target"
+    assert [entry.command for entry in journal.entries(10)] == ["ls -la", "make"]
+
+def test_ring_buffer_wraps_around(journal):
+    for i in range(5):
+        journal.append(f"echo {i}")
+
+    assert len(journal) == 3
+    assert [entry.command for entry in journal.entries(10)] == ["echo 2", "echo 3", "echo 4"]
+    assert [entry.command for entry in journal.entries(2)] == ["echo 3", "echo 4"]
+
+def test_long_command_and_output_are_capped(journal):
+    journal.append("x" * 100, output="head " + "y" * 100 + " tail")
+
+    last = journal.last()
+    assert last.command == "x" * 32
+    assert len(last.output.encode("utf-8")) == 64
+    assert last.output.endswith(" tail")
+
+def test_geometry_is_read_from_existing_file(journal, tmp_path):
+    journal.append("pwd")
+    reopened = Journal(path=str(tmp_path / "journal"), capacity=50, command_bytes=8, output_bytes=8)
+    assert reopened.last().command == "pwd"
+    assert reopened.capacity == 3
+
+def test_record_command_reads_and_removes_capture_file(journal, tmp_path):
+    capture_file = tmp_path / "capture"
+    capture_file.write_text("npm ERR! missing script: start\n")
+
+    assert record_command("npm start", exit_code=1, capture_file=str(capture_file), journal=journal)
+
+    last = journal.last()
+    assert last.command == "npm start"
+    assert last.exit_code == 1
+    assert "missing script" in last.output
+    assert not capture_file.exists()
+
+def test_record_command_skips_terml_invocations(journal):
+    assert not record_command("terml explain", journal=journal)
+    assert journal.last() is None
+
+def test_terminal_handler_falls_back_to_journal(journal):
+    journal.append("cat missing.txt", exit_code=1, output="cat: missing.txt: No such file or directory")
+    handler = TerminalHandler(journal=journal)
+
+    assert handler.get_last_command() == "cat missing.txt"
+    assert handler.get_last_output() == "cat: missing.txt: No such file or directory"
+    assert handler.get_history() == ["cat missing.txt"]
+
+def test_hook_command_prints_shell_hook():
+    result = CliRunner().invoke(cli, ["hook", "zsh"])
+    assert result.exit_code == 0
+    assert "add-zsh-hook precmd __terml_precmd" in result.output
+
+@pytest.mark.skipif(shutil.which("bash") is None, reason="bash is not installed")
+def test_bash_hook_hands_each_command_its_own_capture(tmp_path):
+    capture = tmp_path / "capture"
+    recorded = tmp_path / "recorded"
+    recorded.mkdir()
+    script = render_hook("bash") + f"""
+__terml_capture={capture}
+__terml_seq=0
+terml() {{
+    while [ "$1" != "--capture-file" ]; do shift; done
+    sleep 0.2
+    command cp "$2" {recorded}/"${{2##*.}}"
+}}
+echo first > "$__terml_capture"; __terml_started=1; __terml_precmd
+echo second >> "$__terml_capture"; __terml_started=1; __terml_precmd
+"""
+    subprocess.run(["bash", "-c", script], check=True)
+
+    deadline = time.monotonic() + 5
+    while len(os.listdir(recorded)) < 2 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert (recorded / "1").read_text() == "first\n"
+    assert (recorded / "2").read_text() == "second\n"
+    assert capture.read_text() == ""
@@ -0,0 +1,56 @@
+from unittest.mock import patch
+from terml.ai_integration import AIIntegration
+from terml.output_compactor import collapse_repeats, compact_output, strip_control_sequences
+from terml.token_budget import estimate_tokens
+
+def test_strip_control_sequences_removes_ansi_and_redraws():
+    text = "\x1b[31mred\x1b[0m\n\x1b]0;title\x07done\r\n 10%\r 50%\r100%\n"
+    assert strip_control_sequences(text) == ["red", "done", "100%", ""]
+
+def test_collapse_repeats_counts_near_duplicates():
+    lines = [f"Downloading chunk {i}/100" for i in range(1, 101)] + ["ok"]
+    assert collapse_repeats(lines) == [
+        "Downloading chunk 1/100  [... 98 similar lines ...]",
+        "Downloading chunk 100/100",
+        "ok",
+    ]
+
+def test_compact_output_is_unchanged_when_small():
+    assert compact_output("line one\nline two\n", 100) == "line one\nline two"
+
+def test_compact_output_keeps_head_tail_and_errors():
+    words = ["parser", "lexer", "codegen", "linker", "runtime", "driver", "loader"]
+    lines = ["$ make build"] + [f"CC {words[i % 7]}/{words[i // 7 % 7]}_{chr(97 + i % 26)}.o" for i in range(1000)]
+    lines.insert(500, "unit_x.c:12: error: expected ';' before '}'")
+    lines.append("make: *** [build] Error 1")
+    result = compact_output("\n".join(lines), 500)
+
+    assert estimate_tokens(result) <= 500
+    assert result.startswith("$ make build")
+    assert result.endswith("make: *** [build] Error 1")
+    assert "unit_x.c:12: error: expected ';' before '}'" in result
+    assert "lines omitted ..." in result
+
+def test_compact_output_charges_omission_markers_to_the_budget():
+    lines = []
+    for i in range(2000):
+        lines.append(f"test_module_{i}.py::test_case PASSED")
+        if i % 7 == 3:
+            lines.append(f"tests/test_module_{i}.py:{i}: AssertionError: expected {i}")
+
+    for max_tokens in (50, 200, 500, 1000):
+        result = compact_output("\n".join(lines), max_tokens)
+        assert estimate_tokens(result) <= max_tokens
+        assert "AssertionError" in result
+
+@patch.object(AIIntegration, "get_ai_response")
+def test_explain_output_sends_compacted_output(mock_get_ai_response):
+    mock_get_ai_response.return_value = "explained"
+    ai = AIIntegration()
+    output = "\x1b[32m" + "\n".join(f"step {i} ok" for i in range(10000))
+
+    assert ai.explain_output(output) == "explained"
+    prompt = mock_get_ai_response.call_args[0][0]
+    assert "\x1b" not in prompt
+    assert "similar lines" in prompt
+    assert len(prompt) < 200
@@ -0,0 +1,97 @@
+import io
+import os
+import tarfile
+import zipfile
+from unittest.mock import patch
+import pytest
+from terml import config
+from terml.project_templates import create_project_structure, list_available_templates
+
+def _templates_dir():
+    os.makedirs(config.TEMPLATE_DIRS[0], exist_ok=True)
+    return config.TEMPLATE_DIRS[0]
+
+def _add(archive, name, data, mode=0o644):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mode = mode
+    archive.addfile(info, io.BytesIO(data))
+
+def _service_tarball(name="service"):
+    path = os.path.join(_templates_dir(), f"{name}.tar.gz")
+    with tarfile.open(path, "w:gz") as archive:
+        _add(archive, "service/README.md", b"# {{project_name}}\n")
+        _add(archive, "service/{{package_name}}/__init__.py", b"NAME = '{{ project_name }}'\n")
+        _add(archive, "service/bin/run.sh", b"#!/bin/sh\necho {{unknown}}\n", 0o755)
+        _add(archive, "service/logo.png", b"\x89PNG{{\xff\xfe")
+    return path
+
+def test_builtin_template_is_generated(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    project_path = create_project_structure("python", "demo")
+
+    assert project_path == str(tmp_path / "demo")
+    assert sorted(os.listdir(project_path)) == [".gitignore", "README.md", "main.py", "requirements.txt", "src", "tests"]
+    assert "Hello, World!" in (tmp_path / "demo" / "main.py").read_text()
+
+def test_tarball_template_substitutes_variables(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _service_tarball()
+
+    create_project_structure("service", "My-Service")
+
+    project = tmp_path / "My-Service"
+    assert (project / "README.md").read_text() == "# My-Service\n"
+    assert (project / "my_service" / "__init__.py").read_text() == "NAME = 'My-Service'\n"
+    assert (project / "bin" / "run.sh").read_text() == "#!/bin/sh\necho {{unknown}}\n"
+    assert os.access(project / "bin" / "run.sh", os.X_OK)
+    assert not os.access(project / "README.md", os.X_OK)
+    assert (project / "logo.png").read_bytes() == b"\x89PNG{{\xff\xfe"
+
+def test_zip_and_directory_templates(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with zipfile.ZipFile(os.path.join(_templates_dir(), "lib.zip"), "w") as archive:
+        archive.writestr("setup.py", "name = '{{project_name}}'\n")
+        archive.writestr("docs/", "")
+    python_override = os.path.join(_templates_dir(), "python")
+    os.makedirs(os.path.join(python_override, "src"))
+    with open(os.path.join(python_override, "src", "app.py"), "w") as f:
+        f.write("# {{project_name}}\n")
+
+    create_project_structure("lib", "zipped")
+    create_project_structure("python", "custom")
+
+    assert (tmp_path / "zipped" / "setup.py").read_text() == "name = 'zipped'\n"
+    assert (tmp_path / "zipped" / "docs").is_dir()
+    assert os.listdir(tmp_path / "custom") == ["src"]
+    assert (tmp_path / "custom" / "src" / "app.py").read_text() == "# custom\n"
+    assert list_available_templates() == ["python", "javascript", "react", "lib"]
+
+def test_archive_index_is_cached_until_the_archive_changes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = _service_tarball()
+    create_project_structure("service", "first")
+
+    with patch("terml.project_templates._index_archive") as mock_index:
+        create_project_structure("service", "second")
+    mock_index.assert_not_called()
+    assert (tmp_path / "second" / "second" / "__init__.py").exists()
+
+    with tarfile.open(path, "w:gz") as archive:
+        _add(archive, "Makefile", b"all:\n")
+    create_project_structure("service", "third")
+    assert os.listdir(tmp_path / "third") == ["Makefile"]
+
+def test_unsafe_archive_paths_are_rejected(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with tarfile.open(os.path.join(_templates_dir(), "evil.tar"), "w") as archive:
+        _add(archive, "../escape.txt", b"x")
+
+    with pytest.raises(ValueError, match="Unsafe path"):
+        create_project_structure("evil", "victim")
+    assert not (tmp_path / "escape.txt").exists()
+
+def test_unknown_project_type_is_rejected():
+    with pytest.raises(ValueError, match="Unsupported project type: rust"):
+        create_project_structure("rust", "demo")
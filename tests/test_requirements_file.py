@@ -0,0 +1,94 @@
+from unittest.mock import MagicMock, patch
+from terml import dependency_manager
+from terml.requirements_file import RequirementsFile, parse_requirement
+
+REQUIREMENTS = """# core
+requests[socks]>=2.0  # http
+Django==4.2 ; python_version >= "3.8"
+-e git+https://example.com/repo.git#egg=tool
+pytest==6.2.5
+hashed==1.0 \\
+    --hash=sha256:abc
+click==8.0.3
+"""
+
+def test_parse_requirement_fields():
+    requirement = parse_requirement('Django[argon2] == 4.2 ; python_version >= "3.8"  # web')
+    assert (requirement.name, requirement.extras, requirement.specifier) == ("Django", "[argon2]", "==4.2")
+    assert requirement.marker.strip() == '; python_version >= "3.8"'
+    assert requirement.pinned_version == "4.2"
+    assert parse_requirement("# comment") is None
+    assert parse_requirement("-r base.txt") is None
+    assert parse_requirement("requests>=2,<3").pinned_version is None
+
+def test_requirements_lists_packages_and_skips_options():
+    names = [requirement.name for _, requirement in RequirementsFile(REQUIREMENTS).requirements()]
+    assert names == ["requests", "Django", "pytest", "hashed", "click"]
+
+def test_set_and_remove_touch_only_their_lines():
+    requirements = RequirementsFile(REQUIREMENTS)
+    requirements.set(parse_requirement("Requests==2.31.0"))
+    requirements.set(parse_requirement("rich==13.7.1"))
+    requirements.remove("hashed")
+
+    assert requirements.text() == REQUIREMENTS.replace(
+        "requests[socks]>=2.0  # http", "requests[socks]==2.31.0  # http"
+    ).replace("hashed==1.0 \\\n    --hash=sha256:abc\n", "") + "rich==13.7.1\n"
+
+def test_write_is_skipped_when_unchanged(tmp_path):
+    path = tmp_path / "requirements.txt"
+    path.write_text(REQUIREMENTS)
+    requirements = RequirementsFile.read(str(path))
+    requirements.set(parse_requirement("pytest==6.2.5"))
+    assert requirements.write(str(path)) is False
+
+def test_get_dependencies_parses_in_process(tmp_path):
+    (tmp_path / "requirements.txt").write_text("pytest==6.2.5\nclick==8.0.3\n")
+    with patch("terml.dependency_manager.subprocess") as mock_subprocess:
+        assert dependency_manager.get_dependencies(str(tmp_path)) == {"pytest": "6.2.5", "click": "8.0.3"}
+    mock_subprocess.run.assert_not_called()
+
+def test_diff_requirements_uses_installed_metadata(tmp_path):
+    (tmp_path / "requirements.txt").write_text("click==0.0.1\nnot-a-real-package-xyz\n")
+    with patch("terml.dependency_manager.get_installed_version", side_effect=lambda name: {"click": "8.1.3"}.get(name)):
+        assert dependency_manager.diff_requirements(str(tmp_path)) == [
+            {"name": "click", "required": "==0.0.1", "installed": "8.1.3"},
+            {"name": "not-a-real-package-xyz", "required": "*", "installed": None},
+        ]
+
+@patch("terml.dependency_manager.get_installed_version", return_value="2.31.0")
+@patch("terml.dependency_manager.subprocess.run")
+def test_add_dependency_pins_installed_version(mock_run, mock_version, tmp_path):
+    (tmp_path / "requirements.txt").write_text("click==8.0.3\n")
+
+    dependency_manager.add_dependency(str(tmp_path), "requests")
+
+    assert mock_run.call_args[0][0][-3:] == ["pip", "install", "requests"]
+    assert "shell" not in mock_run.call_args[1]
+    assert (tmp_path / "requirements.txt").read_text() == "click==8.0.3\nrequests==2.31.0\n"
+
+@patch("terml.dependency_manager.subprocess.run")
+def test_remove_dependency_rewrites_requirements(mock_run, tmp_path):
+    (tmp_path / "requirements.txt").write_text("click==8.0.3\nrequests==2.31.0\n")
+
+    dependency_manager.remove_dependency(str(tmp_path), "requests")
+
+    mock_run.assert_called_once()
+    assert (tmp_path / "requirements.txt").read_text() == "click==8.0.3\n"
+
+def test_active_virtualenv_is_used_for_installs_and_versions(tmp_path, monkeypatch):
+    venv_python = tmp_path / "venv" / "bin" / "python"
+    venv_python.parent.mkdir(parents=True)
+    venv_python.write_text("")
+    monkeypatch.setenv("VIRTUAL_ENV", str(tmp_path / "venv"))
+    (tmp_path / "requirements.txt").write_text("click==8.0.3\n")
+
+    def fake_run(command, **kwargs):
+        assert command[:3] == [str(venv_python), "-m", "pip"]
+        return MagicMock(stdout='[{"name": "Requests", "version": "2.31.0"}]' if command[3] == "list" else "")
+
+    with patch("terml.dependency_manager.subprocess.run", side_effect=fake_run) as mock_run:
+        dependency_manager.add_dependency(str(tmp_path), "requests")
+
+    assert [call[0][0][3] for call in mock_run.call_args_list] == ["install", "list"]
+    assert (tmp_path / "requirements.txt").read_text() == "click==8.0.3\nrequests==2.31.0\n"
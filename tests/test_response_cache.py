@@ -0,0 +1,64 @@
+import pytest
+from unittest.mock import patch, MagicMock
+from terml.ai_integration import AIIntegration
+from terml.response_cache import ResponseCache
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / "responses.sqlite3"), max_bytes=1000)
+    yield cache
+    cache.close()
+
+def test_make_key_is_content_addressed():
+    key = ResponseCache.make_key("model", "system", "prompt", 100)
+    assert key == ResponseCache.make_key("model", "system", "prompt", 100)
+    assert key != ResponseCache.make_key("model", "system", "prompt", 200)
+    assert key != ResponseCache.make_key("model", "other system", "prompt", 100)
+
+def test_get_put_roundtrip(cache):
+    cache.put("key", "cached response", ttl=60)
+    assert cache.get("key") == "cached response"
+    assert cache.get("missing") is None
+
+def test_expired_entries_are_not_returned(cache):
+    with patch('terml.response_cache.time.time', return_value=1000.0):
+        cache.put("key", "cached response", ttl=60)
+    with patch('terml.response_cache.time.time', return_value=1061.0):
+        assert cache.get("key") is None
+
+def test_lru_eviction_keeps_cache_within_size(cache):
+    with patch('terml.response_cache.time.time', return_value=1000.0):
+        cache.put("old", "a" * 400, ttl=3600)
+    with patch('terml.response_cache.time.time', return_value=1001.0):
+        cache.put("recent", "b" * 400, ttl=3600)
+    with patch('terml.response_cache.time.time', return_value=1002.0):
+        assert cache.get("old") == "a" * 400
+    with patch('terml.response_cache.time.time', return_value=1003.0):
+        cache.put("new", "c" * 400, ttl=3600)
+        assert cache.get("recent") is None
+        assert cache.get("old") == "a" * 400
+        assert cache.get("new") == "c" * 400
+
+def test_get_ai_response_uses_cache():
+    ai_integration = AIIntegration()
+    mock_client = MagicMock()
+    mock_client.messages.create.return_value.content = "Fresh response"
+    ai_integration.client = mock_client
+
+    first = ai_integration.get_ai_response("prompt", "system", 100, cache_ttl=60)
+    second = ai_integration.get_ai_response("prompt", "system", 100, cache_ttl=60)
+
+    assert first == second == "Fresh response"
+    mock_client.messages.create.assert_called_once()
+
+def test_no_cache_bypasses_cache():
+    ai_integration = AIIntegration(use_cache=False)
+    mock_client = MagicMock()
+    mock_client.messages.create.return_value.content = "Fresh response"
+    ai_integration.client = mock_client
+
+    ai_integration.get_ai_response("prompt", "system", 100, cache_ttl=60)
+    ai_integration.get_ai_response("prompt", "system", 100, cache_ttl=60)
+
+    assert ai_integration.cache is None
+    assert mock_client.messages.create.call_count == 2
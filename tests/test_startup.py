@@ -0,0 +1,78 @@
+import json
+import os
+import subprocess
+import sys
+
+# Cold-start budget for importing the `terml` entry point, measured in a fresh interpreter
+CLI_IMPORT_BUDGET_SECONDS = 0.3
+
+HEAVY_MODULES = ['anthropic', 'dotenv', 'terml.ai_integration', 'terml.commands', 'terml.code_analyzer',
+                 'terml.test_generator', 'terml.dependency_manager', 'terml.project_templates']
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+def _run_python(code, state_dir):
+    # A fresh interpreter with terml's caches, data and daemon socket under state_dir
+    env = dict(os.environ, PYTHONPATH=PROJECT_ROOT, TERML_CACHE_DIR=str(state_dir / 'cache'),
+               TERML_DATA_DIR=str(state_dir / 'data'), TERML_SOCKET=str(state_dir / 'terml.sock'))
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def test_cli_import_time_within_budget(tmp_path):
+    code = (
+        "import json, time\n"
+        "start = time.perf_counter()\n"
+        "import terml.main\n"
+        "print(json.dumps(time.perf_counter() - start))\n"
+    )
+    # Best of three keeps a single slow run on a busy machine from failing the test
+    elapsed = min(_run_python(code, tmp_path) for _ in range(3))
+    assert elapsed < CLI_IMPORT_BUDGET_SECONDS, f"importing terml.main took {elapsed:.3f}s"
+
+def test_help_does_not_import_subsystems(tmp_path):
+    code = (
+        "import json, sys\n"
+        "from terml.main import cli\n"
+        "try:\n"
+        "    cli(['--help'])\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))\n"
+    )
+    assert _run_python(code, tmp_path) == []
+
+def test_generate_does_not_import_anthropic(tmp_path):
+    code = (
+        "import json, os, sys\n"
+        f"os.chdir({str(tmp_path)!r})\n"
+        "from terml.main import cli\n"
+        "try:\n"
+        "    cli(['generate', 'python', 'new_project'])\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "print(json.dumps('anthropic' in sys.modules))\n"
+    )
+    assert _run_python(code, tmp_path) is False
+    assert (tmp_path / 'new_project' / 'main.py').exists()
+
+def test_settings_are_read_from_dotenv(tmp_path):
+    (tmp_path / '.env').write_text(f"TERML_AI_MODE=replay\nTERML_CACHE_DIR={tmp_path / 'cache'}\n")
+    code = (
+        "import json, os\n"
+        f"os.chdir({str(tmp_path)!r})\n"
+        "for name in ('TERML_AI_MODE', 'TERML_CACHE_DIR'):\n"
+        "    os.environ.pop(name, None)\n"
+        "from terml import config\n"
+        "print(json.dumps([config.AI_MODE, config.CACHE_DIR]))\n"
+    )
+    assert _run_python(code, tmp_path) == ['replay', str(tmp_path / 'cache')]
+
+def test_package_exports_are_lazy(tmp_path):
+    code = (
+        "import json, sys\n"
+        "import terml\n"
+        "loaded = 'anthropic' in sys.modules\n"
+        "from terml import CommandExecutor\n"
+        "print(json.dumps([loaded, CommandExecutor.__name__]))\n"
+    )
+    assert _run_python(code, tmp_path) == [False, 'CommandExecutor']
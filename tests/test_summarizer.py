@@ -0,0 +1,82 @@
+import threading
+from unittest.mock import MagicMock
+from terml import config
+from terml.ai_integration import AIIntegration
+from terml.summarizer import iter_file_chunks, summarize_large_file
+
+def test_iter_file_chunks_splits_on_line_boundaries(tmp_path):
+    path = tmp_path / "app.log"
+    lines = [f"line {i:03d}\n" for i in range(100)]
+    path.write_text("".join(lines))
+
+    chunks = list(iter_file_chunks(str(path), 25))
+
+    assert "".join(chunks) == "".join(lines)
+    assert all(chunk.endswith("\n") for chunk in chunks)
+    assert max(len(chunk) for chunk in chunks) <= 25
+
+def test_iter_file_chunks_handles_long_lines_and_empty_files(tmp_path):
+    path = tmp_path / "blob.txt"
+    path.write_text("x" * 50)
+    assert list(iter_file_chunks(str(path), 20)) == ["x" * 20, "x" * 20, "x" * 10]
+
+    empty = tmp_path / "empty.txt"
+    empty.write_text("")
+    assert list(iter_file_chunks(str(empty), 20)) == []
+
+def test_iter_file_chunks_does_not_split_characters(tmp_path):
+    path = tmp_path / "names.txt"
+    text = "żółć€漢字" * 10
+    path.write_text(text, encoding="utf-8")
+
+    chunks = list(iter_file_chunks(str(path), 7))
+
+    assert "".join(chunks) == text
+    assert all("\ufffd" not in chunk for chunk in chunks)
+    assert all(len(chunk.encode("utf-8")) <= 7 for chunk in chunks)
+
+def test_summarize_large_file_map_reduce(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "SUMMARIZE_CHUNK_TOKENS", 10)
+    monkeypatch.setattr(config, "SUMMARIZE_REDUCE_FAN_IN", 3)
+    monkeypatch.setattr(config, "SUMMARIZE_CONCURRENCY", 2)
+    path = tmp_path / "big.log"
+    path.write_text("".join(f"entry {i:02d} ok\n" for i in range(20)))
+    prompts = []
+    lock = threading.Lock()
+
+    def fake_response(prompt, system_prompt, max_tokens, cache_ttl=0):
+        with lock:
+            prompts.append(prompt)
+            return f"summary {len(prompts)}"
+
+    ai_integration = MagicMock()
+    ai_integration.get_ai_response.side_effect = fake_response
+
+    result = summarize_large_file(ai_integration, str(path))
+
+    chunk_prompts = [p for p in prompts if p.startswith("Summarize part")]
+    combine_prompts = [p for p in prompts if p.startswith("Combine")]
+    assert len(chunk_prompts) == 7
+    assert len(combine_prompts) == 3
+    assert result == f"summary {len(prompts)}"
+    assert ai_integration.get_ai_response.call_args[0][2] == config.SUMMARIZE_MAX_TOKENS
+
+def test_summarize_large_file_stops_on_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "SUMMARIZE_CHUNK_TOKENS", 10)
+    path = tmp_path / "big.log"
+    path.write_text("data\n" * 100)
+    ai_integration = MagicMock()
+    ai_integration.get_ai_response.return_value = "Error: rate limited"
+
+    assert summarize_large_file(ai_integration, str(path)) == "Error: rate limited"
+
+def test_summarize_contents_uses_chunking_for_large_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "SUMMARIZE_CHUNK_TOKENS", 10)
+    path = tmp_path / "big.log"
+    path.write_text("data\n" * 100)
+    ai_integration = AIIntegration()
+    summarize = MagicMock(return_value="chunked summary")
+    monkeypatch.setattr("terml.ai_integration.summarize_large_file", summarize)
+
+    assert ai_integration.summarize_contents(str(path)) == "chunked summary"
+    summarize.assert_called_once_with(ai_integration, str(path))
@@ -0,0 +1,94 @@
+import os
+import sys
+import threading
+import time
+import pytest
+from terml.journal import Journal
+from terml.output_capture import OutputCapture
+from terml.terminal_handler import TerminalHandler
+
+def _handler(tmp_path):
+    return TerminalHandler(journal=Journal(str(tmp_path / "journal")))
+
+def test_output_capture_stays_in_memory_below_threshold():
+    capture = OutputCapture(memory_bytes=100)
+    capture.write(b"hello ")
+    capture.write(b"world")
+    assert not capture.spilled
+    assert capture.text() == "hello world"
+    assert capture.tail(5) == b"world"
+
+def test_output_capture_spills_and_bounds_memory():
+    capture = OutputCapture(memory_bytes=64)
+    for i in range(100):
+        capture.write(f"line {i:03d}\n".encode())
+
+    assert capture.spilled
+    assert capture.size == 900
+    assert capture._recent_size < 64 + 9
+    assert capture.text().splitlines() == [f"line {i:03d}" for i in range(100)]
+    assert capture.tail(9) == b"line 099\n"
+    assert capture.tail(198).startswith(b"line 078\n")
+
+    view = capture.text(max_bytes=90)
+    assert view.startswith("line 000\n")
+    assert view.endswith("line 099\n")
+    assert "bytes omitted" in view
+    capture.close()
+
+def test_execute_command_captures_stdout_and_stderr(tmp_path):
+    handler = _handler(tmp_path)
+    output, error = handler.execute_command("echo out; echo err >&2; exit 3")
+
+    assert (output, error) == ("out\n", "err\n")
+    assert handler.last_exit_code == 3
+    assert handler.get_last_output() == "out\nerr\n"
+    assert handler.journal.last().exit_code == 3
+
+def test_execute_command_echoes_live(tmp_path, capsys):
+    handler = _handler(tmp_path)
+    handler.execute_command("echo streamed", echo=True)
+    assert capsys.readouterr().out == "streamed\n"
+
+def test_execute_command_large_output_is_a_bounded_view(tmp_path, monkeypatch):
+    monkeypatch.setattr("terml.config.CAPTURE_MEMORY_BYTES", 1024)
+    monkeypatch.setattr("terml.config.CAPTURE_VIEW_BYTES", 4096)
+    handler = _handler(tmp_path)
+    command = f"{sys.executable} -c \"print('first'); [print('x' * 99) for _ in range(2000)]; print('last')\""
+    output, _ = handler.execute_command(command)
+
+    assert output.startswith("first\n")
+    assert output.endswith("last\n")
+    assert "bytes omitted" in output
+    assert len(handler.last_output) < 5000
+
+def test_execute_command_times_out(tmp_path):
+    handler = _handler(tmp_path)
+    start = time.monotonic()
+    output, error = handler.execute_command("echo started; sleep 30", timeout=0.5)
+
+    assert time.monotonic() - start < 10
+    assert output == "started\n"
+    assert "timed out after 0.5 seconds" in error
+    assert handler.last_exit_code != 0
+
+def test_cancel_stops_running_command(tmp_path):
+    handler = _handler(tmp_path)
+    timer = threading.Timer(0.5, handler.cancel)
+    timer.start()
+    try:
+        _, error = handler.execute_command("sleep 30")
+    finally:
+        timer.cancel()
+
+    assert "command cancelled" in error
+    assert handler.last_exit_code != 0
+
+@pytest.mark.skipif(os.name != "posix", reason="process groups and sessions are POSIX only")
+def test_command_keeps_the_session_in_its_own_process_group(tmp_path):
+    handler = _handler(tmp_path)
+    output, _ = handler.execute_command(f"{sys.executable} -c \"import os; print(os.getsid(0), os.getpgid(0))\"")
+
+    sid, pgid = map(int, output.split())
+    assert sid == os.getsid(0)
+    assert pgid != os.getpgid(0)
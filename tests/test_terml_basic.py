@@ -43,6 +43,17 @@ def test_command_executor_execute():
         executor.execute("terml test_command")
         mock_execute.assert_called_once_with("terml test_command")
 
+def test_command_executor_streams_explain(capsys):
+    mock_terminal_handler = MagicMock()
+    mock_terminal_handler.get_last_output.return_value = "ls: cannot access 'x'"
+    mock_ai_integration = MagicMock()
+    mock_ai_integration.explain_output.return_value = (chunk for chunk in ["The file ", "is missing."])
+    executor = CommandExecutor(mock_terminal_handler, mock_ai_integration)
+
+    executor.execute("terml explain")
+
+    assert capsys.readouterr().out == "TerML: The file is missing.\n"
+
 @patch('terml.dependency_manager.get_project_type')
 @patch('terml.dependency_manager.check_outdated_dependencies')
 @patch('builtins.open', new_callable=mock_open, read_data="pytest==6.2.5\nclick==8.0.3")
@@ -58,12 +69,13 @@ def test_get_dependency_info(mock_file, mock_check_outdated, mock_get_project_ty
     assert "outdated" in result
     assert result["dependencies"] == {"pytest": "6.2.5", "click": "8.0.3"}
 
-@patch('terml.code_analyzer.os.walk')
+@patch('terml.code_analyzer.walk_files')
 @patch('terml.code_analyzer.CodeAnalyzer.analyze_file')
 def test_analyze_project(mock_analyze_file, mock_walk):
-    mock_walk.return_value = [
-        ('/test_project', [], ['test_file.py'])
-    ]
+    mock_entry = MagicMock()
+    mock_entry.path = '/test_project/test_file.py'
+    mock_entry.stat.side_effect = FileNotFoundError
+    mock_walk.return_value = [mock_entry]
     mock_analyze_file.return_value = ["Function 'test_func' is too long (60 lines). Consider refactoring."]
 
     expected_result = {
@@ -0,0 +1,114 @@
+import os
+from unittest.mock import MagicMock, patch
+from click.testing import CliRunner
+from terml.main import cli
+from terml.test_generator import generate_and_write_tests, generate_tests_for_project
+
+SOURCE = "def add(a, b):\n    return a + b\n\ndef _helper():\n    pass\n"
+
+def _project(tmp_path):
+    (tmp_path / "calc.py").write_text(SOURCE)
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "strings.py").write_text("def shout(s):\n    return s.upper()\n")
+    return str(tmp_path)
+
+def test_first_run_writes_scaffolds_for_public_functions(tmp_path):
+    report = generate_and_write_tests(_project(tmp_path))
+
+    assert sorted(report.written) == [str(tmp_path / "pkg" / "test_strings.py"), str(tmp_path / "test_calc.py")]
+    scaffold = (tmp_path / "test_calc.py").read_text()
+    assert "def test_add(self):" in scaffold
+    assert "_helper" not in scaffold
+
+def test_rerun_skips_unchanged_sources(tmp_path):
+    project = _project(tmp_path)
+    generate_and_write_tests(project)
+
+    with patch("terml.test_generator._parse_sources", wraps=lambda paths, jobs=None: []) as mock_parse:
+        report = generate_and_write_tests(project)
+
+    assert mock_parse.call_args[0][0] == []
+    assert report.written == []
+    assert len(report.skipped) == 2
+
+def test_body_edit_keeps_scaffold_and_new_function_updates_it(tmp_path):
+    project = _project(tmp_path)
+    generate_and_write_tests(project)
+    scaffold = tmp_path / "test_calc.py"
+    os.utime(scaffold, (0, 0))
+
+    (tmp_path / "calc.py").write_text(SOURCE.replace("a + b", "b + a"))
+    report = generate_and_write_tests(project)
+    assert report.written == []
+    assert str(tmp_path / "calc.py") in report.skipped
+    assert os.stat(scaffold).st_mtime == 0
+
+    (tmp_path / "calc.py").write_text(SOURCE + "\ndef sub(a, b):\n    return a - b\n")
+    report = generate_and_write_tests(project)
+    assert report.written == [str(scaffold)]
+    assert "def test_sub(self):" in scaffold.read_text()
+
+def test_hand_edited_scaffold_is_preserved(tmp_path):
+    project = _project(tmp_path)
+    generate_and_write_tests(project)
+    scaffold = tmp_path / "test_calc.py"
+    scaffold.write_text("# my real tests\n")
+
+    (tmp_path / "calc.py").write_text(SOURCE + "\ndef sub(a, b):\n    return a - b\n")
+    report = generate_and_write_tests(project)
+
+    assert report.preserved == [str(scaffold)]
+    assert scaffold.read_text() == "# my real tests\n"
+
+def test_existing_user_test_file_is_never_overwritten(tmp_path):
+    project = _project(tmp_path)
+    (tmp_path / "test_calc.py").write_text("# written by hand\n")
+
+    report = generate_and_write_tests(project)
+
+    assert report.preserved == [str(tmp_path / "test_calc.py")]
+    assert (tmp_path / "test_calc.py").read_text() == "# written by hand\n"
+
+def test_syntax_errors_are_reported(tmp_path):
+    project = _project(tmp_path)
+    (tmp_path / "broken.py").write_text("def oops(:\n")
+
+    report = generate_and_write_tests(project)
+
+    assert [path for path, _ in report.errors] == [str(tmp_path / "broken.py")]
+    assert not (tmp_path / "test_broken.py").exists()
+
+def test_parallel_parse_matches_serial(tmp_path, monkeypatch):
+    for i in range(20):
+        (tmp_path / f"mod{i}.py").write_text(f"def f{i}():\n    pass\n")
+    monkeypatch.setattr("terml.config.TEST_GENERATE_CHUNK_SIZE", 4)
+
+    assert generate_tests_for_project(str(tmp_path), jobs=2) == generate_tests_for_project(str(tmp_path), jobs=1)
+
+@patch("terml.commands.CommandExecutor.ai_integration", new_callable=MagicMock)
+def test_test_command_reports_generation(mock_ai, tmp_path):
+    mock_ai.suggest_test_improvements.return_value = "Add edge cases."
+    project = _project(tmp_path)
+
+    result = CliRunner().invoke(cli, ["test", project])
+
+    assert "Test scaffolds: 2 written, 0 up to date, 0 preserved, 0 failed" in result.output
+    assert "Add edge cases." in result.output
+
+def test_scaffolds_get_regular_file_mode(tmp_path):
+    generate_and_write_tests(_project(tmp_path))
+    umask = os.umask(0)
+    os.umask(umask)
+    assert os.stat(tmp_path / "test_calc.py").st_mode & 0o777 == 0o666 & ~umask
+
+def test_modules_without_public_functions_get_no_scaffold(tmp_path):
+    project = _project(tmp_path)
+    (tmp_path / "pkg" / "__init__.py").write_text("")
+    (tmp_path / "constants.py").write_text("LIMIT = 3\n\ndef _private():\n    pass\n")
+
+    report = generate_and_write_tests(project)
+
+    assert not (tmp_path / "pkg" / "test___init__.py").exists()
+    assert not (tmp_path / "test_constants.py").exists()
+    assert len(report.written) == 2
+    assert str(tmp_path / "test_constants.py") not in generate_tests_for_project(project)
@@ -0,0 +1,119 @@
+import os
+from unittest.mock import MagicMock
+from click.testing import CliRunner
+from terml import config, tracing
+from terml.ai_integration import AIIntegration
+from terml.fs_walker import walk_files
+from terml.main import cli
+
+def _only_trace():
+    traces = tracing.read_traces()
+    assert len(traces) == 1
+    return traces[0]
+
+def test_trace_records_spans_once_per_command():
+    with tracing.trace_command("terml analyze /private/path"):
+        with tracing.trace_command("terml analyze /private/path"):
+            with tracing.span("work", files=3) as span:
+                span["stale"] = 1
+        tracing.record("import.cli", 0.25)
+
+    trace = _only_trace()
+    assert (trace["command"], trace["origin"], trace["status"]) == ("analyze", "cli", "ok")
+    assert "/private/path" not in str(trace)
+    work, imported = trace["spans"]
+    assert (work["name"], work["files"], work["stale"]) == ("work", 3, 1)
+    assert imported["duration_ms"] == 250.0
+
+def test_spans_outside_a_trace_are_dropped():
+    with tracing.span("work"):
+        pass
+    tracing.record("import.cli", 0.1)
+    assert not os.path.exists(config.TRACE_PATH)
+
+def test_api_request_span_has_token_counts():
+    ai = AIIntegration(use_cache=False)
+    ai.client = MagicMock()
+    ai.client.messages.create.return_value = MagicMock(content="Hi", usage=MagicMock(input_tokens=12, output_tokens=34, cache_read_input_tokens=None))
+
+    with tracing.trace_command("terml suggest"):
+        assert ai.get_ai_response("prompt", "system", 100) == "Hi"
+
+    span = _only_trace()["spans"][0]
+    assert (span["name"], span["max_tokens"], span["input_tokens"], span["output_tokens"]) == ("api.request", 100, 12, 34)
+    assert "cache_read_input_tokens" not in span
+
+def test_stream_span_has_time_to_first_token():
+    ai = AIIntegration(use_cache=False)
+    ai.client = MagicMock()
+    ai.client.messages.stream.return_value.__enter__.return_value.text_stream = ["a", "b"]
+
+    with tracing.trace_command("terml explain"):
+        assert "".join(ai.stream_ai_response("prompt", "system", 100)) == "ab"
+
+    span = _only_trace()["spans"][0]
+    assert span["name"] == "api.stream"
+    assert span["ttft_ms"] >= 0
+
+def test_cached_stream_adds_no_time_to_first_token(monkeypatch):
+    monkeypatch.setattr(config, "RESPONSE_CACHE_ENABLED", True)
+    ai = AIIntegration()
+    ai.client = MagicMock()
+    ai.client.messages.stream.return_value.__enter__.return_value.text_stream = ["a", "b"]
+
+    with tracing.trace_command("terml explain"):
+        assert "".join(ai.stream_ai_response("prompt", "system", 100, cache_ttl=60)) == "ab"
+        assert "".join(ai.stream_ai_response("prompt", "system", 100, cache_ttl=60)) == "ab"
+
+    live, cached = _only_trace()["spans"]
+    assert "ttft_ms" in live and "cached" not in live
+    assert cached["cached"] is True and "ttft_ms" not in cached
+    assert len(ai.time_to_first_token_history) == 1
+    assert ai.last_time_to_first_token is None
+
+def test_walk_time_is_traced(tmp_path):
+    for name in ("a.py", "b.py", "c.txt"):
+        (tmp_path / name).write_text("")
+
+    with tracing.trace_command("terml test"):
+        assert len(list(walk_files(str(tmp_path), suffixes=(".py",)))) == 2
+
+    span = _only_trace()["spans"][0]
+    assert (span["name"], span["files"]) == ("fs.walk", 2)
+
+def test_trace_file_rotates(monkeypatch):
+    monkeypatch.setattr(config, "TRACE_MAX_BYTES", 300)
+    for _ in range(8):
+        with tracing.trace_command("terml suggest"):
+            pass
+
+    assert os.path.exists(config.TRACE_PATH + ".1")
+    assert not os.path.exists(config.TRACE_PATH + ".2")
+    assert 2 <= len(tracing.read_traces()) < 8
+
+def test_summary_percentiles_and_daemon_lines():
+    traces = [{"command": "explain", "origin": "cli", "duration_ms": float(ms), "spans": []} for ms in range(1, 21)]
+    traces.append({"command": "explain", "origin": "daemon", "duration_ms": 999.0,
+                   "spans": [{"name": "api.stream", "duration_ms": 900.0, "ttft_ms": 120.0},
+                             {"name": "api.stream", "duration_ms": 0.2, "ttft_ms": 0.1, "cached": True}]})
+
+    summary = tracing.summarize_traces(traces)
+
+    assert summary["commands"]["explain"] == {"count": 20, "p50": 10.0, "p95": 19.0}
+    assert summary["spans"]["api.ttft"] == {"count": 1, "p50": 120.0, "p95": 120.0}
+    assert summary["spans"]["api.stream"]["count"] == 1
+    assert summary["spans"]["api.stream (cached)"]["count"] == 1
+
+def test_cli_command_is_traced_and_reported(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    runner = CliRunner()
+    assert "No traces recorded yet." in runner.invoke(cli, ["stats"]).output
+
+    runner.invoke(cli, ["generate", "python", "demo"])
+
+    trace = _only_trace()
+    assert trace["command"] == "generate"
+    assert {"import.cli", "import.commands", "execute"} <= {span["name"] for span in trace["spans"]}
+    output = runner.invoke(cli, ["stats"]).output
+    assert "generate" in output
+    assert "p95 ms" in output
@@ -0,0 +1,46 @@
+from unittest.mock import patch
+from terml.ai_integration import AIIntegration
+from terml.tree_profiler import format_profile, profile_tree
+
+def _write(root, path, size):
+    full_path = root / path
+    full_path.parent.mkdir(parents=True, exist_ok=True)
+    full_path.write_bytes(b"x" * size)
+
+def test_profile_tree_collects_counts_sizes_and_types(tmp_path):
+    _write(tmp_path, "README.md", 10)
+    _write(tmp_path, "src/app.py", 100)
+    _write(tmp_path, "src/util.py", 50)
+    _write(tmp_path, "src/deep/nested/data.json", 1000)
+    _write(tmp_path, "node_modules/pkg/index.js", 5000)
+
+    profile = profile_tree(str(tmp_path), max_depth=1, top_n=2)
+
+    assert profile.file_count == 4
+    assert profile.total_bytes == 1160
+    assert profile.extensions == {".md": 1, ".py": 2, ".json": 1}
+    assert profile.largest_files() == [(1000, "src/deep/nested/data.json"), (100, "src/app.py")]
+    assert list(profile.children) == ["src"]
+    src = profile.children["src"]
+    assert (src.file_count, src.total_bytes) == (3, 1150)
+    assert src.children == {}
+
+def test_format_profile_is_bounded(tmp_path):
+    for i in range(50):
+        _write(tmp_path, f"dir{i:02d}/file.txt", i + 1)
+
+    text = format_profile(profile_tree(str(tmp_path)), max_tokens=200)
+
+    assert len(text) <= 800 + 100
+    assert text.startswith("./: 50 files")
+    assert "dir49/" in text
+    assert "more subtrees omitted" in text
+
+def test_summarize_directory_sends_profile(tmp_path):
+    _write(tmp_path, "src/app.py", 100)
+    with patch.object(AIIntegration, 'get_ai_response', return_value="A small Python app.") as mock_get_ai_response:
+        summary = AIIntegration().summarize_contents(str(tmp_path), depth=1)
+
+    assert summary == "A small Python app."
+    prompt = mock_get_ai_response.call_args[0][0]
+    assert "src/: 1 files, 100 B; types: .py 1 (100 B)" in prompt